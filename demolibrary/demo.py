@@ -1,6 +1,7 @@
 from Katana import NodegraphAPI
 from Katana import DrawingModule
 
+from katananodling import schema
 from katananodling.entities import BaseCustomNode
 
 
@@ -12,6 +13,11 @@ class DemoNode(BaseCustomNode):
     description = "What the tool does in a few words."
     author = "<FirstName Name email@provider.com>"
 
+    user_params = [
+        schema.StringParam("CEL", hints={"widget": "cel"}),
+        schema.NumberParam("amount", 1, hints={"slider": True, "slidermax": 2.0}),
+    ]
+
     def _build(self):
 
         prunenode = NodegraphAPI.CreateNode("Prune", self)
@@ -19,15 +25,5 @@ class DemoNode(BaseCustomNode):
         p.setExpression("=^/user.CEL")
         self.wireInsertNodes([prunenode])
 
-        userparam = self.user_param
-        p = userparam.createChildString("CEL", "")
-        hint = {"widget": "cel"}
-        p.setHintString(repr(hint))
-
-        p = userparam.createChildNumber("amount", 1)
-        hint = {"slider": True, "slidermax": 2.0}
-        p.setHintString(repr(hint))
-
         DrawingModule.SetCustomNodeColor(self, *self.color)
-        self.moveAboutParamToBottom()
         return
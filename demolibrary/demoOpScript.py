@@ -1,3 +1,4 @@
+from katananodling import schema
 from katananodling.entities import OpScriptCustomNode
 
 
@@ -9,24 +10,16 @@ class DemoOpScriptNode(OpScriptCustomNode):
     description = "What the tool does in a few words."
     author = "<FirstName Name email@provider.com>"
 
-    def _build(self):
+    user_params = [
+        schema.StringParam("CEL", hints={"widget": "cel"}),
+        schema.NumberParam("quantity", 1, hints={"slider": True, "slidermax": 2.0}),
+    ]
 
-        script = 'local script = require("{path}")\nscript()'
-        script = script.format(path=self.getLuaModuleName())
+    def _build(self):
 
         opscriptnode = self.getDefaultOpScriptNode()
         opscriptnode.getParameter("CEL").setExpression("=^/user.CEL", True)
         opscriptnode.getParameter("applyWhere").setValue("at locations matching CEL", 0)
-        opscriptnode.getParameter("script.lua").setValue(script, 0)
-
-        userparam = self.user_param
-        p = userparam.createChildString("CEL", "")
-        hint = {"widget": "cel"}
-        p.setHintString(repr(hint))
-
-        p = userparam.createChildNumber("quantity", 1)
-        hint = {"slider": True, "slidermax": 2.0}
-        p.setHintString(repr(hint))
+        opscriptnode.getParameter("script.lua").setValue(self.getLuaLoaderScript(), 0)
 
-        self.moveAboutParamToBottom()
         return
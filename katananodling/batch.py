@@ -0,0 +1,637 @@
+"""
+Upgrade the BaseCustomNode of many scene files at once, for example after releasing
+a library version with breaking changes.
+
+Scenes are first scanned offline (see ``scanner``) so only the ones with outdated
+nodes are opened. Those are split into chunks migrated in parallel by headless
+Katana sessions (``katana --script``), each upgrading only the outdated nodes and
+replacing the scene atomically.
+
+Each scene report is appended to a progress file as soon as it's known, so an
+interrupted batch can be resumed: scenes already migrated, and not modified since,
+are skipped.
+
+Example::
+
+    python -m katananodling.batch /shows/abc/shots --package demolibrary \\
+        --katana /opt/katana/katana --processes 4 --progress /tmp/abc.jsonl
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import multiprocessing.pool
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import traceback
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+from . import c
+from . import config
+from . import discovery
+from . import profiling
+from . import scanner
+from . import util
+from .cache import getFileFingerprint
+from .cache import replaceFile
+from .cache import writeFileAtomically
+
+__all__ = (
+    "Status",
+    "getClassVersions",
+    "getOutdatedNodes",
+    "getSummary",
+    "main",
+    "migrateScene",
+    "migrateScenes",
+    "readProgress",
+    "runWorker",
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Status:
+    """
+    Status of a scene in the reports.
+    """
+
+    UPGRADED = "upgraded"
+    """
+    Outdated nodes were upgraded and the scene saved.
+    """
+
+    UP_TO_DATE = "up-to-date"
+    """
+    Nothing to upgrade, the scene is untouched.
+    """
+
+    OUTDATED = "outdated"
+    """
+    Dry-run only: the scene has nodes to upgrade.
+    """
+
+    FAILED = "failed"
+    """
+    The scene could not be read, a node failed to upgrade or the Katana session
+    crashed. The scene is untouched and will be processed again on resume.
+    """
+
+    DONE = (UPGRADED, UP_TO_DATE)
+    """
+    Status of the scenes skipped on resume.
+    """
+
+
+Runner = Callable[[List[str]], List[Dict[str, Any]]]
+
+
+def _newReport(path, status, nodes=None, error=None, duration=0.0):
+    # type: (str, str, Optional[List[Dict]], Optional[str], float) -> Dict[str, Any]
+    return {
+        "path": path,
+        "status": status,
+        "nodes": nodes or list(),
+        "error": error,
+        "duration": duration,
+    }
+
+
+def getClassVersions(packages):
+    # type: (Iterable[str]) -> Dict[str, str]
+    """
+    Find the current version of the BaseCustomNode of the given libraries, by
+    parsing their source files without importing them (see ``discovery``).
+
+    Args:
+        packages: importable python names of the libraries
+
+    Returns:
+        version string per node type.
+    """
+    versions = dict()
+    for package_id in packages:
+        package_dir = util.findPackageDirectory(package_id)
+        if not package_dir:
+            logger.error(
+                "[getClassVersions] Cannot find package <{}>".format(package_id)
+            )
+            continue
+        discovered = discovery.discoverNodesInDirectory(
+            package_dir, package_id, exported_only=True
+        )
+        for file_entries in discovered.values():
+            for entry, valid in file_entries:
+                if valid:
+                    versions[entry.name] = str(util.Version(entry.version))
+    return versions
+
+
+def getOutdatedNodes(path, class_versions):
+    # type: (str, Dict[str, str]) -> List[scanner.SceneNode]
+    """
+    Args:
+        path: scene file to scan offline
+        class_versions: see ``getClassVersions``, other node types are ignored
+
+    Returns:
+        nodes whose stored version or api version differ from the current ones.
+    """
+    return [
+        node
+        for node in scanner.iterCustomNodes(path, node_types=class_versions)
+        if node.version != class_versions[node.type]
+        or node.api_version != c.__version__
+    ]
+
+
+def _saveScene(path):
+    # type: (str) -> None
+    """
+    Save the current scene to the given path without it ever being observed
+    half-written: saved next to it then moved over it.
+    """
+    from Katana import KatanaFile
+
+    directory, filename = os.path.split(os.path.abspath(path))
+    handle, tmp_path = tempfile.mkstemp(
+        dir=directory,
+        prefix=".{}.".format(filename),
+        # Katana choose the compression from the extension
+        suffix=os.path.splitext(filename)[1],
+    )
+    os.close(handle)
+    try:
+        # the return value of Save is not documented, check the file itself (created
+        # empty by mkstemp)
+        KatanaFile.Save(tmp_path)
+        if not os.path.getsize(tmp_path):
+            raise IOError("Katana failed to save <{}>".format(tmp_path))
+        replaceFile(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _isOutdated(node):
+    # type: (Any) -> bool
+    about = node.about
+    return about._getValue(about.ParamNames.version) != str(
+        util.Version(node.version)
+    ) or about._getValue(about.ParamNames.api_version) != c.__version__
+
+
+def migrateScene(path, dry_run=False):
+    # type: (str, bool) -> Dict[str, Any]
+    """
+    Open the given scene, upgrade its outdated BaseCustomNode and save it in place.
+
+    Requires a Katana session where the libraries are registered. Only the outdated
+    nodes are upgraded. If any of them fails, the scene is not saved.
+
+    Args:
+        path: scene file to migrate
+        dry_run: True to only report what would be upgraded
+
+    Returns:
+        json-serializable report of the scene, with one entry per outdated node:
+        see ``migration.previewMigration``, plus the errors of its upgrade.
+    """
+    # imported here so the offline part of this module doesn't require Katana
+    from Katana import KatanaFile
+    from Katana import Utils
+
+    from . import loader
+    from . import migration
+
+    start = profiling.timer()
+    try:
+        with loader.suspendCallbacks():
+            KatanaFile.Load(path)
+    except Exception as excp:
+        logger.debug("[migrateScene] {}".format(traceback.format_exc()))
+        return _newReport(
+            path,
+            Status.FAILED,
+            error="Cannot load scene: {!r}".format(excp),
+            duration=profiling.timer() - start,
+        )
+
+    debug = config.getConfig().node_param_debug
+    nodes = list()
+    failed = False
+
+    Utils.UndoStack.DisableCapture()
+    try:
+        for node in loader._getSceneNodes():
+
+            if not _isOutdated(node):
+                continue
+
+            node_report = migration.previewMigration(node) or {
+                "node": node.getName(),
+                "type": node.getType(),
+                "from": str(node.about.version),
+                "to": str(util.Version(node.version)),
+                "steps": list(),
+                "params": list(),
+            }
+            node_report["errors"] = list()
+            nodes.append(node_report)
+            if dry_run:
+                continue
+
+            for step, excp, trace in loader._upgradeNode(node, debug):
+                node_report["errors"].append("{}: {!r}".format(step, excp))
+                logger.debug("[migrateScene] {} on {}:\n{}".format(step, node, trace))
+                failed = True
+    finally:
+        Utils.UndoStack.EnableCapture()
+
+    if failed:
+        return _newReport(
+            path,
+            Status.FAILED,
+            nodes=nodes,
+            error="Some nodes failed to upgrade, scene not saved.",
+            duration=profiling.timer() - start,
+        )
+    if not nodes:
+        return _newReport(
+            path, Status.UP_TO_DATE, duration=profiling.timer() - start
+        )
+    if dry_run:
+        return _newReport(
+            path, Status.OUTDATED, nodes=nodes, duration=profiling.timer() - start
+        )
+
+    try:
+        _saveScene(path)
+    except Exception as excp:
+        logger.debug("[migrateScene] {}".format(traceback.format_exc()))
+        return _newReport(
+            path,
+            Status.FAILED,
+            nodes=nodes,
+            error="Cannot save scene: {!r}".format(excp),
+            duration=profiling.timer() - start,
+        )
+
+    return _newReport(
+        path, Status.UPGRADED, nodes=nodes, duration=profiling.timer() - start
+    )
+
+
+def runWorker(argv):
+    # type: (List[str]) -> int
+    """
+    Entry point of the Katana sessions started by ``migrateScenes``: migrate the
+    given scenes one after the other and append their report to a json-lines file.
+
+    Returns:
+        exit code: 1 if a scene failed.
+    """
+    parser = argparse.ArgumentParser(prog="katananodling.batch worker")
+    parser.add_argument("--report", required=True, help="json-lines file to append")
+    parser.add_argument("--package", dest="packages", action="append", default=[])
+    parser.add_argument("--dry-run", action="store_true")
+    parser.add_argument("scenes", nargs="+")
+    args = parser.parse_args(argv)
+
+    from . import loader
+
+    # the libraries may already be registered by the studio startup scripts
+    if not loader.REGISTERED:
+        loader.registerNodesFor(args.packages)
+
+    exit_code = 0
+    for path in args.scenes:
+        report = migrateScene(path, dry_run=args.dry_run)
+        with open(args.report, "a") as report_file:
+            report_file.write(json.dumps(report, sort_keys=True) + "\n")
+        if report["status"] == Status.FAILED:
+            exit_code = 1
+
+    return exit_code
+
+
+def _readReports(path):
+    # type: (str) -> List[Dict[str, Any]]
+    """
+    Returns:
+        reports of the given json-lines file, ignoring the invalid lines (like the
+        last one if the writing process crashed).
+    """
+    reports = list()
+    if not os.path.exists(path):
+        return reports
+
+    with open(path, "r") as report_file:
+        for line in report_file:
+            try:
+                reports.append(json.loads(line))
+            except ValueError:
+                continue
+    return reports
+
+
+def readProgress(path):
+    # type: (str) -> Dict[str, Dict[str, Any]]
+    """
+    Args:
+        path: progress file written by ``migrateScenes``
+
+    Returns:
+        last report per scene path.
+    """
+    return dict((report["path"], report) for report in _readReports(path))
+
+
+def _runKatanaWorker(scene_paths, katana, packages, dry_run, directory):
+    # type: (List[str], str, Sequence[str], bool, str) -> List[Dict[str, Any]]
+    """
+    Migrate the given scenes in a new headless Katana session.
+    """
+    handle, report_path = tempfile.mkstemp(dir=directory, suffix=".jsonl")
+    os.close(handle)
+
+    command = [
+        katana,
+        "--script",
+        os.path.join(directory, "worker.py"),
+        "--report",
+        report_path,
+    ]
+    for package_id in packages:
+        command += ["--package", package_id]
+    if dry_run:
+        command.append("--dry-run")
+    command += scene_paths
+
+    env = os.environ.copy()
+    env[c.Env.BATCH_MODE] = "1"
+    # make sure the worker script can import this package
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(
+        [root] + [path for path in env.get("PYTHONPATH", "").split(os.pathsep) if path]
+    )
+
+    logger.debug("[_runKatanaWorker] {}".format(" ".join(command)))
+    process = subprocess.Popen(
+        command, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+    )
+    output = process.communicate()[0]
+
+    reports = _readReports(report_path)
+    if process.returncode and len(reports) < len(scene_paths):
+        output = output.decode("utf-8", "replace").splitlines()
+        logger.error(
+            "[_runKatanaWorker] Katana exited with code {}:\n{}".format(
+                process.returncode, "\n".join(output[-20:])
+            )
+        )
+    return reports
+
+
+def _runChunk(runner, scene_paths):
+    # type: (Runner, List[str]) -> List[Dict[str, Any]]
+    """
+    Returns:
+        one report per given scene, scenes the runner didn't report on are failed.
+    """
+    try:
+        reports = runner(scene_paths)
+    except Exception as excp:
+        logger.error(
+            "[_runChunk] Cannot migrate {} scenes: {}\n{}".format(
+                len(scene_paths), excp, traceback.format_exc()
+            )
+        )
+        reports = list()
+
+    reported = set(report["path"] for report in reports)
+    for path in scene_paths:
+        if path not in reported:
+            reports.append(
+                _newReport(path, Status.FAILED, error="Worker crashed or was killed.")
+            )
+    return reports
+
+
+def migrateScenes(
+    paths,
+    packages,
+    katana="katana",
+    processes=None,
+    chunk_size=c.BATCH_CHUNK_SIZE,
+    progress_path=None,
+    dry_run=False,
+    runner=None,
+):
+    # type: (Iterable[str], Sequence[str], str, Optional[int], int, Optional[str], bool, Optional[Runner]) -> List[Dict[str, Any]]
+    """
+    Upgrade the outdated BaseCustomNode of all the given scenes, in parallel.
+
+    Args:
+        paths: scene files, or directories searched recursively for scene files
+        packages: importable python names of the libraries to upgrade the nodes of
+        katana: path to the Katana executable used to migrate the scenes
+        processes: number of Katana sessions running at the same time, default
+            to the number of CPUs
+        chunk_size: maximum number of scenes migrated per Katana session
+        progress_path:
+            json-lines file to record the report of each scene in. If it exists,
+            the scenes it reports as done, and not modified since, are skipped.
+        dry_run: True to only report which nodes would be upgraded
+        runner:
+            callable migrating a list of scenes and returning their reports,
+            default to starting a Katana session running ``runWorker``.
+
+    Returns:
+        report per scene, see ``migrateScene``, in the order of the given paths.
+    """
+    class_versions = getClassVersions(packages)
+    progress = readProgress(progress_path) if progress_path else dict()
+
+    reports = dict()  # type: Dict[str, Dict[str, Any]]
+    scene_paths = list()
+    pending = list()
+    resumed = 0
+
+    def record(report):
+        fingerprint = getFileFingerprint(report["path"])
+        report["fingerprint"] = list(fingerprint) if fingerprint else None
+        reports[report["path"]] = report
+        if progress_path and not dry_run:
+            with open(progress_path, "a") as progress_file:
+                progress_file.write(json.dumps(report, sort_keys=True) + "\n")
+
+    for path in scanner.iterSceneFiles(paths):
+
+        path = os.path.abspath(path)
+        scene_paths.append(path)
+
+        previous = progress.get(path)
+        if previous and previous["status"] in Status.DONE:
+            fingerprint = getFileFingerprint(path)
+            if fingerprint and previous.get("fingerprint") == list(fingerprint):
+                reports[path] = previous
+                resumed += 1
+                continue
+
+        try:
+            outdated = getOutdatedNodes(path, class_versions)
+        except Exception as excp:
+            record(
+                _newReport(path, Status.FAILED, error="Cannot scan: {!r}".format(excp))
+            )
+            continue
+
+        if outdated:
+            pending.append(path)
+        else:
+            record(_newReport(path, Status.UP_TO_DATE))
+
+    logger.info(
+        "[migrateScenes] {} scenes to migrate on {} ({} already done).".format(
+            len(pending), len(scene_paths), resumed
+        )
+    )
+
+    chunks = [
+        pending[index : index + chunk_size]
+        for index in range(0, len(pending), chunk_size)
+    ]
+    processes = min(processes or multiprocessing.cpu_count(), len(chunks))
+
+    tmp_dir = None
+    if runner is None:
+        tmp_dir = tempfile.mkdtemp(prefix="katananodling_batch_")
+        with open(os.path.join(tmp_dir, "worker.py"), "w") as script_file:
+            script_file.write(c.BATCH_WORKER_SCRIPT)
+
+        def runner(chunk):
+            return _runKatanaWorker(chunk, katana, packages, dry_run, tmp_dir)
+
+    try:
+        if processes > 1:
+            # the work is done in the Katana processes, threads are enough to
+            # wait for them
+            pool = multiprocessing.pool.ThreadPool(processes)
+            try:
+                for chunk_reports in pool.imap_unordered(
+                    lambda chunk: _runChunk(runner, chunk), chunks
+                ):
+                    for report in chunk_reports:
+                        record(report)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            for chunk in chunks:
+                for report in _runChunk(runner, chunk):
+                    record(report)
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return [reports[path] for path in scene_paths]
+
+
+def getSummary(reports):
+    # type: (Iterable[Dict[str, Any]]) -> Dict[str, int]
+    """
+    Returns:
+        number of scenes and of nodes per status.
+    """
+    summary = dict()
+    for report in reports:
+        status = report["status"]
+        summary[status] = summary.get(status, 0) + 1
+        key = "{}_nodes".format(status)
+        summary[key] = summary.get(key, 0) + len(report["nodes"])
+    return summary
+
+
+def main(argv=None):
+    # type: (Optional[List[str]]) -> int
+    """
+    Command line entry point, see ``--help``.
+
+    Returns:
+        exit code: 1 if a scene failed.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m katananodling.batch",
+        description="Upgrade the outdated BaseCustomNode of Katana scene files, in "
+        "parallel headless Katana sessions.",
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="scene files or directories to search recursively"
+    )
+    parser.add_argument(
+        "--package",
+        dest="packages",
+        action="append",
+        required=True,
+        help="python name of a library to upgrade the nodes of, can be used "
+        "multiple times",
+    )
+    parser.add_argument(
+        "--katana", default="katana", help="path to the Katana executable"
+    )
+    parser.add_argument(
+        "--processes", type=int, help="number of Katana sessions running in parallel"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=c.BATCH_CHUNK_SIZE,
+        help="number of scenes per Katana session",
+    )
+    parser.add_argument(
+        "--progress", help="json-lines file to resume from and record progress in"
+    )
+    parser.add_argument(
+        "--report", help="json file to write the report of all the scenes to"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only report what would be upgraded"
+    )
+    args = parser.parse_args(argv)
+
+    reports = migrateScenes(
+        args.paths,
+        args.packages,
+        katana=args.katana,
+        processes=args.processes,
+        chunk_size=args.chunk_size,
+        progress_path=args.progress,
+        dry_run=args.dry_run,
+    )
+    summary = getSummary(reports)
+    if args.report:
+        writeFileAtomically(
+            args.report,
+            json.dumps(
+                {"scenes": reports, "summary": summary}, indent=4, sort_keys=True
+            ),
+        )
+
+    sys.stdout.write(json.dumps(summary, sort_keys=True) + "\n")
+    return 1 if summary.get(Status.FAILED) else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
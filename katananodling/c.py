@@ -51,6 +51,17 @@ class Env:
     List separator is the system path separator (``;`` or ``:``):
 
     ex: ``"Lxm*;SceneGenerator[12];PointWidth"``
+    
+    Patterns can also be prefixed by ``module=`` or ``author=`` to match the python
+    module the class is defined in or its author, instead of its class name.
+    
+    ex: ``"module=studiolib.deprecated.*;author=*Liam*"``
+    """
+
+    INCLUDED_NODES = "{}_INCLUDED_NODES".format(_PREFIX)
+    """
+    Same syntax as ``EXCLUDED_NODES``, but if not empty, only the CustomNodes matching
+    one of these patterns are registered. ``EXCLUDED_NODES`` still apply on them.
     """
 
     UPGRADE_DISABLE = "{}_UPGRADE_DISABLE".format(_PREFIX)
@@ -67,12 +78,81 @@ class Env:
     BaseCustomNode parameters. Params that are usually hidden are made visible.
     """
 
+    LAZY_LOADING = "{}_LAZY_LOADING".format(_PREFIX)
+    """
+    Set to 1 (or actually to anythin non-empty) to register the BaseCustomNode from
+    the library manifest (see ``MANIFEST_FILENAME``) without importing the library.
+    
+    Libraries without a manifest have their source files statically parsed instead
+    (see ``discovery.py``). In both cases the python module defining a node is only
+    imported the first time the node is created or loaded from a scene.
+    """
+
+    REGISTRY_CACHE = "{}_REGISTRY_CACHE".format(_PREFIX)
+    """
+    Path to a json file used to cache the BaseCustomNode found in each library, so
+    the next sessions can register them without importing and validating the libraries.
+    
+    The cache is invalidated per source file, using their modification time and size.
+    Leave empty to disable the cache.
+    """
+
+    PROFILE_PATH = "{}_PROFILE_PATH".format(_PREFIX)
+    """
+    Path to a json file to write the time spent registering the BaseCustomNode to,
+    per library and per node. See ``profiling.py``. Leave empty to not write it.
+    """
+
+    PROTOTYPE_CACHE = "{}_PROTOTYPE_CACHE".format(_PREFIX)
+    """
+    Path to a directory where the prototype of the BaseCustomNode using
+    ``use_prototype_cache`` are persisted between sessions. See ``prototype.py``.
+    Leave empty to only keep them in memory.
+    """
+
+    BATCH_MODE = "{}_BATCH_MODE".format(_PREFIX)
+    """
+    Set to 1 to force the batch profile, to 0 to disable it. If empty, it's
+    enabled when Katana runs without UI (batch/render-boot).
+    
+    In batch mode only the node types used in the scene passed with
+    ``--katana-file`` are registered (lazily), and no event handlers are registered
+    (no upgrade, no debug mode).
+    """
+
+    LUA_BUNDLE = "{}_LUA_BUNDLE".format(_PREFIX)
+    """
+    Path to a lua file generated with ``luabundle.writeBundle()``, preloading the lua
+    modules of all the OpScriptCustomNode.
+    
+    If set when an OpScriptCustomNode is created, its OpScript loads its lua module
+    from the bundle instead of looking for it on the ``LUA_PATH``. Also read by
+    the OpScript at cook time so the farm can use another path.
+    """
+
+    CONFIG = "{}_CONFIG".format(_PREFIX)
+    """
+    List of paths to json or toml configuration files (ex: one per show then one per
+    user) setting the same options as the above variables. See ``config.py``.
+    
+    List separator is the system path separator (``;`` or ``:``). Files later in the
+    list override the previous ones, and the above variables override the files.
+    """
+
     @classmethod
     def __all__(cls):
         # type: () -> List[str]
         return [
+            cls.BATCH_MODE,
+            cls.CONFIG,
             cls.EXCLUDED_NODES,
+            cls.INCLUDED_NODES,
+            cls.LAZY_LOADING,
+            cls.LUA_BUNDLE,
             cls.NODE_PARAM_DEBUG,
+            cls.PROFILE_PATH,
+            cls.PROTOTYPE_CACHE,
+            cls.REGISTRY_CACHE,
             cls.UPGRADE_DISABLE,
         ]
 
@@ -87,6 +167,10 @@ class Env:
     @classmethod
     def get(cls, key, default=None):
         # type: (str, Any) -> Optional[str]
+        """
+        Read the environment variable now. Prefer ``config.getConfig()`` that also
+        read the configuration files and is resolved once.
+        """
         import os  # defer import for the first time we actually need it
 
         return os.environ.get(key, default)
@@ -98,6 +182,15 @@ As each BaseCustomNode is registered as a separate node type, to quickly find al
 tool, they are assigned a flavor using ``NodegraphAPI.AddNodeFlavor()``
 """
 
+MANIFEST_FILENAME = "nodling.manifest.json"
+"""
+Name of the file, at the root of a library package directory, describing the
+BaseCustomNode it provides. Used to register them without importing the library
+(see ``Env.LAZY_LOADING``).
+
+Can be generated using ``loader.writeManifestFor()``.
+"""
+
 KATANA_TYPE_NAME = "CustomNode"
 """
 Name used to register the base class for all BaseCustomNodes using 
@@ -111,6 +204,17 @@ Shortcut to use in the Nodegraph to make the LayeredMenu appears.
 This is the LayeredMenu for ALL the tools that might be disabled.
 """
 
+LAYEREDMENU_SEARCH_LIMIT = 25
+"""
+Maximum number of nodes returned by a search in the LayeredMenu index.
+"""
+
+BATCH_CHUNK_SIZE = 10
+"""
+Number of scenes migrated by each Katana session started by ``batch.migrateScenes``,
+to not pay the Katana startup for every scene.
+"""
+
 
 OPEN_DOCUMENTATION_SCRIPT = """
 import os.path
@@ -134,3 +238,39 @@ if not doc_path:
 if doc_path:
     webbrowser.open(doc_path)
 """
+
+DEBUG_DATA_SCRIPT = """
+parameter.getParent().getChild("data").setValue(node._getDebugData(), 0)
+"""
+
+
+LUA_REQUIRE_SCRIPT = """
+local script = require("{MODULE}")
+script()
+"""
+"""
+OpScript code to run the lua module of an OpScriptCustomNode.
+"""
+
+LUA_BUNDLE_LOAD_SCRIPT = """
+if not package.loaded["{BUNDLE_FLAG}"] then
+  local bundle = os.getenv("{BUNDLE_ENV}") or "{BUNDLE}"
+  -- fallback on the LUA_PATH if the bundle cannot be loaded
+  pcall(dofile, bundle)
+  package.loaded["{BUNDLE_FLAG}"] = true
+end
+"""
+"""
+OpScript code to load the lua bundle before requiring modules (once per lua state).
+"""
+
+BATCH_WORKER_SCRIPT = """
+import sys
+
+from katananodling import batch
+
+sys.exit(batch.runWorker(sys.argv[1:]))
+"""
+"""
+Script run with ``katana --script`` by ``batch.migrateScenes`` to migrate scenes.
+"""
@@ -0,0 +1,266 @@
+"""
+Persistent on-disk cache of the BaseCustomNode discovered in libraries.
+
+Allow to register nodes on the next Katana sessions without having to import and
+validate the libraries again, as long as their source files didn't change.
+"""
+import json
+import logging
+import os
+import tempfile
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Set
+from typing import Tuple
+
+from . import c
+from .registry import NodeEntry
+
+__all__ = (
+    "RegistryCache",
+    "getFileFingerprint",
+    "getLibraryFiles",
+    "replaceFile",
+    "writeFileAtomically",
+)
+
+logger = logging.getLogger(__name__)
+
+Fingerprint = Tuple[float, int]
+
+
+def getFileFingerprint(path):
+    # type: (str) -> Optional[Fingerprint]
+    """
+    Returns:
+        cheap to compute value that change when the file is modified, or None if
+        the file doesn't exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime, stat.st_size
+
+
+def getLibraryFiles(package_directory):
+    # type: (str) -> List[str]
+    """
+    Returns:
+        absolute path of all the python files in the given directory, recursively.
+    """
+    out = list()
+    package_directory = os.path.abspath(package_directory)
+    for dirpath, dirnames, filenames in os.walk(package_directory):
+        dirnames[:] = [dirname for dirname in dirnames if dirname != "__pycache__"]
+        for filename in filenames:
+            if filename.endswith(".py"):
+                out.append(os.path.join(dirpath, filename))
+    return out
+
+
+def replaceFile(source, path):
+    # type: (str, str) -> None
+    """
+    Move the given file to the given path, overwriting it. Atomic if both are on
+    the same filesystem.
+    """
+    replace = getattr(os, "replace", None)  # python-2 doesn't have it
+    if replace:
+        replace(source, path)
+        return
+    if os.path.exists(path) and os.name == "nt":
+        os.remove(path)
+    os.rename(source, path)
+
+
+def writeFileAtomically(path, content):
+    # type: (str, str) -> None
+    """
+    Write the given content so the file is never observed half-written by concurrent
+    processes (like multiple Katana sessions starting at the same time).
+    """
+    directory = os.path.dirname(path) or "."
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    handle, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "w") as tmp_file:
+            tmp_file.write(content)
+        replaceFile(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return
+
+
+class RegistryCache(object):
+    """
+    Store, per library, the nodes it provides grouped by the source file they are
+    defined in, with the fingerprint of those files.
+
+    A modified file only invalidate the nodes defined in it. The statically parsed
+    content of each file can also be stored so only the modified files have to be
+    parsed again.
+
+    Args:
+        path: json file to read the cache from and to write it to.
+    """
+
+    def __init__(self, path):
+        # type: (str) -> None
+        self.path = path
+        self.modified = False
+        self._packages = dict()  # type: Dict[str, Dict[str, dict]]
+        self.read()
+
+    def read(self):
+        """
+        Read the cache from disk, discarding it if it has been written by another
+        version of this package.
+        """
+        self._packages = dict()
+        if not os.path.isfile(self.path):
+            return
+
+        try:
+            with open(self.path, "r") as cache_file:
+                content = json.load(cache_file)
+        except Exception as excp:
+            logger.warning(
+                "[RegistryCache][read] Discarding unreadable cache <{}>: {}"
+                "".format(self.path, excp)
+            )
+            return
+
+        if content.get("api_version") != c.__version__:
+            logger.debug(
+                "[RegistryCache][read] Discarding cache from api_version <{}>"
+                "".format(content.get("api_version"))
+            )
+            return
+
+        self._packages = content.get("packages", dict())
+        return
+
+    def write(self):
+        """
+        Write the cache to disk if it has been modified since it was read.
+        """
+        if not self.modified:
+            return
+        content = {"api_version": c.__version__, "packages": self._packages}
+        writeFileAtomically(self.path, json.dumps(content, indent=1, sort_keys=True))
+        self.modified = False
+        logger.debug("[RegistryCache][write] Wrote <{}>".format(self.path))
+        return
+
+    def getEntries(self, package_id, package_files):
+        # type: (str, Iterable[str]) -> Tuple[List[Tuple[NodeEntry, bool]], Set[str]]
+        """
+        Args:
+            package_id: name of the library
+            package_files: all the python source files currently in the library
+
+        Returns:
+            - (entry, is_valid) for all the cached nodes whose file didn't change
+            - files that changed since they were cached (added, modified or removed)
+        """
+        cached_files = self._packages.get(package_id, dict())
+        stale = set(path for path in package_files if path not in cached_files)
+        entries = list()
+
+        for path, file_cache in cached_files.items():
+
+            fingerprint = getFileFingerprint(path)
+            if fingerprint is None or list(fingerprint) != file_cache["fingerprint"]:
+                stale.add(path)
+                continue
+
+            for data in file_cache["nodes"]:
+                entries.append((NodeEntry.fromDict(data), data["valid"]))
+
+        return entries, stale
+
+    def getModules(self, package_id, paths):
+        # type: (str, Iterable[str]) -> Dict[str, Dict]
+        """
+        Args:
+            package_id: name of the library
+            paths: source files to get the parsed content of, must not be stale
+
+        Returns:
+            parsed content per file, see ``discovery.ModuleInfo.asdict``, for the
+            given files that have one stored.
+        """
+        cached_files = self._packages.get(package_id, dict())
+        out = dict()
+        for path in paths:
+            module = cached_files.get(path, dict()).get("module")
+            if module is not None:
+                out[path] = module
+        return out
+
+    @staticmethod
+    def _toFileCache(path, entries, module=None):
+        # type: (str, List[Tuple[NodeEntry, bool]], Optional[Dict]) -> Dict
+        nodes = list()
+        for entry, valid in entries:
+            data = entry.asdict()
+            data["valid"] = valid
+            nodes.append(data)
+        fingerprint = getFileFingerprint(path)
+        # stored as list to compare the same before and after a json round-trip
+        fingerprint = list(fingerprint) if fingerprint is not None else None
+        file_cache = {"fingerprint": fingerprint, "nodes": nodes}
+        if module is not None:
+            file_cache["module"] = module
+        return file_cache
+
+    def setEntries(self, package_id, package_files, entries, modules=None):
+        # type: (str, Iterable[str], Dict[str, List[Tuple[NodeEntry, bool]]], Optional[Dict[str, Dict]]) -> None
+        """
+        Replace the cache for the given library.
+
+        Args:
+            package_id: name of the library
+            package_files: all the python source files currently in the library
+            entries: (entry, is_valid) grouped per source file they are defined in.
+            modules: parsed content per source file, see ``getModules``
+        """
+        modules = modules or dict()
+        cached_files = dict()
+        for path in set(package_files).union(entries.keys()):
+            cached_files[path] = self._toFileCache(
+                path, entries.get(path, list()), modules.get(path)
+            )
+        self._packages[package_id] = cached_files
+        self.modified = True
+        return
+
+    def updateEntries(self, package_id, package_files, entries):
+        # type: (str, Iterable[str], Dict[str, List[Tuple[NodeEntry, bool]]]) -> None
+        """
+        Replace the cache of only the given files of the library, the cache of the
+        files that don't exist anymore is removed.
+
+        Args:
+            package_id: name of the library
+            package_files: all the python source files currently in the library
+            entries:
+                (entry, is_valid) grouped per source file they are defined in, for
+                the files to update (with an empty list for files without node).
+        """
+        package_files = set(package_files)
+        cached_files = self._packages.setdefault(package_id, dict())
+        for path in list(cached_files.keys()):
+            if path not in package_files:
+                del cached_files[path]
+        for path, file_entries in entries.items():
+            cached_files[path] = self._toFileCache(path, file_entries)
+        self.modified = True
+        return
@@ -0,0 +1,331 @@
+"""
+Configuration of the package, resolved once into an immutable snapshot from the
+environment variables (see ``c.Env``) and optional configuration files.
+
+Configuration files are listed in ``c.Env.CONFIG`` and can be json or toml. They use
+the setting names as keys::
+
+    {
+        "lazy_loading": true,
+        "excluded_nodes": ["module=studiolib.deprecated.*", "author=*Liam*"],
+        "registry_cache": "~/.katananodling/registry.json"
+    }
+
+Priority, from lowest to highest : default values, files in their order in
+``c.Env.CONFIG``, environment variables.
+
+Example::
+
+    from katananodling import config
+
+    if config.getConfig().upgrade_disable:
+        ...
+    # after modifying the environment
+    config.refreshConfig()
+"""
+import json
+import logging
+import os
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Tuple
+
+from . import c
+from .util import TEXT_TYPES
+
+__all__ = (
+    "Config",
+    "SETTINGS",
+    "Setting",
+    "getConfig",
+    "loadConfig",
+    "readConfigFile",
+    "refreshConfig",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _toFlag(value, from_env):
+    # type: (Any, bool) -> bool
+    if from_env:
+        # anything non-empty, see c.Env
+        return True if value else False
+    if not isinstance(value, (bool, int)):
+        raise TypeError("expected a bool, got <{!r}>".format(value))
+    return bool(value)
+
+
+def _toOptionalFlag(value, from_env):
+    # type: (Any, bool) -> Optional[bool]
+    if from_env:
+        return value != "0"
+    if value is None:
+        return None
+    return _toFlag(value, from_env)
+
+
+def _toPath(value, from_env):
+    # type: (Any, bool) -> Optional[str]
+    if not value:
+        return None
+    if not isinstance(value, TEXT_TYPES):
+        raise TypeError("expected a str, got <{!r}>".format(value))
+    if from_env:
+        return value
+    return os.path.expandvars(os.path.expanduser(value))
+
+
+def _toPatterns(value, from_env):
+    # type: (Any, bool) -> Tuple[str, ...]
+    if isinstance(value, TEXT_TYPES):
+        value = value.split(os.pathsep)
+    if not isinstance(value, (list, tuple)):
+        raise TypeError("expected a list of str, got <{!r}>".format(value))
+    return tuple(str(pattern) for pattern in value if pattern)
+
+
+class Setting(object):
+    """
+    Declaration of a configuration value.
+
+    Args:
+        name: attribute name on the Config and key in the configuration files
+        env: name of the environment variable overriding it
+        converter: convert a raw value to its type, raise if invalid
+        default: value if not configured
+    """
+
+    __slots__ = ("name", "env", "converter", "default")
+
+    def __init__(self, name, env, converter, default):
+        # type: (str, str, Callable[[Any, bool], Any], Any) -> None
+        self.name = name
+        self.env = env
+        self.converter = converter
+        self.default = default
+
+    def __repr__(self):
+        return "<{} {}>".format(self.__class__.__name__, self.name)
+
+
+SETTINGS = (
+    Setting("batch_mode", c.Env.BATCH_MODE, _toOptionalFlag, None),
+    Setting("excluded_nodes", c.Env.EXCLUDED_NODES, _toPatterns, ()),
+    Setting("included_nodes", c.Env.INCLUDED_NODES, _toPatterns, ()),
+    Setting("lazy_loading", c.Env.LAZY_LOADING, _toFlag, False),
+    Setting("lua_bundle", c.Env.LUA_BUNDLE, _toPath, None),
+    Setting("node_param_debug", c.Env.NODE_PARAM_DEBUG, _toFlag, False),
+    Setting("profile_path", c.Env.PROFILE_PATH, _toPath, None),
+    Setting("prototype_cache", c.Env.PROTOTYPE_CACHE, _toPath, None),
+    Setting("registry_cache", c.Env.REGISTRY_CACHE, _toPath, None),
+    Setting("upgrade_disable", c.Env.UPGRADE_DISABLE, _toFlag, False),
+)  # type: Tuple[Setting, ...]
+"""
+All the configuration values, see the corresponding ``c.Env`` variable for what
+they do.
+"""
+
+_SETTINGS_BY_NAME = dict(
+    (setting.name, setting) for setting in SETTINGS
+)  # type: Dict[str, Setting]
+
+
+class Config(object):
+    """
+    Immutable snapshot of the configuration, each setting is a plain attribute.
+
+    Args:
+        values: value per setting name, missing ones use their default
+        sources: where each value comes from, per setting name
+        files: configuration files that were read
+    """
+
+    __slots__ = tuple(setting.name for setting in SETTINGS) + ("sources", "files")
+
+    def __init__(self, values=None, sources=None, files=()):
+        # type: (Optional[Dict[str, Any]], Optional[Dict[str, str]], Tuple[str, ...]) -> None
+        values = values or dict()
+        sources = sources or dict()
+        for setting in SETTINGS:
+            object.__setattr__(
+                self, setting.name, values.get(setting.name, setting.default)
+            )
+        object.__setattr__(
+            self,
+            "sources",
+            dict(
+                (setting.name, sources.get(setting.name, "default"))
+                for setting in SETTINGS
+            ),
+        )
+        object.__setattr__(self, "files", tuple(files))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("{} is immutable".format(self.__class__.__name__))
+
+    def __repr__(self):
+        return "<{} {}>".format(self.__class__.__name__, self.asdict())
+
+    def getSource(self, name):
+        # type: (str) -> str
+        """
+        Returns:
+            ``default``, ``file:<path>`` or ``env:<variable>``
+        """
+        return self.sources[name]
+
+    def asdict(self, with_sources=False):
+        # type: (bool) -> Dict[str, Any]
+        """
+        Args:
+            with_sources: True to have (value, source) as dict values
+
+        Returns:
+            json serializable representation of the snapshot.
+        """
+        out = dict()
+        for setting in SETTINGS:
+            value = getattr(self, setting.name)
+            if isinstance(value, tuple):
+                value = list(value)
+            if with_sources:
+                value = (value, self.sources[setting.name])
+            out[setting.name] = value
+        return out
+
+
+def _readToml(path):
+    # type: (str) -> Dict[str, Any]
+    try:
+        import tomllib  # python >= 3.11
+    except ImportError:
+        try:
+            import toml
+        except ImportError:
+            raise ImportError(
+                "No toml parser available: requires python>=3.11 or the toml package."
+            )
+        with open(path, "r") as config_file:
+            return toml.load(config_file)
+
+    with open(path, "rb") as config_file:
+        return tomllib.load(config_file)
+
+
+def readConfigFile(path):
+    # type: (str) -> Dict[str, Any]
+    """
+    Args:
+        path: path to an existing json or toml file
+
+    Returns:
+        raw content of the given configuration file.
+
+    Raises:
+        ValueError: if the file doesn't contain a mapping or is of unknown format.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".toml":
+        content = _readToml(path)
+    elif extension == ".json":
+        with open(path, "r") as config_file:
+            content = json.load(config_file)
+    else:
+        raise ValueError("Unsupported configuration file format <{}>".format(path))
+
+    if not isinstance(content, dict):
+        raise ValueError("Configuration file <{}> is not a mapping".format(path))
+    return content
+
+
+def loadConfig(environ=None, paths=None):
+    # type: (Optional[Mapping[str, str]], Optional[List[str]]) -> Config
+    """
+    Resolve the configuration. Invalid files and values are logged and ignored.
+
+    Args:
+        environ: environment variables to use, default to ``os.environ``
+        paths: configuration files to read, default to the ones in ``c.Env.CONFIG``
+
+    Returns:
+        new configuration snapshot.
+    """
+    environ = os.environ if environ is None else environ
+    if paths is None:
+        paths = environ.get(c.Env.CONFIG, "").split(os.pathsep)
+    paths = [path for path in paths if path]
+
+    values = dict()
+    sources = dict()
+    files = list()
+
+    for path in paths:
+        try:
+            content = readConfigFile(path)
+        except Exception as excp:
+            logger.error("[loadConfig] Cannot read <{}>: {}".format(path, excp))
+            continue
+        files.append(path)
+
+        for key, raw_value in content.items():
+            setting = _SETTINGS_BY_NAME.get(key)
+            if setting is None:
+                logger.warning(
+                    "[loadConfig] Unknown setting <{}> in <{}>".format(key, path)
+                )
+                continue
+            try:
+                values[key] = setting.converter(raw_value, False)
+            except (TypeError, ValueError) as excp:
+                logger.error(
+                    "[loadConfig] Invalid <{}> in <{}>: {}".format(key, path, excp)
+                )
+                continue
+            sources[key] = "file:{}".format(path)
+
+    for setting in SETTINGS:
+        raw_value = environ.get(setting.env)
+        if not raw_value:
+            continue
+        values[setting.name] = setting.converter(raw_value, True)
+        sources[setting.name] = "env:{}".format(setting.env)
+
+    return Config(values, sources, tuple(files))
+
+
+_CONFIG = None  # type: Optional[Config]
+
+
+def getConfig():
+    # type: () -> Config
+    """
+    Returns:
+        the current configuration snapshot, resolved on first call.
+    """
+    if _CONFIG is None:
+        return refreshConfig()
+    return _CONFIG
+
+
+def refreshConfig(environ=None, paths=None):
+    # type: (Optional[Mapping[str, str]], Optional[List[str]]) -> Config
+    """
+    Resolve the configuration again, to apply changes made to the environment or to
+    the configuration files. See ``loadConfig`` for arguments.
+
+    Returns:
+        the new current configuration snapshot.
+    """
+    global _CONFIG
+    _CONFIG = loadConfig(environ=environ, paths=paths)
+    logger.debug(
+        "[refreshConfig] {}".format(
+            json.dumps(_CONFIG.asdict(with_sources=True), indent=4, sort_keys=True)
+        )
+    )
+    return _CONFIG
@@ -0,0 +1,638 @@
+"""
+Static discovery of BaseCustomNode subclasses in a library, by parsing its python
+source files without executing them.
+"""
+import ast
+import logging
+import os
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from . import c
+from . import util
+from .cache import getLibraryFiles
+from .registry import NodeEntry
+
+__all__ = (
+    "BASE_CLASS_NAMES",
+    "ClassInfo",
+    "ModuleInfo",
+    "discoverNodesInDirectory",
+    "discoverNodesInModules",
+    "parseDirectory",
+    "parseModule",
+)
+
+logger = logging.getLogger(__name__)
+
+
+BASE_CLASS_NAMES = ("BaseCustomNode", "OpScriptCustomNode")
+"""
+Name of the classes, defined in ``entities``, that a class must inherit from to be
+considered a BaseCustomNode.
+"""
+
+NODE_ATTRIBUTES = (
+    "name",
+    "version",
+    "color",
+    "description",
+    "author",
+    "category",
+)
+"""
+BaseCustomNode class attributes that are statically extracted.
+"""
+
+DEFAULT_ATTRIBUTES = {
+    "name": c.KATANA_TYPE_NAME,
+    "version": (0, 0, 0),
+    "color": None,
+    "description": "",
+    "author": "",
+    "category": "",
+}  # type: Dict[str, Any]
+
+
+class _Unresolved(object):
+    """
+    Placeholder for an attribute whose value can only be known by executing the code.
+    """
+
+    def __repr__(self):
+        return "<unresolved>"
+
+
+UNRESOLVED = _Unresolved()
+
+
+ClassKey = Tuple[str, str]
+"""
+(module, name) identifying a class of the library.
+"""
+
+
+class ClassInfo(object):
+    """
+    Statically extracted information about a python class.
+
+    Args:
+        name: name of the class
+        module: importable python name of the module defining the class
+        path: absolute path of the file defining the class
+        bases:
+            name of the base classes as written in the module, ex: ``"StudioNode"``
+            or ``"entities.BaseCustomNode"``
+        attributes: node attributes found on the class, value might be ``UNRESOLVED``
+    """
+
+    def __init__(self, name, module, path, bases, attributes):
+        # type: (str, str, str, List[str], Dict[str, Any]) -> None
+        self.name = name
+        self.module = module
+        self.path = path
+        self.bases = bases
+        self.attributes = attributes
+
+    def __repr__(self):
+        return "<{} {}.{}>".format(self.__class__.__name__, self.module, self.name)
+
+    @property
+    def key(self):
+        # type: () -> ClassKey
+        return self.module, self.name
+
+
+class ModuleInfo(object):
+    """
+    Statically extracted information about a python module.
+
+    Args:
+        name: importable python name of the module
+        path: absolute path of the module file
+        imports:
+            names imported at the top level of the module, as
+            {local name: absolute qualified name}. ``from module import *`` is
+            stored as {"module.*": "module.*"}.
+        classes: classes defined at the top level of the module
+    """
+
+    def __init__(self, name, path, imports, classes):
+        # type: (str, str, Dict[str, str], List[ClassInfo]) -> None
+        self.name = name
+        self.path = path
+        self.imports = imports
+        self.classes = classes
+
+    def __repr__(self):
+        return "<{} {}>".format(self.__class__.__name__, self.name)
+
+    @property
+    def is_package(self):
+        # type: () -> bool
+        return os.path.splitext(os.path.basename(self.path))[0] == "__init__"
+
+    def asdict(self):
+        # type: () -> Dict[str, Any]
+        """
+        Returns:
+            json-serializable representation, see ``fromDict``.
+        """
+        classes = list()
+        for class_info in self.classes:
+            attributes = dict(
+                (key, value)
+                for key, value in class_info.attributes.items()
+                if value is not UNRESOLVED
+            )
+            unresolved = [
+                key
+                for key, value in class_info.attributes.items()
+                if value is UNRESOLVED
+            ]
+            classes.append(
+                {
+                    "name": class_info.name,
+                    "bases": class_info.bases,
+                    "attributes": attributes,
+                    "unresolved": sorted(unresolved),
+                }
+            )
+        return {"name": self.name, "imports": self.imports, "classes": classes}
+
+    @classmethod
+    def fromDict(cls, data, path):
+        # type: (Dict[str, Any], str) -> ModuleInfo
+        """
+        Args:
+            data: result of ``asdict``
+            path: absolute path of the module file
+        """
+        classes = list()
+        for class_data in data["classes"]:
+            attributes = dict(
+                (key, _toTuple(value))
+                for key, value in class_data["attributes"].items()
+            )
+            for key in class_data["unresolved"]:
+                attributes[key] = UNRESOLVED
+            classes.append(
+                ClassInfo(
+                    name=class_data["name"],
+                    module=data["name"],
+                    path=path,
+                    bases=list(class_data["bases"]),
+                    attributes=attributes,
+                )
+            )
+        return cls(
+            name=data["name"],
+            path=path,
+            imports=dict(data["imports"]),
+            classes=classes,
+        )
+
+
+def _toTuple(value):
+    # type: (Any) -> Any
+    """
+    Convert back the lists of a json-deserialized literal to tuples.
+    """
+    if isinstance(value, list):
+        return tuple(_toTuple(item) for item in value)
+    return value
+
+
+def _getDottedName(node):
+    # type: (ast.expr) -> Optional[str]
+    """
+    Return ``"module.Node"`` for ``module.Node``, None if not a (dotted) name.
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        owner = _getDottedName(node.value)
+        return "{}.{}".format(owner, node.attr) if owner else None
+    return None
+
+
+def _getBaseName(node):
+    # type: (ast.expr) -> Optional[str]
+    """
+    Return ``"Node"`` for ``Node``, ``module.Node`` or ``package.module.Node``.
+    """
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _evaluate(node):
+    # type: (ast.expr) -> Any
+    """
+    Get the value of the given expression if it's a literal or a reference to one of
+    the pre-defined colors (like ``BaseCustomNode.Colors.green``).
+    """
+    try:
+        return ast.literal_eval(node)
+    except ValueError:
+        pass
+
+    # BaseCustomNode.Colors.green, Colors.green, c.COLORS.green, ...
+    if isinstance(node, ast.Attribute):
+        owner = _getBaseName(node.value)
+        if owner in ("Colors", "COLORS") and hasattr(c.COLORS, node.attr):
+            return getattr(c.COLORS, node.attr)
+
+    return UNRESOLVED
+
+
+def _getImportedModule(statement, module_name, is_package):
+    # type: (ast.ImportFrom, str, bool) -> str
+    """
+    Returns:
+        absolute name of the module imported by the given ``from ... import``.
+    """
+    if not statement.level:
+        return statement.module or ""
+
+    parts = module_name.split(".")
+    if not is_package:
+        parts = parts[:-1]
+    if statement.level > 1:
+        parts = parts[: len(parts) - statement.level + 1]
+    if statement.module:
+        parts.append(statement.module)
+    return ".".join(parts)
+
+
+def parseModule(path, module_name):
+    # type: (str, str) -> ModuleInfo
+    """
+    Args:
+        path: absolute path to a python file
+        module_name: importable python name of the module
+
+    Returns:
+        the names imported and the classes defined at the top level of the module.
+    """
+    with open(path, "r") as module_file:
+        source = module_file.read()
+
+    tree = ast.parse(source, filename=path)
+    module_info = ModuleInfo(name=module_name, path=path, imports=dict(), classes=[])
+
+    for statement in tree.body:
+
+        if isinstance(statement, ast.Import):
+            for alias in statement.names:
+                if alias.asname:
+                    module_info.imports[alias.asname] = alias.name
+                else:
+                    # "import a.b" binds "a"
+                    top_name = alias.name.split(".")[0]
+                    module_info.imports[top_name] = top_name
+            continue
+
+        if isinstance(statement, ast.ImportFrom):
+            imported_module = _getImportedModule(
+                statement, module_name, module_info.is_package
+            )
+            for alias in statement.names:
+                if alias.name == "*":
+                    star_import = "{}.*".format(imported_module)
+                    module_info.imports[star_import] = star_import
+                    continue
+                module_info.imports[alias.asname or alias.name] = "{}.{}".format(
+                    imported_module, alias.name
+                )
+            continue
+
+        if not isinstance(statement, ast.ClassDef):
+            continue
+
+        attributes = dict()
+        for class_statement in statement.body:
+
+            if not isinstance(class_statement, ast.Assign):
+                continue
+
+            for target in class_statement.targets:
+                if isinstance(target, ast.Name) and target.id in NODE_ATTRIBUTES:
+                    attributes[target.id] = _evaluate(class_statement.value)
+
+        bases = [_getDottedName(base) for base in statement.bases]
+        module_info.classes.append(
+            ClassInfo(
+                name=statement.name,
+                module=module_name,
+                path=path,
+                bases=[base for base in bases if base],
+                attributes=attributes,
+            )
+        )
+
+    return module_info
+
+
+def _getModuleName(path, package_directory, package_name):
+    # type: (str, str, str) -> str
+    relative = os.path.relpath(path, package_directory)
+    parts = os.path.splitext(relative)[0].split(os.sep)
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join([package_name] + parts)
+
+
+def _resolveQualifiedName(qualified_name, modules, classes, _depth=0):
+    # type: (str, Dict[str, ModuleInfo], Dict[ClassKey, ClassInfo], int) -> Optional[ClassKey]
+    """
+    Returns:
+        the library class the given absolute name refers to, following re-exports
+        (like ``from .tool import ToolNode`` in a package ``__init__``), or None if
+        it's not a class of the library.
+    """
+    module_name, _, name = qualified_name.rpartition(".")
+    if (module_name, name) in classes:
+        return module_name, name
+
+    module_info = modules.get(module_name)
+    # also protect from circular re-exports
+    if module_info is None or _depth > 16:
+        return None
+
+    imported = module_info.imports.get(name)
+    if imported is None:
+        return None
+    return _resolveQualifiedName(imported, modules, classes, _depth + 1)
+
+
+def _getExportedClasses(module_name, modules, classes, _visited=None):
+    # type: (str, Dict[str, ModuleInfo], Dict[ClassKey, ClassInfo], Optional[set]) -> set
+    """
+    Returns:
+        the library classes found in the namespace of the given module once
+        imported: the ones it defines or imports, and the public ones of the modules
+        it star imports (``__all__`` is not taken into account).
+    """
+    visited = _visited or set()
+    visited.add(module_name)
+    module_info = modules.get(module_name)
+    if module_info is None:
+        return set()
+
+    out = set(class_info.key for class_info in module_info.classes)
+    for local_name, imported in module_info.imports.items():
+
+        if not local_name.endswith(".*"):
+            key = _resolveQualifiedName(imported, modules, classes)
+            if key is not None:
+                out.add(key)
+            continue
+
+        star_module = imported[: -len(".*")]
+        if star_module in visited:
+            continue
+        out.update(
+            key
+            for key in _getExportedClasses(star_module, modules, classes, visited)
+            if not key[1].startswith("_")
+        )
+
+    return out
+
+
+def _resolveBase(base, module_info, modules, classes):
+    # type: (str, ModuleInfo, Dict[str, ModuleInfo], Dict[ClassKey, ClassInfo]) -> Optional[ClassKey]
+    """
+    Returns:
+        the library class the given base name refers to in the given module, or None
+        if it's not a class of the library.
+    """
+    owner, _, attribute = base.partition(".")
+    if not attribute and (module_info.name, base) in classes:
+        return module_info.name, base
+
+    imported = module_info.imports.get(owner)
+    if imported is None:
+        return None
+    if attribute:
+        imported = "{}.{}".format(imported, attribute)
+    return _resolveQualifiedName(imported, modules, classes)
+
+
+def _resolveAttributes(class_info, classes, bases, _visited=None):
+    # type: (ClassInfo, Dict[ClassKey, ClassInfo], Dict[ClassKey, List[Optional[ClassKey]]], Optional[set]) -> Dict[str, Any]
+    """
+    Args:
+        class_info: class to get the attributes of
+        classes: all the classes of the library
+        bases: library base classes of each class, None for the external ones
+
+    Returns:
+        node attributes of the given class, including the inherited ones.
+    """
+    visited = _visited or set()
+    visited.add(class_info.key)
+    attributes = dict(DEFAULT_ATTRIBUTES)
+
+    # python MRO for single inheritance, good enough for node libraries
+    for base_key in reversed(bases[class_info.key]):
+        if base_key is None or base_key in visited:
+            continue
+        attributes.update(
+            _resolveAttributes(classes[base_key], classes, bases, visited)
+        )
+
+    attributes.update(class_info.attributes)
+    return attributes
+
+
+def _toEntry(class_info, attributes):
+    # type: (ClassInfo, Dict[str, Any]) -> Tuple[NodeEntry, bool]
+    """
+    Convert to a NodeEntry and statically check if it's valid. The check is only
+    partial when some attributes couldn't be resolved.
+    """
+    resolved = dict(
+        (key, DEFAULT_ATTRIBUTES[key] if value is UNRESOLVED else value)
+        for key, value in attributes.items()
+    )
+
+    valid = True
+    try:
+        util.checkNodeAttributes(**resolved)
+    except AssertionError as excp:
+        unresolved = [key for key, value in attributes.items() if value is UNRESOLVED]
+        # error may come from the default value we used instead of the unresolved one
+        if not unresolved:
+            logger.error(
+                "[discovery] InvalidNodeClass: class <{}>:\n   {}"
+                "".format(class_info, excp)
+            )
+            valid = False
+
+    entry = NodeEntry(class_name=class_info.name, module=class_info.module, **resolved)
+    return entry, valid
+
+
+def discoverNodesInModules(modules, base_names=None, unresolved=None, package=None):
+    # type: (Iterable[ModuleInfo], Optional[Iterable[str]], Optional[List[ClassInfo]], Optional[str]) -> Dict[str, List[Tuple[NodeEntry, bool]]]
+    """
+    Find the BaseCustomNode subclasses defined in the given modules of a library.
+
+    A class is considered a BaseCustomNode if it inherits, directly or through other
+    classes of the library, from one of the given base names. Base classes are
+    resolved through the imports of each module, so classes with the same name in
+    different modules are not mixed up. Classes whose name start with an underscore,
+    or that doesn't override ``name`` (abstract subclasses), are ignored, as well as
+    classes whose ``name`` is not a literal.
+
+    Args:
+        modules: all the modules of the library, see ``parseModule``
+        base_names: name of the base classes, default to ``BASE_CLASS_NAMES``
+        unresolved:
+            if specified, filled with the node classes ignored because their
+            ``name`` is not a literal.
+        package:
+            if specified, only the node classes found in the namespace of this
+            package are returned, i.e. the ones defined or imported in its
+            ``__init__``, like when the library is imported and registered.
+
+    Returns:
+        (entry, is_statically_valid) grouped per absolute path of the file they are
+        defined in.
+    """
+    modules = dict((module_info.name, module_info) for module_info in modules)
+    classes = dict(
+        (class_info.key, class_info)
+        for module_info in modules.values()
+        for class_info in module_info.classes
+    )  # type: Dict[ClassKey, ClassInfo]
+    bases = dict(
+        (
+            class_info.key,
+            [
+                _resolveBase(base, modules[class_info.module], modules, classes)
+                for base in class_info.bases
+            ],
+        )
+        for class_info in classes.values()
+    )  # type: Dict[ClassKey, List[Optional[ClassKey]]]
+
+    base_names = frozenset(base_names or BASE_CLASS_NAMES)
+    node_keys = set()  # type: set
+    node_classes = list()  # type: List[ClassInfo]
+    pending = sorted(classes.values(), key=lambda info: (info.path, info.key))
+    found = True
+    while found:
+        found = False
+        for class_info in list(pending):
+            is_node = False
+            for base, base_key in zip(class_info.bases, bases[class_info.key]):
+                if base_key is None:
+                    # external class, like katananodling.entities.BaseCustomNode
+                    is_node = base.rpartition(".")[2] in base_names
+                else:
+                    is_node = base_key in node_keys
+                if is_node:
+                    break
+            if not is_node:
+                continue
+            node_keys.add(class_info.key)
+            node_classes.append(class_info)
+            pending.remove(class_info)
+            found = True
+
+    exported = None  # type: Optional[set]
+    if package is not None:
+        exported = _getExportedClasses(package, modules, classes)
+
+    out = dict()  # type: Dict[str, List[Tuple[NodeEntry, bool]]]
+
+    for class_info in node_classes:
+
+        if class_info.name.startswith("_"):
+            continue
+        if exported is not None and class_info.key not in exported:
+            continue
+
+        attributes = _resolveAttributes(class_info, classes, bases)
+        if attributes["name"] is UNRESOLVED:
+            logger.warning(
+                "[discoverNodesInModules] Ignoring {}: its name is not a literal "
+                "and can only be found by importing it.".format(class_info)
+            )
+            if unresolved is not None:
+                unresolved.append(class_info)
+            continue
+        if attributes["name"] == DEFAULT_ATTRIBUTES["name"]:
+            # abstract subclass shared by other nodes
+            continue
+
+        entry_result = _toEntry(class_info, attributes)
+        out.setdefault(class_info.path, list()).append(entry_result)
+        logger.debug("[discoverNodesInModules] Found {}".format(entry_result))
+
+    return out
+
+
+def parseDirectory(package_directory, package_name, paths=None):
+    # type: (str, str, Optional[Iterable[str]]) -> Dict[str, ModuleInfo]
+    """
+    Args:
+        package_directory: root directory of the library python package
+        package_name: importable python name of the library
+        paths: python files of the library to parse, default to all of them
+
+    Returns:
+        parsed module per absolute path, files that cannot be parsed are logged and
+        skipped.
+    """
+    package_directory = os.path.abspath(package_directory)
+    if paths is None:
+        paths = getLibraryFiles(package_directory)
+
+    out = dict()
+    for path in paths:
+        module_name = _getModuleName(path, package_directory, package_name)
+        try:
+            out[path] = parseModule(path, module_name)
+        except (SyntaxError, IOError, UnicodeDecodeError) as excp:
+            logger.error("[parseDirectory] Cannot parse <{}>: {}".format(path, excp))
+    return out
+
+
+def discoverNodesInDirectory(
+    package_directory, package_name, base_names=None, exported_only=False
+):
+    # type: (str, str, Optional[Iterable[str]], bool) -> Dict[str, List[Tuple[NodeEntry, bool]]]
+    """
+    Find all the BaseCustomNode subclasses defined in the python files of the given
+    library directory, recursively, without importing anything.
+
+    See ``discoverNodesInModules`` for how classes are found.
+
+    Args:
+        package_directory: root directory of the library python package
+        package_name: importable python name of the library
+        base_names: name of the base classes, default to ``BASE_CLASS_NAMES``
+        exported_only:
+            True to only return the classes defined or imported in the library
+            ``__init__``, the ones registered when importing it.
+
+    Returns:
+        (entry, is_statically_valid) grouped per absolute path of the file they are
+        defined in.
+    """
+    modules = parseDirectory(package_directory, package_name)
+    return discoverNodesInModules(
+        modules.values(),
+        base_names=base_names,
+        package=package_name if exported_only else None,
+    )
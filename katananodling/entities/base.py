@@ -1,7 +1,6 @@
 import ast
 import json
 import logging
-import re
 import sys
 import traceback
 from abc import abstractmethod
@@ -14,7 +13,11 @@ from typing import List
 from Katana import NodegraphAPI
 
 from katananodling import c
+from katananodling import config
+from katananodling import migration
+from katananodling import schema
 from katananodling import util
+from katananodling import wiring
 from katananodling.util import Version
 
 __all__ = ("BaseCustomNode",)
@@ -126,9 +129,12 @@ class AboutGroupParam:
         ]
         for param in hidden_param_list:
 
-            hints = ast.literal_eval(param.getHintString())
+            if not param:
+                continue
+
+            hints = ast.literal_eval(param.getHintString() or "{}")
             if enable:
-                del hints["widget"]
+                hints.pop("widget", None)
             else:
                 hints["widget"] = "null"
             param.setHintString(repr(hints))
@@ -156,9 +162,11 @@ class AboutGroupParam:
         p.setValue(inspect.getfile(self.node.__class__), 0)
 
         script = c.OPEN_DOCUMENTATION_SCRIPT.format(PATH_PARAM=self.ParamNames.path)
-        p = self.node.getParameter(self.ParamNames.getPath(self.ParamNames.path))
+        p = self.node.getParameter(
+            self.ParamNames.getPath(self.ParamNames.documentation)
+        )
         p.setValue(script, 0)
-        p.setHintString(repr({"scriptText": script}))
+        p.setHintString(repr({"widget": "scriptButton", "scriptText": script}))
 
         return
 
@@ -231,6 +239,8 @@ class BaseCustomNode(NodegraphAPI.PythonGroupNode):
     port_in_name = "in"
     port_out_name = "out"
 
+    _debug_param_name = "debug__"
+
     # MUST be overridden :
 
     name = c.KATANA_TYPE_NAME  # type: str
@@ -250,11 +260,34 @@ class BaseCustomNode(NodegraphAPI.PythonGroupNode):
 
     author = ""  # type: str
 
+    category = ""  # type: str
+    """
+    Group the node under this category in the LayeredMenu. Use ``/`` to nest
+    categories, ex: ``"lookdev/materials"``. Empty to not group it.
+    """
+
     documentation = None  # type: Optional[str]
     """
     Path to a documentation "entity" that can be a file path or an URL.
     """
 
+    user_params = None  # type: Optional[List[schema.Param]]
+    """
+    Optional declarative description of the ``user`` parameters, without the
+    ``About`` one. Built before ``_build()`` is called and kept in sync on upgrade
+    (values set by the user are preserved). See ``schema.py``.
+
+    When declared, it MUST describe all the ``user`` parameters, as any other one
+    will be removed on upgrade.
+    """
+
+    use_prototype_cache = False  # type: bool
+    """
+    True to create new instances by cloning the first one built instead of calling
+    ``_build()`` each time. Only enable it if ``_build()`` always produce the same
+    result. See ``prototype.py``.
+    """
+
     _registered = False  # type: bool
     """
     True if the class has been registered in Katana.
@@ -269,15 +302,24 @@ class BaseCustomNode(NodegraphAPI.PythonGroupNode):
         self._node_dot_down = None  # type: NodegraphAPI.Node
         return
 
-    def __build__(self):
+    def __build__(self, raise_error=False):
+        # type: (bool) -> None
         """
         Called when the BaseCustomNode subclass is created in the nodegraph.
+
+        Args:
+            raise_error: True to raise errors instead of only logging them.
         """
         try:
             self.about.__build__()
             self._buildDefaultStructure()
+            if self.user_params:
+                schema.buildParams(self.user_param, self.user_params)
+                self.moveAboutParamToBottom()
             self._build()
         except Exception as excp:
+            if raise_error:
+                raise
             logger.error(
                 "[{}][__build__] {}\n{}"
                 "".format(self.__class__.__name__, excp, traceback.format_exc()),
@@ -289,26 +331,54 @@ class BaseCustomNode(NodegraphAPI.PythonGroupNode):
         """
         Edit some parameters to help at debugging.
 
+        The debug state is stored on the node so nothing is done if it's already in
+        the requested state.
+
         Args:
             enable: True to enable debug mode, False to make it back to normal
         """
+        p = self.getParameter(self._debug_param_name)
+        if bool(p) == enable:
+            return
+
         self.about.__toggleDebugMode__(enable=enable)
 
-        pname = "debug__"
-        p = self.getParameter(pname)
-        if p:
+        if not enable:
             self.getParameters().deleteChild(p)
+            return
 
-        if enable:
-            p = self.getParameters().createChildString(pname, "")
-            hint = {"widget": "scriptEditor", "readOnly": True}
-            p.setHintString(repr(hint))
-            v = vars(self)
-            v.update(vars(self.__class__))
-            p.setValue(json.dumps(v, indent=4, default=str, sort_keys=True), 0)
+        # the content is only computed when asked, as it can be expensive
+        p = self.getParameters().createChildGroup(self._debug_param_name)
+        p.setHintString(repr({"open": False}))
 
+        script = c.DEBUG_DATA_SCRIPT
+        pchild = p.createChildString("refresh", script)
+        hint = {"widget": "scriptButton", "scriptText": script}
+        pchild.setHintString(repr(hint))
+
+        pchild = p.createChildString("data", "")
+        hint = {"widget": "scriptEditor", "readOnly": True}
+        pchild.setHintString(repr(hint))
         return
 
+    def isInDebugMode(self):
+        # type: () -> bool
+        """
+        Returns:
+            True if the debug mode has been enabled with ``__toggleDebugMode__``.
+        """
+        return bool(self.getParameter(self._debug_param_name))
+
+    def _getDebugData(self):
+        # type: () -> str
+        """
+        Returns:
+            json representation of the node and its class attributes.
+        """
+        v = dict(vars(self.__class__))
+        v.update(vars(self))
+        return json.dumps(v, indent=4, default=str, sort_keys=True)
+
     def __upgradeapi__(self):
         """
         This is to update the node following internal API changes on the python package.
@@ -316,7 +386,7 @@ class BaseCustomNode(NodegraphAPI.PythonGroupNode):
         Do not confuse it with ``upgrade()`` method made for developers subclasses that
         is call when a node **in the library** must be upgraded.
         """
-        if c.Env.get(c.Env.UPGRADE_DISABLE):
+        if config.getConfig().upgrade_disable:
             return
 
         if self.about.api_version == Version(c.__version__):
@@ -333,6 +403,33 @@ class BaseCustomNode(NodegraphAPI.PythonGroupNode):
         )
         return
 
+    def _diffUserParams(self):
+        # type: () -> List[schema.ParamChange]
+        """
+        Returns:
+            changes to apply on the ``user`` parameters to match ``user_params``.
+        """
+        if not self.user_params:
+            return list()
+        return schema.diffParams(
+            self.user_param,
+            self.user_params,
+            ignored=(self.about.ParamNames.group,),
+        )
+
+    def __upgradeparams__(self):
+        # type: () -> List[schema.ParamChange]
+        """
+        Edit the ``user`` parameters to match ``user_params``, only applying what
+        changed. Called by ``migration.upgradeNode``.
+
+        Returns:
+            the changes applied.
+        """
+        changes = self._diffUserParams()
+        schema.applyChanges(changes)
+        return changes
+
     def _buildDefaultStructure(self):
         """
         Create the basic nodegraph representation of a custom tool.
@@ -341,7 +438,9 @@ class BaseCustomNode(NodegraphAPI.PythonGroupNode):
 
         self.addInputPort(self.port_in_name)
         self.addOutputPort(self.port_out_name)
-        self.setName("{}_0001".format(self.name))
+        # already named by ``loader.createNodes``, skip the name uniquification
+        if not self.getName().startswith("{}_".format(self.name)):
+            self.setName("{}_0001".format(self.name))
 
         NodegraphAPI.SetNodeShapeAttr(self, "iconName", "")
         NodegraphAPI.SetNodeShapeAttr(self, "basicDisplay", 1)
@@ -377,31 +476,13 @@ class BaseCustomNode(NodegraphAPI.PythonGroupNode):
         """
         Raise an error if the class is malformed.
         """
-
-        util.asserting(
-            isinstance(cls.name, str),
-            "name=<{}> is not a str".format(cls.name),
-        )
-        util.asserting(
-            False if re.search(r"\W", cls.name) else True,
-            "name=<{}> contains unsupported characters".format(cls.name),
-        )
-
-        util.asserting(
-            isinstance(cls.version, tuple) and len(cls.version) == 3,
-            "version=<{}> is not a tuple or of length 3".format(cls.version),
-        )
-        util.asserting(
-            not cls.color or isinstance(cls.color, tuple) and len(cls.color) == 3,
-            "color=<{}> is not a tuple or of length 3".format(cls.color),
-        )
-        util.asserting(
-            isinstance(cls.description, str),
-            "description=<{}> is not a str".format(cls.description),
-        )
-        util.asserting(
-            isinstance(cls.author, str),
-            "author=<{}> is not a str".format(cls.author),
+        util.checkNodeAttributes(
+            name=cls.name,
+            version=cls.version,
+            color=cls.color,
+            description=cls.description,
+            author=cls.author,
+            category=cls.category,
         )
         return
 
@@ -458,9 +539,12 @@ class BaseCustomNode(NodegraphAPI.PythonGroupNode):
         This is called on existing scene loading AND when a node is created for the
         first time in the scene.
 
-        Must be overriden by developer in subclasses.
+        By default, run the methods declared as migration steps with the
+        ``migration.migrate`` decorator, then sync the parameters declared in
+        ``user_params``. Can be overriden by developer in subclasses
+        for a fully custom upgrade.
         """
-        pass
+        migration.upgradeNode(self)
 
     def wireInsertNodes(self, node_list, vertical_offset=150):
         # type: (List[NodegraphAPI.Node], int) -> None
@@ -469,6 +553,7 @@ class BaseCustomNode(NodegraphAPI.PythonGroupNode):
         The nodes are inserted after the port connected to Output Dot node.
 
         For convenience, it is assumed that nodes only have one input/output port.
+        Use ``wireInsertGraph`` for more complex networks.
 
         Args:
             vertical_offset:
@@ -477,34 +562,42 @@ class BaseCustomNode(NodegraphAPI.PythonGroupNode):
                 node to connect to the internal network and between each other, in
                 the expected order.
         """
+        graph = wiring.NodeGraph(spacing=(0, vertical_offset))
+        upstream = wiring.INPUT
+        for node in node_list:
+            upstream = graph.add(node, [upstream])
+        graph.setOutput(upstream)
+        self.wireInsertGraph(graph)
+        return
+
+    def wireInsertGraph(self, graph):
+        # type: (wiring.NodeGraph) -> None
+        """
+        Connect and lay out a network of nodes described as a DAG in the internal
+        network, in a single pass. The graph is inserted after the port connected to
+        Output Dot node, that is moved below it.
+
+        Args:
+            graph: network of nodes created inside this node
+        """
         # we have to make a big try/except block because Katana is shitty at catching
         # error of creation of registered Nodes.
         try:
             indownport = self._node_dot_down.getInputPortByIndex(0)
             previousOutPort = indownport.getConnectedPort(0)
-            previousPos = NodegraphAPI.GetNodePosition(previousOutPort.getNode())
-            indownport.disconnect(previousOutPort)
-
-            for node in node_list:
-                node.getInputPortByIndex(0).connect(previousOutPort)
-                NodegraphAPI.SetNodePosition(
-                    node,
-                    (previousPos[0], previousPos[1] - vertical_offset),
-                )
-
-                previousOutPort = node.getOutputPortByIndex(0)
-                previousPos = NodegraphAPI.GetNodePosition(node)
-                continue
+            origin = NodegraphAPI.GetNodePosition(previousOutPort.getNode())
+
+            positions = graph.apply(previousOutPort, indownport, origin=origin)
 
-            indownport.connect(previousOutPort)
+            lowest = min([origin[1]] + [pos[1] for pos in positions.values()])
             NodegraphAPI.SetNodePosition(
-                self._node_dot_down, (previousPos[0], previousPos[1] - vertical_offset)
+                self._node_dot_down, (origin[0], lowest - graph.spacing[1])
             )
 
         except:
             logger.error(
-                "[{}][wireInsertNodes] Error while trying to connect {}\n{}"
-                "".format(self.__class__.__name__, node_list, traceback.format_exc())
+                "[{}][wireInsertGraph] Error while trying to connect {}\n{}"
+                "".format(self.__class__.__name__, graph.nodes, traceback.format_exc())
             )
             raise
         return
@@ -5,6 +5,8 @@ from typing import Optional
 
 from Katana import NodegraphAPI
 
+from katananodling import config
+from katananodling import luabundle
 from .base import BaseCustomNode
 
 __all__ = ("OpScriptCustomNode",)
@@ -19,6 +21,17 @@ class OpScriptCustomNode(BaseCustomNode):
     declared in the ``_build()`` method that must be overriden.
     """
 
+    fusible = False  # type: bool
+    """
+    True if the node can be fused with the adjacent ones in a single OpScript op,
+    see ``fusion.py``. Only enable it if the lua module:
+
+    - read its OpArgs using ``Interface.GetOpArg("user.xxx")`` at each call.
+    - doesn't read, with ``Interface.GetAttr``, attributes that the upstream nodes
+      could set : in a fused op it reads the input scene of the whole chain, so it
+      doesn't see what the previous nodes of the chain did.
+    """
+
     @classmethod
     def getLuaModuleName(cls):
         # type: () -> Optional[str]
@@ -42,6 +55,20 @@ class OpScriptCustomNode(BaseCustomNode):
 
         return module_name
 
+    @classmethod
+    def getLuaLoaderScript(cls):
+        # type: () -> str
+        """
+        Lua code to set on the OpScript to run the lua module of this node
+        (see ``getLuaModuleName``).
+
+        If ``c.Env.LUA_BUNDLE`` is set, the module is loaded from that bundle
+        instead of the ``LUA_PATH``. See ``luabundle.py``.
+        """
+        return luabundle.getLoaderScript(
+            cls.getLuaModuleName(), config.getConfig().lua_bundle
+        )
+
     def _buildDefaultStructure(self):
         super(OpScriptCustomNode, self)._buildDefaultStructure()
 
@@ -0,0 +1,184 @@
+"""
+Filter the BaseCustomNode to register using Unix shell-style wildcards patterns.
+"""
+import fnmatch
+import logging
+import os
+import re
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from . import config
+
+__all__ = ("NodeFilter",)
+
+logger = logging.getLogger(__name__)
+
+
+def _translate(pattern):
+    # type: (str) -> str
+    """
+    Convert a fnmatch pattern to a regex that can be combined with other ones.
+    """
+    regex = fnmatch.translate(os.path.normcase(pattern))
+    # python-2 append global flags at the end : "...\Z(?ms)"
+    if regex.endswith("\\Z(?ms)"):
+        regex = "(?s:{})\\Z".format(regex[: -len("\\Z(?ms)")])
+    return regex
+
+
+class _CompiledPatterns(object):
+    """
+    A list of fnmatch patterns per field, compiled to a single regex per field.
+    """
+
+    def __init__(self, patterns):
+        # type: (Iterable[str]) -> None
+        self.patterns = dict()  # type: Dict[str, List[str]]
+        self.regexes = dict()
+
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern:
+                continue
+            field, pattern = NodeFilter.splitPattern(pattern)
+            self.patterns.setdefault(field, list()).append(pattern)
+
+        for field, patterns in self.patterns.items():
+            regex = "|".join(
+                "(?P<p{}>{})".format(index, _translate(pattern))
+                for index, pattern in enumerate(patterns)
+            )
+            self.regexes[field] = re.compile(regex)
+
+    def __bool__(self):
+        return bool(self.regexes)
+
+    __nonzero__ = __bool__  # python-2
+
+    def match(self, values):
+        # type: (Dict[str, str]) -> Optional[str]
+        """
+        Args:
+            values: value to match per field
+
+        Returns:
+            the first pattern that matched, prefixed by its field, or None
+        """
+        for field, regex in self.regexes.items():
+            match = regex.match(os.path.normcase(values.get(field) or ""))
+            if not match:
+                continue
+            pattern = self.patterns[field][int(match.lastgroup[1:])]
+            return "{}{}{}".format(field, NodeFilter.FIELD_SEPARATOR, pattern)
+        return None
+
+
+class NodeFilter(object):
+    """
+    Decide if a BaseCustomNode must be registered from exclusion and inclusion lists
+    of fnmatch patterns.
+
+    Patterns are by default matched against the class name, but can be prefixed by
+    the field to match and ``FIELD_SEPARATOR``, ex: ``"module=studiolib.tools.*"`` or
+    ``"author=*Liam*"``. Supported fields are listed in ``FIELDS``.
+
+    All the patterns are compiled once and results are cached per node, making
+    each lookup almost free, whatever the number of patterns.
+
+    A node is kept if it match one of the included patterns (or if there is no
+    included patterns) and doesn't match any of the excluded patterns.
+
+    Args:
+        excluded: fnmatch patterns of nodes to not register
+        included: fnmatch patterns of the only nodes to register
+        node_types:
+            if specified, the only node names (``BaseCustomNode.name``) to register.
+    """
+
+    FIELDS = ("class", "module", "author")
+    DEFAULT_FIELD = "class"
+    FIELD_SEPARATOR = "="
+    """
+    Not ``:`` as it's the list separator of the environment variables on Linux.
+    """
+
+    def __init__(self, excluded=(), included=(), node_types=None):
+        # type: (Iterable[str], Iterable[str], Optional[Iterable[str]]) -> None
+        self._excluded = _CompiledPatterns(excluded)
+        self._included = _CompiledPatterns(included)
+        self.node_types = None if node_types is None else frozenset(node_types)
+        self._cache = dict()  # type: Dict[Tuple[str, ...], Optional[str]]
+
+    def __bool__(self):
+        return bool(self._excluded or self._included or self.node_types is not None)
+
+    __nonzero__ = __bool__  # python-2
+
+    @classmethod
+    def splitPattern(cls, pattern):
+        # type: (str) -> Tuple[str, str]
+        """
+        Returns:
+            field the pattern apply to, pattern without its field prefix.
+        """
+        field, sep, field_pattern = pattern.partition(cls.FIELD_SEPARATOR)
+        if sep and field in cls.FIELDS:
+            return field, field_pattern
+        return cls.DEFAULT_FIELD, pattern
+
+    @classmethod
+    def fromEnv(cls, node_types=None):
+        # type: (Optional[Iterable[str]]) -> NodeFilter
+        """
+        Args:
+            node_types: see class arguments
+
+        Returns:
+            filter configured from the EXCLUDED_NODES and INCLUDED_NODES environment
+            variables, or their configuration file equivalent.
+        """
+        settings = config.getConfig()
+        return cls(
+            excluded=settings.excluded_nodes,
+            included=settings.included_nodes,
+            node_types=node_types,
+        )
+
+    def getExclusionReason(self, class_name, module="", author="", name=None):
+        # type: (str, str, str, Optional[str]) -> Optional[str]
+        """
+        Args:
+            class_name: name of the BaseCustomNode subclass
+            module: python module name the class is defined in
+            author: BaseCustomNode.author
+            name: BaseCustomNode.name, only used with ``node_types``
+
+        Returns:
+            why the node must not be registered or None if it must be.
+        """
+        key = (class_name, module, author, name)
+        if key in self._cache:
+            return self._cache[key]
+
+        values = {"class": class_name, "module": module, "author": author}
+        reason = None
+
+        if self.node_types is not None and name not in self.node_types:
+            reason = "not in node types"
+        elif self._included and not self._included.match(values):
+            reason = "not included"
+        else:
+            pattern = self._excluded.match(values)
+            if pattern:
+                reason = "excluded by: {}".format(pattern)
+
+        self._cache[key] = reason
+        return reason
+
+    def isExcluded(self, class_name, module="", author="", name=None):
+        # type: (str, str, str, Optional[str]) -> bool
+        return self.getExclusionReason(class_name, module, author, name) is not None
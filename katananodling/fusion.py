@@ -0,0 +1,431 @@
+"""
+Fusion of consecutive OpScriptCustomNode into a single OpScript op, so the scene graph
+is traversed once per chain instead of once per node.
+
+The first node of a chain get its OpScript running the lua module of every node of
+the chain, in order, while the OpScript of the other nodes is bypassed. Each node
+interface is untouched : the OpArgs of the other nodes are linked, by expression,
+under a namespace in the fused OpScript ``user`` parameter and the lua modules still
+read them with ``Interface.GetOpArg("user.xxx")``.
+
+As all the modules run in the same op, ``Interface.GetAttr`` still reads the input
+scene of the chain : a module doesn't see the attributes set by the previous modules
+of the chain, see ``OpScriptCustomNode.fusible``.
+
+Fusion is a snapshot : it is meant to be applied right before rendering (like in a
+render-boot script) and must be applied again if the nodes are edited.
+
+Example::
+
+    from katananodling import fusion
+
+    fusion.fuseOpScriptChains()
+"""
+import json
+import logging
+import re
+import uuid
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from Katana import NodegraphAPI
+from Katana import Utils
+
+from . import config
+from . import luabundle
+from .entities import BaseCustomNode
+from .entities import OpScriptCustomNode
+
+__all__ = (
+    "COMPARED_PARAMS",
+    "defuseOpScriptChains",
+    "findFusibleChains",
+    "fuseChain",
+    "fuseOpScriptChains",
+    "isFusible",
+)
+
+logger = logging.getLogger(__name__)
+
+COMPARED_PARAMS = (
+    "CEL",
+    "location",
+    "applyWhere",
+    "applyWhen",
+    "executionMode",
+    "inputBehavior",
+)
+"""
+Parameters of the OpScript nodes that must have the same value to be fused.
+"""
+
+FUSION_PARAM = "fusion__"
+"""
+Name of the parameter, under the ``user`` parameter of the OpScript of each fused
+node, storing what is needed to defuse it. Fused nodes are found again by the key of
+their chain stored in it, not by name, so renaming them doesn't matter.
+"""
+
+NAMESPACE_PREFIX = "fused__"
+"""
+Prefix of the parameters, under the fused OpScript ``user`` parameter, storing the
+OpArgs of the other nodes of the chain, so they can't collide with its own ones.
+"""
+
+_NAMESPACE_REGEX = re.compile(r"\W")
+
+FUSED_SCRIPT_HEADER = """
+local GetOpArg = Interface.GetOpArg
+
+local function run(module_name, namespace)
+  local script = require(module_name)
+  if namespace then
+    -- make the module read its OpArgs from its namespace
+    Interface.GetOpArg = function(name)
+      if name and name:sub(1, 5) == "user." then
+        return GetOpArg("user." .. namespace .. name:sub(5))
+      end
+      return GetOpArg(name)
+    end
+  end
+  local ok, err = pcall(script)
+  Interface.GetOpArg = GetOpArg
+  if not ok then
+    error(err, 0)
+  end
+end
+"""
+
+
+def _getOpScriptNode(node):
+    # type: (BaseCustomNode) -> Optional[NodegraphAPI.Node]
+    """
+    Returns:
+        the only OpScript node inside the given node, else None.
+    """
+    opscripts = [
+        child for child in node.getChildren() if child.getType() == "OpScript"
+    ]
+    return opscripts[0] if len(opscripts) == 1 else None
+
+
+def _getSignature(opscript):
+    # type: (NodegraphAPI.Node) -> Tuple
+    signature = list()
+    for param_name in COMPARED_PARAMS:
+        param = opscript.getParameter(param_name)
+        if param is not None:
+            signature.append((param_name, param.getValue(0)))
+    return tuple(signature)
+
+
+def isFusible(node):
+    # type: (Any) -> bool
+    """
+    Returns:
+        True if the given node is an OpScriptCustomNode that only contains its
+        default OpScript, whose class allow fusion.
+    """
+    if not isinstance(node, OpScriptCustomNode) or not node.fusible:
+        return False
+    if node.isBypassed():
+        return False
+    # the In/Out dots + the OpScript
+    if node.getNumChildren() != 3:
+        return False
+    opscript = _getOpScriptNode(node)
+    if opscript is None or opscript.isBypassed():
+        return False
+    return opscript.getParameter("user.{}".format(FUSION_PARAM)) is None
+
+
+def _getDownstream(node):
+    # type: (NodegraphAPI.Node) -> Optional[NodegraphAPI.Node]
+    """
+    Returns:
+        the node connected to the first output port of the given node, if it's the
+        only consumer and its first input port is used.
+    """
+    port = node.getOutputPortByIndex(0)
+    if port is None or port.getNumConnectedPorts() != 1:
+        return None
+    consumer = port.getConnectedPort(0)
+    downstream = consumer.getNode()
+    if downstream.getInputPortByIndex(0) is not consumer:
+        return None
+    return downstream
+
+
+def _iterNodes(parent, recursive):
+    for node in parent.getChildren():
+        yield node
+        if (
+            recursive
+            and not isinstance(node, BaseCustomNode)
+            and hasattr(node, "getChildren")
+        ):
+            for child in _iterNodes(node, recursive):
+                yield child
+
+
+def findFusibleChains(parent=None, recursive=True):
+    # type: (Optional[NodegraphAPI.Node], bool) -> List[List[OpScriptCustomNode]]
+    """
+    Find the runs of connected OpScriptCustomNode that can be fused.
+
+    Args:
+        parent: group node to search in, default to the root node
+        recursive: True to also search in the group nodes (except BaseCustomNode)
+
+    Returns:
+        chains of at least 2 nodes, ordered from upstream to downstream.
+    """
+    parent = parent or NodegraphAPI.GetRootNode()
+    signatures = dict()
+    for node in _iterNodes(parent, recursive):
+        if isFusible(node):
+            signatures[node] = _getSignature(_getOpScriptNode(node))
+
+    def getNext(node):
+        downstream = _getDownstream(node)
+        if signatures.get(downstream) == signatures[node]:
+            return downstream
+        return None
+
+    has_previous = set()
+    for node in signatures:
+        downstream = getNext(node)
+        if downstream is not None:
+            has_previous.add(downstream)
+
+    chains = list()
+    for node in signatures:
+        if node in has_previous:
+            continue
+        chain = [node]
+        downstream = getNext(node)
+        while downstream is not None:
+            chain.append(downstream)
+            downstream = getNext(downstream)
+        if len(chain) > 1:
+            chains.append(chain)
+
+    chains.sort(key=lambda chain: chain[0].getName())
+    return chains
+
+
+def _linkParam(source, parent, name=None):
+    # type: (NodegraphAPI.Parameter, NodegraphAPI.Parameter, Optional[str]) -> None
+    """
+    Create a copy of the given parameter under the given parent, whose values are
+    expressions referencing the source values.
+    """
+    name = name or source.getName()
+    param_type = source.getType()
+    expression = 'getParam("{}")'.format(source.getFullName(True))
+
+    if param_type == "group":
+        group = parent.createChildGroup(name)
+        for child in source.getChildren():
+            _linkParam(child, group)
+    elif param_type in ("stringArray", "numberArray"):
+        size = source.getNumChildren()
+        if param_type == "stringArray":
+            array = parent.createChildStringArray(name, size)
+        else:
+            array = parent.createChildNumberArray(name, size)
+        for index in range(size):
+            child = source.getChildByIndex(index)
+            array.getChildByIndex(index).setExpression(
+                'getParam("{}")'.format(child.getFullName(True))
+            )
+    elif param_type == "number":
+        parent.createChildNumber(name, 0).setExpression(expression)
+    else:
+        parent.createChildString(name, "").setExpression(expression)
+    return
+
+
+def _getNamespace(node_name):
+    # type: (str) -> str
+    return NAMESPACE_PREFIX + _NAMESPACE_REGEX.sub("_", node_name)
+
+
+def _buildFusedScript(chain):
+    # type: (List[OpScriptCustomNode]) -> str
+    names = ", ".join(node.getName() for node in chain)
+    lines = [
+        "-- fused by katananodling: {}".format(names),
+        luabundle.getBundleLoadScript(config.getConfig().lua_bundle),
+        FUSED_SCRIPT_HEADER,
+    ]
+    for index, node in enumerate(chain):
+        module_name = luabundle.toLuaString(node.getLuaModuleName())
+        if index == 0:
+            lines.append('run("{}")'.format(module_name))
+        else:
+            namespace = _getNamespace(node.getName())
+            lines.append('run("{}", "{}")'.format(module_name, namespace))
+    return "\n".join(lines) + "\n"
+
+
+def _setFusionState(opscript, state):
+    # type: (NodegraphAPI.Node, Dict[str, Any]) -> None
+    param = opscript.getParameter("user").createChildString(
+        FUSION_PARAM, json.dumps(state)
+    )
+    param.setHintString(repr({"widget": "null"}))
+    return
+
+
+def _getFusionState(opscript):
+    # type: (NodegraphAPI.Node) -> Optional[Dict[str, Any]]
+    """
+    Returns:
+        state stored by ``fuseChain`` on the given OpScript node, None if not fused.
+    """
+    param = opscript.getParameter("user.{}".format(FUSION_PARAM))
+    if param is None:
+        return None
+    try:
+        return json.loads(param.getValue(0))
+    except ValueError:
+        return None
+
+
+def fuseChain(chain):
+    # type: (List[OpScriptCustomNode]) -> None
+    """
+    Make the OpScript of the first node run the lua modules of all the nodes of the
+    chain and bypass the OpScript of the others.
+
+    Args:
+        chain: as returned by ``findFusibleChains``
+    """
+    opscript = _getOpScriptNode(chain[0])
+    user_param = opscript.getParameter("user")
+    script_param = opscript.getParameter("script.lua")
+    key = uuid.uuid4().hex
+    namespaces = list()
+
+    for node in chain[1:]:
+        other_opscript = _getOpScriptNode(node)
+        namespace = _getNamespace(node.getName())
+        _linkParam(other_opscript.getParameter("user"), user_param, namespace)
+        namespaces.append(namespace)
+        _setFusionState(other_opscript, {"key": key})
+        other_opscript.setBypassed(True)
+
+    state = {
+        "key": key,
+        "script": script_param.getValue(0),
+        "namespaces": namespaces,
+    }
+    _setFusionState(opscript, state)
+    script_param.setValue(_buildFusedScript(chain), 0)
+    return
+
+
+def _unbypass(opscript):
+    # type: (NodegraphAPI.Node) -> None
+    """
+    Revert ``fuseChain`` on the OpScript of a node fused in another one.
+    """
+    user_param = opscript.getParameter("user")
+    user_param.deleteChild(user_param.getChild(FUSION_PARAM))
+    opscript.setBypassed(False)
+    return
+
+
+def _defuse(opscript, state):
+    # type: (NodegraphAPI.Node, Dict[str, Any]) -> None
+    """
+    Revert ``fuseChain`` on the OpScript of the first node of a chain.
+    """
+    user_param = opscript.getParameter("user")
+    opscript.getParameter("script.lua").setValue(state["script"], 0)
+    user_param.deleteChild(user_param.getChild(FUSION_PARAM))
+
+    for namespace_name in state["namespaces"]:
+        namespace = user_param.getChild(namespace_name)
+        if namespace is not None:
+            user_param.deleteChild(namespace)
+    return
+
+
+def defuseOpScriptChains(parent=None, recursive=True):
+    # type: (Optional[NodegraphAPI.Node], bool) -> int
+    """
+    Revert ``fuseOpScriptChains``.
+
+    Fused nodes whose first node of the chain has been deleted are restored too.
+
+    Returns:
+        number of chains defused.
+    """
+    parent = parent or NodegraphAPI.GetRootNode()
+    heads = list()
+    fused = dict()  # type: Dict[str, List[NodegraphAPI.Node]]
+
+    for node in _iterNodes(parent, recursive):
+        if not isinstance(node, OpScriptCustomNode):
+            continue
+        opscript = _getOpScriptNode(node)
+        state = _getFusionState(opscript) if opscript else None
+        if state is None:
+            continue
+        if "script" in state:
+            heads.append((opscript, state))
+        else:
+            fused.setdefault(state.get("key"), list()).append(opscript)
+
+    Utils.UndoStack.OpenGroup("Defuse OpScript Chains")
+    try:
+        for opscript, state in heads:
+            _defuse(opscript, state)
+            for other_opscript in fused.pop(state["key"], list()):
+                _unbypass(other_opscript)
+
+        for opscripts in fused.values():
+            for opscript in opscripts:
+                logger.warning(
+                    "[defuseOpScriptChains] Restoring {}: the node it was fused in "
+                    "doesn't exist anymore.".format(opscript.getParent())
+                )
+                _unbypass(opscript)
+    finally:
+        Utils.UndoStack.CloseGroup()
+
+    return len(heads)
+
+
+def fuseOpScriptChains(parent=None, recursive=True):
+    # type: (Optional[NodegraphAPI.Node], bool) -> List[List[str]]
+    """
+    Fuse all the chains of OpScriptCustomNode found. Chains already fused are
+    defused first so they reflect the current state of the nodes.
+
+    Args:
+        parent: group node to search in, default to the root node
+        recursive: True to also search in the group nodes (except BaseCustomNode)
+
+    Returns:
+        names of the nodes of each chain fused.
+    """
+    Utils.UndoStack.OpenGroup("Fuse OpScript Chains")
+    try:
+        defuseOpScriptChains(parent, recursive)
+        chains = findFusibleChains(parent, recursive)
+        for chain in chains:
+            fuseChain(chain)
+    finally:
+        Utils.UndoStack.CloseGroup()
+
+    logger.info(
+        "[fuseOpScriptChains] Fused {} nodes in {} chains."
+        "".format(sum(len(chain) for chain in chains), len(chains))
+    )
+    return [[node.getName() for node in chain] for chain in chains]
@@ -1,35 +1,125 @@
-import fnmatch
+import contextlib
 import importlib
 import inspect
 import json
 import logging
+import os
+import sys
 import traceback
 from types import ModuleType
+from typing import Any
+from typing import Callable
 from typing import Dict
+from typing import Iterator
+from typing import List
 from typing import Optional
 from typing import Sequence
+from typing import Set
+from typing import Tuple
 from typing import Type
+from typing import Union
 
+from Katana import Configuration
+from Katana import KatanaFile
 from Katana import NodegraphAPI
 from Katana import Utils
 
 from . import c
+from . import cache
+from . import config
+from . import discovery
 from . import entities
+from . import filters
+from . import migration
+from . import profiling
+from . import prototype
+from . import registry
+from . import scanner
+from . import util
 
 __all__ = (
     "REGISTERED",
+    "createNodes",
+    "deferredUpgrades",
+    "isBatchMode",
+    "previewSceneMigrations",
+    "prewarmPrototypes",
+    "processDeferredUpgrades",
     "registerCallbacks",
     "registerNodesFor",
+    "reloadNodes",
+    "setSceneDebugMode",
+    "suspendCallbacks",
+    "unregisterCallbacks",
+    "writeManifestFor",
 )
 
 logger = logging.getLogger(__name__)
 
 
-REGISTERED = {}  # type: Dict[str, Type[entities.BaseCustomNode]]
+REGISTERED = registry.NodeRegistry(
+    resolver=lambda entry: _resolveNodeEntry(entry)
+)  # type: registry.NodeRegistry
 """
 Dictionnary of BaseCustomNode class registered to be used in Katana.
+
+Values might be registered lazily as a ``registry.NodeEntry`` which is only
+converted to its class the first time it's accessed.
+"""
+
+_SOURCE_FINGERPRINTS = {}  # type: Dict[str, cache.Fingerprint]
+"""
+Fingerprint of the source file of each python module that defines registered nodes,
+at the time it was imported. Used to find which modules have been modified.
+"""
+
+_DEFERRED_NODES = []  # type: List[entities.BaseCustomNode]
+"""
+BaseCustomNode created during a scene loading or a paste, waiting to be upgraded.
+"""
+
+_DEFER_STATE = {"depth": 0, "loading": False}
+"""
+depth: number of nested ``deferredUpgrades`` contexts,
+loading: True between the ``nodegraph_loadBegin`` and ``nodegraph_loadEnd`` events.
 """
 
+try:
+    from importlib import reload as _reloadModule
+except ImportError:  # python-2
+    _reloadModule = reload
+
+
+def isBatchMode():
+    # type: () -> bool
+    """
+    Returns:
+        True if the batch profile must be used, see ``c.Env.BATCH_MODE``.
+    """
+    batch_mode = config.getConfig().batch_mode
+    if batch_mode is not None:
+        return batch_mode
+    return Configuration.get("KATANA_UI_MODE") in (None, "", "0", 0)
+
+
+def _getBatchNodeTypes():
+    # type: () -> Optional[Set[str]]
+    """
+    Returns:
+        node types used in the scene katana was started with, None if unknown.
+    """
+    scene_path = scanner.getKatanaFileFromArgv()
+    if not scene_path:
+        return None
+    try:
+        return scanner.getSceneNodeTypes(scene_path)
+    except Exception as excp:
+        logger.warning(
+            "[_getBatchNodeTypes] Cannot scan scene <{}>, registering all nodes: {}"
+            "".format(scene_path, excp)
+        )
+        return None
+
 
 def registerNodesFor(tools_packages_list):
     # type: (Sequence[str]) -> None
@@ -40,6 +130,9 @@ def registerNodesFor(tools_packages_list):
 
     Must be called once.
 
+    In batch mode (see ``isBatchMode``), only the nodes used in the scene being
+    rendered are registered.
+
     Args:
         tools_packages_list:
             list of python packages name. Those package must be registered in the PYTHONPATH.
@@ -50,9 +143,9 @@ def registerNodesFor(tools_packages_list):
             "called. You can only call it once."
         )
     logger.debug("[registerNodesFor] Started...")
-    logger.debug(
-        "[registerNodesFor] c.Env={}".format(json.dumps(c.Env.__asdict__(), indent=4))
-    )
+    settings = config.refreshConfig()
+    profiling.PROFILER.reset()
+    start_time = profiling.timer()
 
     NodegraphAPI.RegisterPythonGroupType(c.KATANA_TYPE_NAME, entities.BaseCustomNode)
     NodegraphAPI.AddNodeFlavor(c.KATANA_TYPE_NAME, "_hide")  # TODO: see if kept
@@ -60,24 +153,51 @@ def registerNodesFor(tools_packages_list):
         "[registerNodesFor] RegisterPythonGroupType for <{}>".format(c.KATANA_TYPE_NAME)
     )
 
+    lazy_loading = settings.lazy_loading
+    cache_path = settings.registry_cache
+    registry_cache = cache.RegistryCache(cache_path) if cache_path else None
+
+    node_types = None
+    if isBatchMode():
+        with profiling.PROFILER.measure("discovery"):
+            node_types = _getBatchNodeTypes()
+        logger.debug(
+            "[registerNodesFor] Batch mode, restricted to node types: {}"
+            "".format(sorted(node_types) if node_types is not None else "all")
+        )
+
+    node_filter = filters.NodeFilter.fromEnv(node_types=node_types)
+    prototype.PROTOTYPES.directory = settings.prototype_cache
+
     for package_id in tools_packages_list:
+        with profiling.PROFILER.package(package_id):
+            _registerPackage(package_id, lazy_loading, node_filter, registry_cache)
 
+    if registry_cache:
         try:
-            package = importlib.import_module(package_id)  # type: ModuleType
+            registry_cache.write()
         except Exception as excp:
-            logger.error(
-                "[registerNodesFor] Cannot import package <{}>: {}\n{}"
-                "".format(package_id, excp, traceback.format_exc())
+            logger.warning(
+                "[registerNodesFor] Cannot write registry cache <{}>: {}"
+                "".format(registry_cache.path, excp)
             )
-            continue
 
-        registered = _registerNodePackage(package=package)
-        # registered tools can be found in REGISTERED global anyway
-        continue
+    profiling.PROFILER.total = profiling.timer() - start_time
+    profile_path = settings.profile_path
+    if profile_path:
+        try:
+            profiling.PROFILER.dump(profile_path)
+        except Exception as excp:
+            logger.warning(
+                "[registerNodesFor] Cannot write profile <{}>: {}"
+                "".format(profile_path, excp)
+            )
 
     logger.info(
-        "[registerNodesFor] Finished. Registered {} custom tools for {} locations."
-        "".format(len(REGISTERED), len(tools_packages_list))
+        "[registerNodesFor] Finished in {:.3f}s. Registered {} custom tools for {} "
+        "locations.".format(
+            profiling.PROFILER.total, len(REGISTERED), len(tools_packages_list)
+        )
     )
     return
 
@@ -85,18 +205,176 @@ def registerNodesFor(tools_packages_list):
 def registerCallbacks():
     """
     Register callback for BaseCustomNode nodes events.
+
+    ``KatanaFile.Paste`` is also wrapped so the upgrade of the pasted nodes is
+    deferred, see ``deferredUpgrades``. If some of the imported nodes use
+    ``use_prototype_cache``, their prototype is built at idle time, see
+    ``prewarmPrototypes``.
+
+    Nothing is registered in batch mode.
     """
+    if isBatchMode():
+        logger.debug("[registerCallbacks] Batch mode, skipped.")
+        return
 
-    if not c.Env.get(c.Env.UPGRADE_DISABLE):
-        Utils.EventModule.RegisterEventHandler(upgradeOnNodeCreateEvent, "node_create")
-        logger.debug(
-            '[registerCallbacks] registered event handler "node_create" with'
-            "<upgradeOnNodeCreateEvent>"
+    callbacks = list()
+    if not config.getConfig().upgrade_disable:
+        callbacks += _getCallbacks()
+        _hookPaste()
+    if _getPrototypesToPrewarm():
+        callbacks.append((_prewarmPrototypesOnIdle, "event_idle"))
+
+    for handler, event_type in callbacks:
+        Utils.EventModule.RegisterEventHandler(handler, event_type)
+    logger.debug(
+        "[registerCallbacks] Registered event handlers: {}".format(
+            ", ".join(
+                '"{}" with <{}>'.format(event_type, handler.__name__)
+                for handler, event_type in callbacks
+            )
         )
+    )
+    return
+
+
+def _getCallbacks():
+    # type: () -> List[Tuple[Callable, str]]
+    """
+    Returns:
+        (handler, event type) registered by ``registerCallbacks``.
+    """
+    return [
+        (upgradeOnNodeCreateEvent, "node_create"),
+        (_onLoadBegin, "nodegraph_loadBegin"),
+        (_onLoadEnd, "nodegraph_loadEnd"),
+    ]
+
+
+def unregisterCallbacks():
+    """
+    Unregister the callbacks registered by ``registerCallbacks``, if any.
+    """
+    callbacks = _getCallbacks() + [(_prewarmPrototypesOnIdle, "event_idle")]
+    for handler, event_type in callbacks:
+        if Utils.EventModule.IsHandlerRegistered(handler, event_type):
+            Utils.EventModule.UnregisterEventHandler(handler, event_type)
+    _unhookPaste()
+    logger.debug("[unregisterCallbacks] Finished.")
+    return
+
+
+def _hookPaste():
+    """
+    Wrap ``KatanaFile.Paste`` in a ``deferredUpgrades`` context.
+
+    The ``node_create`` events of the pasted nodes are only processed once the paste
+    is finished, when ``IsLoading()`` is False again, so the paste itself must be
+    detected.
+    """
+    paste = KatanaFile.Paste
+    if getattr(paste, "_nodling_paste", None):
+        return
+
+    def deferredPaste(*args, **kwargs):
+        with deferredUpgrades():
+            return paste(*args, **kwargs)
+
+    deferredPaste.__doc__ = paste.__doc__
+    deferredPaste._nodling_paste = paste
+    KatanaFile.Paste = deferredPaste
+    return
+
+
+def _unhookPaste():
+    """
+    Restore ``KatanaFile.Paste`` if wrapped by ``_hookPaste``.
+    """
+    paste = getattr(KatanaFile.Paste, "_nodling_paste", None)
+    if paste:
+        KatanaFile.Paste = paste
     return
 
 
-def upgradeOnNodeCreateEvent(*args, **kwargs):
+@contextlib.contextmanager
+def suspendCallbacks():
+    """
+    Context during which the BaseCustomNode created are not upgraded at all, nor
+    their debug mode toggled.
+
+    Useful for bulk operations that handle the nodes themselves. The ``node_create``
+    events queued in the context are processed before exiting it.
+    """
+    handler = upgradeOnNodeCreateEvent
+    registered = Utils.EventModule.IsHandlerRegistered(handler, "node_create")
+    if registered:
+        Utils.EventModule.SetHandlerEnabled(handler, "node_create", enabled=False)
+    try:
+        yield
+    finally:
+        if registered:
+            try:
+                Utils.EventModule.ProcessAllEvents()
+            finally:
+                Utils.EventModule.SetHandlerEnabled(
+                    handler, "node_create", enabled=True
+                )
+
+
+def _onLoadBegin(*args, **kwargs):
+    _DEFER_STATE["loading"] = True
+
+
+def _onLoadEnd(*args, **kwargs):
+    _DEFER_STATE["loading"] = False
+    if not _DEFER_STATE["depth"]:
+        processDeferredUpgrades()
+
+
+def _isDeferringUpgrades():
+    # type: () -> bool
+    return bool(
+        _DEFER_STATE["depth"]
+        or _DEFER_STATE["loading"]
+        or NodegraphAPI.NodegraphGlobals.IsLoading()
+    )
+
+
+@contextlib.contextmanager
+def deferredUpgrades():
+    """
+    Context during which the upgrade of the BaseCustomNode created is deferred to
+    the exit of the context, where they are all processed in one pass.
+
+    This is already the case during a scene loading or a ``KatanaFile.Paste`` (once
+    ``registerCallbacks`` has been called), use it when creating a lot of nodes from
+    a script::
+
+        with deferredUpgrades():
+            for _ in range(100):
+                NodegraphAPI.CreateNode("MyNode", parent_node)
+    """
+    _DEFER_STATE["depth"] += 1
+    try:
+        yield
+    finally:
+        if _DEFER_STATE["depth"] == 1:
+            # node_create events are queued, make sure they are received while
+            # still deferring.
+            try:
+                Utils.EventModule.ProcessAllEvents()
+            except Exception as excp:
+                logger.error(
+                    "[deferredUpgrades] Error while processing events: {}\n{}"
+                    "".format(excp, traceback.format_exc())
+                )
+        _DEFER_STATE["depth"] -= 1
+        if not _isDeferringUpgrades():
+            processDeferredUpgrades()
+
+
+def upgradeOnNodeCreateEvent(
+    eventType=None, eventID=None, node=None, nodeType=None, **kwargs
+):
     """
     Called during the ``node_create`` event.
 
@@ -109,214 +387,1291 @@ def upgradeOnNodeCreateEvent(*args, **kwargs):
          'nodeType': 'Group', 'nodeName': 'Group'}
 
     Args:
-        *args: (event name, event id)
-        **kwargs: {node, nodeType, nodeName}
+        eventType: event name
+        eventID: event id
+        node: node created
+        nodeType: type of the node created
+        **kwargs: {nodeName}
     """
-    # remember BaseCustomNode loading is performed in 2 parts:
-    #   first a simple BaseCustomNode instanc eis created and then its being assigned
-    #   its subclass which will give a different nodeType.
-    if kwargs.get("nodeType") == c.KATANA_TYPE_NAME:
+    # called for every node created in the session, so must return as fast as
+    # possible for non-BaseCustomNode.
+    # (this also skip the first part of the BaseCustomNode loading where a simple
+    # BaseCustomNode instance is created and then assigned its subclass.)
+    if nodeType not in REGISTERED.names():
         return
 
-    node = kwargs.get("node")
     if not isinstance(node, entities.BaseCustomNode):
         return
 
+    # scene loading or paste: processed in one pass once finished
+    if _isDeferringUpgrades():
+        _DEFERRED_NODES.append(node)
+        return
+
+    debug = config.getConfig().node_param_debug
+    for step, excp, trace in _upgradeNode(node, debug):
+        logger.error(
+            "[upgradeOnNodeCreateEvent] Error while calling {} on node {}: {}\n{}"
+            "".format(step, node, excp, trace),
+        )
+
+    return
+
+
+def _upgradeNode(node, debug):
+    # type: (entities.BaseCustomNode, bool) -> List[Tuple[str, Exception, str]]
+    """
+    Upgrade the given node and set its debug mode.
+
+    Returns:
+        (step, exception, traceback) of each error that happened, if any.
+    """
+    errors = list()
+
+    start = profiling.timer()
     try:
         node.__upgradeapi__()
         node.upgrade()
     except Exception as excp:
-        logger.error(
-            "[upgradeOnNodeCreateEvent] Cannot upgrade BaseCustomNode node {}: {}\n{}"
-            "".format(node, excp, traceback.format_exc()),
-        )
+        errors.append(("upgrade", excp, traceback.format_exc()))
+    profiling.NODE_TIMINGS.record(
+        node.getType(), "upgrade", profiling.timer() - start
+    )
 
     try:
-        node.__toggleDebugMode__(True if c.Env.get(c.Env.NODE_PARAM_DEBUG) else False)
+        node.__toggleDebugMode__(debug)
     except Exception as excp:
-        logger.error(
-            "[upgradeOnNodeCreateEvent] Error while calling __toggleDebugMode__ "
-            "on node {}: {}\n{}".format(node, excp, traceback.format_exc()),
-        )
+        errors.append(("__toggleDebugMode__", excp, traceback.format_exc()))
 
-    return
+    return errors
 
 
-def _createCustomNode(class_name):
-    # type: (str) -> Optional[NodegraphAPI.Node]
+def _isNodeAlive(node):
+    # type: (NodegraphAPI.Node) -> bool
+    """
+    Returns:
+        False if the node has been deleted (or replaced by a node of the same name).
+    """
+    try:
+        return NodegraphAPI.GetNode(node.getName()) is node
+    except Exception:
+        return False
+
+
+def processDeferredUpgrades():
+    # type: () -> Dict[str, str]
     """
+    Upgrade all the BaseCustomNode whose upgrade has been deferred during a scene
+    loading or a paste (see ``deferredUpgrades``).
 
-    Args:
-        class_name: name of the tool to create, must be previously registered.
+    Nodes deleted in the meantime are skipped, each node is processed once. The undo
+    capture is disabled and all errors are logged in a single report.
 
     Returns:
-        Instance of the node created in the Nodegraph.
+        error message per node name, for the nodes that failed to upgrade.
     """
-    custom_tool_class = REGISTERED[class_name]
-    node = None  # type: entities.BaseCustomNode
+    nodes = list(_DEFERRED_NODES)
+    del _DEFERRED_NODES[:]
+    if not nodes:
+        return dict()
 
-    Utils.UndoStack.DisableCapture()
+    debug = config.getConfig().node_param_debug
+    report = dict()  # type: Dict[str, str]
+    processed = set()
 
+    Utils.UndoStack.DisableCapture()
     try:
+        for node in nodes:
 
-        node = NodegraphAPI.CreateNode(c.KATANA_TYPE_NAME)
-
-        node.__class__ = custom_tool_class
-        node.setType(class_name)
-        if not NodegraphAPI.NodegraphGlobals.IsLoading():
-            node.setName(class_name)
-            node.__build__()
+            if id(node) in processed or not _isNodeAlive(node):
+                continue
+            processed.add(id(node))
 
-    except Exception as excp:
-        logger.error(
-            '[_createCustomNode] Error creating BaseCustomNode of type "{}": {}\n{}'
-            "".format(class_name, excp, traceback.format_exc())
-        )
-        if node:
-            node.delete()
+            errors = _upgradeNode(node, debug)
+            if not errors:
+                continue
 
+            report[node.getName()] = "; ".join(
+                "{}: {!r}".format(step, excp) for step, excp, trace in errors
+            )
+            for step, excp, trace in errors:
+                logger.debug(
+                    "[processDeferredUpgrades] {} on {}:\n{}".format(step, node, trace)
+                )
     finally:
         Utils.UndoStack.EnableCapture()
 
-    return node
+    if report:
+        logger.error(
+            "[processDeferredUpgrades] {} nodes failed to upgrade (on {}): {}".format(
+                len(report),
+                len(processed),
+                json.dumps(report, indent=4, sort_keys=True),
+            )
+        )
+    logger.debug(
+        "[processDeferredUpgrades] Finished upgrading {} nodes ({} queued)."
+        "".format(len(processed), len(nodes))
+    )
+    return report
 
 
-def _registerNodePackage(package):
-    # type: (ModuleType) ->  Dict[str, Type[entities.BaseCustomNode]]
+def reloadNodes():
+    # type: () -> List[str]
     """
+    Reload the python modules defining registered nodes that have been modified
+    since they were imported, and update the live nodes in the scene.
 
-    Args:
-        package: python <module> object to import the custom tools from
+    For each modified module :
+
+    - only this module is reloaded (not its parent package or the other modules)
+    - the new classes replace the old ones in ``REGISTERED``
+    - existing nodes of those types are assigned the new class and upgraded.
+
+    Nodes registered lazily that were never used are not affected as they will be
+    imported from the latest source anyway.
 
     Returns:
-        all the custom tools loaded as dict[tool_name, tool_class]
+        name of the nodes that have been reloaded.
     """
+    modified_modules = dict()  # type: Dict[str, List[str]]
 
-    customnodes_dict = _getAvailableNodesInPackage(package=package)
+    for node_name in REGISTERED:
 
-    for tool_module_name, tool_class in customnodes_dict.items():
+        if not REGISTERED.isResolved(node_name):
+            continue
 
-        if tool_class.name in REGISTERED:
-            logger.error(
-                "[_registerNodePackage] alreadyRegisteredError: node <{0}>"
-                "is already registered in the REGISTERED global.\n"
-                "(node=<{0}>, package=<{1}>, module=<{2}>)"
-                "".format(tool_class.name, tool_module_name, package)
-            )
+        module_name = REGISTERED.peek(node_name).__module__
+        if module_name in modified_modules:
+            modified_modules[module_name].append(node_name)
             continue
 
-        if tool_class._registered:
+        module = sys.modules.get(module_name)
+        path = _getSourceFile(module) if module else None
+        if path and cache.getFileFingerprint(path) != _SOURCE_FINGERPRINTS.get(
+            module_name
+        ):
+            modified_modules[module_name] = [node_name]
+
+    reloaded = list()
+
+    for module_name, node_names in modified_modules.items():
+
+        module = sys.modules[module_name]
+        # reloading doesn't clear the module namespace: classes removed from the
+        # source would still be found (kept referenced so their id can't be reused)
+        previous_classes = dict(
+            (id(value), value)
+            for value in module.__dict__.values()
+            if inspect.isclass(value)
+        )
+        try:
+            module = _reloadModule(module)
+        except Exception as excp:
             logger.error(
-                "[_registerNodePackage] alreadyRegisteredError: the node has its class"
-                "variable `_registered` set to True while it is not in `REGISTERED`"
-                "which mean it has been registered from somewhere else.\n"
-                "(node=<{}>, package=<{}>)"
-                "".format(tool_module_name, package)
+                "[reloadNodes] Cannot reload module <{}>: {}\n{}"
+                "".format(module_name, excp, traceback.format_exc())
             )
             continue
 
-        NodegraphAPI.RegisterPythonNodeFactory(tool_class.name, _createCustomNode)
-        NodegraphAPI.AddNodeFlavor(tool_class.name, c.KATANA_FLAVOR_NAME)
-        tool_class._registered = True
-        REGISTERED[tool_class.name] = tool_class
-
-        logger.debug(
-            "[_registerNodePackage] registered ({}){}"
-            "".format(tool_module_name, tool_class)
+        _SOURCE_FINGERPRINTS[module_name] = cache.getFileFingerprint(
+            _getSourceFile(module)
+        )
+        new_classes = dict(
+            (node_class.name, node_class)
+            for node_class in module.__dict__.values()
+            if inspect.isclass(node_class)
+            and issubclass(node_class, entities.BaseCustomNode)
+            and node_class.__module__ == module_name
+            and id(node_class) not in previous_classes
         )
-        continue
 
-    logger.debug(
-        "[_registerNodePackage] Finished registering package {}, {} node found."
-        "".format(package, len(customnodes_dict))
+        for node_name in node_names:
+
+            node_class = new_classes.get(node_name)
+            if node_class is None:
+                logger.warning(
+                    "[reloadNodes] Node <{}> is not defined anymore in <{}>, keeping "
+                    "the previous version.".format(node_name, module_name)
+                )
+                continue
+
+            try:
+                node_class._check()
+            except AssertionError as excp:
+                logger.error(
+                    "[reloadNodes] InvalidNodeClass: {}, keeping the previous "
+                    "version:\n   {}".format(node_class, excp)
+                )
+                continue
+
+            node_class._registered = True
+            REGISTERED[node_name] = node_class
+            _upgradeLiveNodes(node_name, node_class)
+            reloaded.append(node_name)
+            continue
+
+        for node_name, node_class in new_classes.items():
+            if node_name not in REGISTERED:
+                logger.info(
+                    "[reloadNodes] New node {} in <{}> is ignored : a new session is "
+                    "required to register it.".format(node_class, module_name)
+                )
+
+    logger.info(
+        "[reloadNodes] Finished. Reloaded {} modules, {} nodes: {}"
+        "".format(len(modified_modules), len(reloaded), reloaded)
     )
-    return customnodes_dict
+    return reloaded
 
 
-def _getAvailableNodesInPackage(package):
-    # type: (ModuleType) -> Dict[str, Type[entities.BaseCustomNode]]
+def _upgradeLiveNodes(node_name, node_class):
+    # type: (str, Type[entities.BaseCustomNode]) -> None
     """
-    _getAllNodesInPackage() but filtered to remove the tools that have been asked to be
-    ignored using an environment variable.
+    Assign the given class to all the existing nodes of the given type and upgrade
+    them, like when they are created.
+    """
+    Utils.UndoStack.DisableCapture()
+    try:
+        for node in NodegraphAPI.GetAllNodesByType(node_name):
+            node.__class__ = node_class
+            try:
+                node.__upgradeapi__()
+                node.upgrade()
+            except Exception as excp:
+                logger.error(
+                    "[_upgradeLiveNodes] Cannot upgrade node {}: {}\n{}"
+                    "".format(node, excp, traceback.format_exc()),
+                )
+    finally:
+        Utils.UndoStack.EnableCapture()
+    return
+
 
+def _getSceneNodes():
+    # type: () -> List[entities.BaseCustomNode]
+    """
     Returns:
-        dict of module_name, BaseCustomNode class defined in the module
+        all the registered BaseCustomNode instances in the scene.
     """
-    import os  # defer import to get the latest version of os.environ
-
-    all_nodes = _getAllNodesInPackage(package)
+    nodes = list()
+    for node_name in REGISTERED:
+        # nodes can't be created before their class is resolved
+        if REGISTERED.isResolved(node_name):
+            nodes += NodegraphAPI.GetAllNodesByType(node_name)
+    return nodes
 
-    excluded_nodes_var = c.Env.get(c.Env.EXCLUDED_NODES)
-    if not excluded_nodes_var:
-        return all_nodes
 
-    excluded_dict = dict()
-    excluded_keys = list()
-    # this is a list of Class names as fnmatch expressions !
-    class_names_to_exclude = excluded_nodes_var.split(os.pathsep)
+def setSceneDebugMode(enable):
+    # type: (bool) -> int
+    """
+    Enable or disable the debug mode on all the BaseCustomNode in the scene.
 
-    for module_name, basecustomnode in all_nodes.items():
+    Args:
+        enable: True to enable debug mode, False to make it back to normal
 
-        for namepattern in class_names_to_exclude:
+    Returns:
+        number of nodes whose debug mode was changed.
+    """
+    changed = 0
 
-            if fnmatch.fnmatch(basecustomnode.__name__, namepattern):
-                excluded_keys.append(module_name)
-                excluded_dict[basecustomnode.__name__] = "excluded by: {}".format(
-                    namepattern
-                )
+    Utils.UndoStack.DisableCapture()
+    try:
+        for node in _getSceneNodes():
+            if node.isInDebugMode() == enable:
                 continue
+            try:
+                node.__toggleDebugMode__(enable)
+                changed += 1
+            except Exception as excp:
+                logger.error(
+                    "[setSceneDebugMode] Error while calling __toggleDebugMode__ "
+                    "on node {}: {}\n{}".format(node, excp, traceback.format_exc()),
+                )
+    finally:
+        Utils.UndoStack.EnableCapture()
 
-    # as we can't delete key in a dict we are iterating over :
-    for excluded in excluded_keys:
-        del all_nodes[excluded]
+    logger.debug("[setSceneDebugMode] Changed {} nodes.".format(changed))
+    return changed
 
-    logger.debug(
-        "[_getAvailableNodesInPackage] Finished. Excluded {} nodes: {}".format(
-            len(excluded_dict),
-            json.dumps(excluded_dict, indent=4, default=str, sort_keys=True),
-        )
-    )
-    return all_nodes
 
+def previewSceneMigrations():
+    # type: () -> List[Dict]
+    """
+    Dry-run of the upgrade of all the BaseCustomNode in the scene: find which nodes
+    are outdated and which migration steps would be run on them, without modifying
+    anything.
 
-def _getAllNodesInPackage(package):
-    # type: (ModuleType) -> Dict[str, Type[entities.BaseCustomNode]]
+    Returns:
+        see ``migration.previewMigration``, one dict per outdated node.
     """
-    Get a list of all the "tools" modules available in the given package.
+    return migration.previewMigrations(_getSceneNodes())
 
-    Not recommended to use as the "final" function. See ``getAvailableTools()`` instead.
 
-    SRC: https://stackoverflow.com/a/1310912/13806195
+def writeManifestFor(package_id):
+    # type: (str) -> str
+    """
+    Import the given library and write a manifest file listing all the BaseCustomNode
+    it provides, so it can later be registered without being imported.
+
+    To call again each time the nodes provided by the library are modified.
+
+    Args:
+        package_id: python package name of the library, must be in the PYTHONPATH.
 
     Returns:
-        dict of module_name, BaseCustomNode class defined in the module
+        path of the manifest file written.
     """
+    package = importlib.import_module(package_id)  # type: ModuleType
+    all_nodes = _getAllNodesInPackage(package)
+    entries = [registry.NodeEntry.fromClass(node) for node in all_nodes.values()]
+    entries.sort(key=lambda entry: entry.name)
 
-    out = dict()
+    path = registry.getManifestPath(package.__path__[0])
+    registry.writeManifest(path, entries)
+    logger.info(
+        "[writeManifestFor] Wrote manifest with {} nodes to <{}>"
+        "".format(len(entries), path)
+    )
+    return path
 
-    for objectName, objectData in package.__dict__.items():
 
-        if objectName.startswith("_"):
-            continue
+def _createCustomNode(class_name):
+    # type: (str) -> Optional[NodegraphAPI.Node]
+    """
 
-        if not inspect.isclass(objectData):
-            continue
+    Args:
+        class_name: name of the tool to create, must be previously registered.
 
-        if not issubclass(objectData, entities.BaseCustomNode):
-            continue
+    Returns:
+        Instance of the node created in the Nodegraph.
+    """
+    node = None  # type: entities.BaseCustomNode
 
-        try:
-            objectData._check()
-        except AssertionError as excp:
-            logger.error(
-                "[_getAllNodesInPackage] InvalidNodeClass: class <{}> for package {}:\n"
-                "   {}".format(objectData, package, excp)
+    Utils.UndoStack.DisableCapture()
+
+    try:
+        node = _instantiateCustomNode(class_name)
+
+    except Exception as excp:
+        logger.error(
+            '[_createCustomNode] Error creating BaseCustomNode of type "{}": {}\n{}'
+            "".format(class_name, excp, traceback.format_exc())
+        )
+
+    finally:
+        Utils.UndoStack.EnableCapture()
+
+    return node
+
+
+def _instantiateCustomNode(class_name, parent=None, build_errors=False):
+    # type: (str, Optional[NodegraphAPI.Node], bool) -> entities.BaseCustomNode
+    """
+    Create and build a node of the given registered type. Only the node creation
+    itself is captured in the undo stack (if not already disabled by the caller).
+
+    Args:
+        class_name: name of the tool to create, must be previously registered.
+        parent: node to create it in, default to the root node.
+        build_errors: True to raise the errors happening in ``__build__``.
+
+    Raises:
+        Exception: any error, in which case the node is deleted.
+    """
+    start = profiling.timer()
+    node = _buildCustomNode(class_name, parent, build_errors)
+    profiling.NODE_TIMINGS.record(class_name, "create", profiling.timer() - start)
+    return node
+
+
+def _buildCustomNode(class_name, parent, build_errors):
+    # type: (str, Optional[NodegraphAPI.Node], bool) -> entities.BaseCustomNode
+    """
+    ``_instantiateCustomNode`` without the timing.
+    """
+    node, built = _newCustomNode(class_name, parent)
+    if built:
+        return node
+
+    Utils.UndoStack.DisableCapture()
+    try:
+        _setupCustomNode(node, class_name, class_name, build_errors)
+    except Exception:
+        node.delete()
+        raise
+    finally:
+        Utils.UndoStack.EnableCapture()
+
+    return node
+
+
+def _usePrototype(custom_tool_class):
+    # type: (Type[entities.BaseCustomNode]) -> bool
+    return (
+        custom_tool_class.use_prototype_cache
+        and not NodegraphAPI.NodegraphGlobals.IsLoading()
+    )
+
+
+def _newCustomNode(class_name, parent):
+    # type: (str, Optional[NodegraphAPI.Node]) -> Tuple[NodegraphAPI.Node, bool]
+    """
+    Create the node of the given registered type, the only step captured in the
+    undo stack.
+
+    Returns:
+        (node, True) if the node was cloned from its prototype, else the node still
+        to set up with ``_setupCustomNode``, and False.
+    """
+    # this might import the class for the first time if lazily registered
+    custom_tool_class = REGISTERED[class_name]
+
+    if _usePrototype(custom_tool_class):
+        node = _createFromPrototype(custom_tool_class, parent)
+        if node is not None:
+            return node, True
+
+    return NodegraphAPI.CreateNode(c.KATANA_TYPE_NAME, parent), False
+
+
+def _setupCustomNode(node, class_name, node_name, build_errors):
+    # type: (NodegraphAPI.Node, str, str, bool) -> None
+    """
+    Turn a node created by ``_newCustomNode`` into the given registered type and
+    build it. Must be called with the undo capture disabled.
+
+    Args:
+        node_name: name to give to the node, made unique by Katana if already used
+    """
+    custom_tool_class = REGISTERED[class_name]
+    node.__class__ = custom_tool_class
+    node.setType(class_name)
+    if not NodegraphAPI.NodegraphGlobals.IsLoading():
+        node.setName(node_name)
+        node.__build__(raise_error=build_errors)
+
+    if _usePrototype(custom_tool_class):
+        prototype.PROTOTYPES.set(custom_tool_class, prototype.serializeNode(node))
+
+
+def _iterFreeNames(node_type):
+    # type: (str) -> Iterator[str]
+    """
+    Yields:
+        node names not used yet, named like ``BaseCustomNode`` does once built :
+        ``{node_type}_0001``, ``{node_type}_0002``, ... The names must be used as
+        soon as yielded.
+    """
+    index = 1
+    while True:
+        name = "{}_{:04d}".format(node_type, index)
+        if NodegraphAPI.GetNode(name) is None:
+            yield name
+        index += 1
+
+
+def createNodes(node_types, parent=None, params=None, undo_name="Create Nodes"):
+    # type: (Sequence[str], Optional[NodegraphAPI.Node], Optional[Sequence[Dict[str, Any]]], str) -> List[Tuple[Optional[entities.BaseCustomNode], Optional[str]]]
+    """
+    Create multiple BaseCustomNode at once, as a single undo operation.
+
+    Unlike calling ``NodegraphAPI.CreateNode`` for each node, only the node creations
+    are captured in the undo stack, the nodes are built and upgraded with the undo
+    capture disabled once for the whole batch, they are given names that are already
+    unique and errors are returned per node instead of being logged.
+
+    Args:
+        node_types: registered type of each node to create
+        parent: node to create them in, default to the root node
+        params:
+            optional, for each node, a dict of parameter path -> value to set on
+            the node once built. ex: ``[{"user.CEL": "/root/world//*"}, ...]``
+        undo_name: name of the undo entry
+
+    Returns:
+        (node, None) for each node created, in order. If creating a node failed,
+        it's deleted and (None, error message) is returned instead.
+    """
+    parent = parent or NodegraphAPI.GetRootNode()
+    params = params or [None] * len(node_types)
+    if len(params) != len(node_types):
+        raise ValueError(
+            "params must have the same length as node_types: {} != {}"
+            "".format(len(params), len(node_types))
+        )
+
+    results = list()
+    # (node, built, creation time) per node, or the error message
+    created = list()  # type: List[Union[Tuple[NodegraphAPI.Node, bool, float], str]]
+    free_names = dict()  # type: Dict[str, Iterator[str]]
+
+    Utils.UndoStack.OpenGroup(undo_name)
+    try:
+        # only the node creations are captured in the undo stack
+        for node_type in node_types:
+            start = profiling.timer()
+            try:
+                node, built = _newCustomNode(node_type, parent)
+            except Exception as excp:
+                logger.debug(
+                    "[createNodes] Cannot create {}:\n{}"
+                    "".format(node_type, traceback.format_exc())
+                )
+                created.append("{}: {!r}".format(node_type, excp))
+                continue
+            created.append((node, built, profiling.timer() - start))
+
+        settings = config.getConfig()
+        debug = settings.node_param_debug
+        upgrade = not settings.upgrade_disable
+
+        Utils.UndoStack.DisableCapture()
+        try:
+            for node_type, node_params, creation in zip(node_types, params, created):
+
+                if not isinstance(creation, tuple):
+                    results.append((None, creation))
+                    continue
+
+                node, built, duration = creation
+                start = profiling.timer()
+                try:
+                    if not built:
+                        # unique names found once per type instead of per node
+                        if node_type not in free_names:
+                            free_names[node_type] = _iterFreeNames(node_type)
+                        node_name = next(free_names[node_type])
+                        _setupCustomNode(node, node_type, node_name, build_errors=True)
+                    if node_params:
+                        _setParamValues(node, node_params)
+                except Exception as excp:
+                    node.delete()
+                    logger.debug(
+                        "[createNodes] Cannot create {}:\n{}"
+                        "".format(node_type, traceback.format_exc())
+                    )
+                    results.append((None, "{}: {!r}".format(node_type, excp)))
+                    continue
+
+                duration += profiling.timer() - start
+                profiling.NODE_TIMINGS.record(node_type, "create", duration)
+                results.append((node, None))
+
+            for index, (node, error) in enumerate(results):
+                if node is None or not upgrade:
+                    continue
+                errors = _upgradeNode(node, debug)
+                if errors:
+                    message = "; ".join(
+                        "{}: {!r}".format(step, excp) for step, excp, trace in errors
+                    )
+                    results[index] = (node, message)
+        finally:
+            Utils.UndoStack.EnableCapture()
+
+    finally:
+        Utils.UndoStack.CloseGroup()
+
+    logger.debug(
+        "[createNodes] Created {}/{} nodes."
+        "".format(len([node for node, error in results if node]), len(results))
+    )
+    return results
+
+
+def _setParamValues(node, values):
+    # type: (NodegraphAPI.Node, Dict[str, Any]) -> None
+    Utils.UndoStack.DisableCapture()
+    try:
+        for path, value in values.items():
+            param = node.getParameter(path)
+            if not param:
+                raise ValueError("No parameter <{}> on node {}".format(path, node))
+            param.setValue(value, 0)
+    finally:
+        Utils.UndoStack.EnableCapture()
+
+
+def _createFromPrototype(node_class, parent=None):
+    # type: (Type[entities.BaseCustomNode], Optional[NodegraphAPI.Node]) -> Optional[entities.BaseCustomNode]
+    """
+    Returns:
+        a new node cloned from the cached prototype of the given class, or None if
+        there is no prototype yet.
+    """
+    xml_text = prototype.PROTOTYPES.get(node_class)
+    if xml_text is None:
+        return None
+
+    node = None
+    try:
+        node = prototype.instantiatePrototype(xml_text, parent)
+        if node is None or node.__class__ is not node_class:
+            raise TypeError("prototype produced {}".format(node))
+    except Exception as excp:
+        logger.warning(
+            "[_createFromPrototype] Discarding invalid prototype for {}: {}"
+            "".format(node_class, excp)
+        )
+        if node is not None:
+            node.delete()
+        prototype.PROTOTYPES.discard(node_class.name)
+        return None
+
+    return node
+
+
+def _getPrototypesToPrewarm():
+    # type: () -> List[str]
+    """
+    Returns:
+        name of the registered nodes using ``use_prototype_cache`` that don't have a
+        prototype yet. Only nodes already imported are returned, to not defeat lazy
+        registering.
+    """
+    out = list()
+    for node_name in sorted(REGISTERED):
+        if not REGISTERED.isResolved(node_name):
+            continue
+        node_class = REGISTERED.peek(node_name)
+        if node_class.use_prototype_cache and node_class not in prototype.PROTOTYPES:
+            out.append(node_name)
+    return out
+
+
+def prewarmPrototypes():
+    # type: () -> List[str]
+    """
+    Build the prototype of the registered nodes using ``use_prototype_cache`` that
+    don't have one yet, so their first creation is fast too.
+
+    Only nodes already imported are processed, to not defeat lazy registering.
+    They are built in a temporary group deleted once finished, without touching the
+    undo stack. Called at idle time once ``registerCallbacks`` has been called.
+
+    Returns:
+        name of the nodes whose prototype has been built.
+    """
+    node_names = _getPrototypesToPrewarm()
+    if not node_names:
+        return list()
+
+    built = list()
+    with suspendCallbacks():
+        Utils.UndoStack.DisableCapture()
+        try:
+            group = NodegraphAPI.CreateNode("Group", NodegraphAPI.GetRootNode())
+            group.setName("katananodling_prototypes")
+            try:
+                for node_name in node_names:
+                    try:
+                        node = _instantiateCustomNode(node_name, parent=group)
+                    except Exception as excp:
+                        logger.error(
+                            "[prewarmPrototypes] Cannot build {}: {}\n{}"
+                            "".format(node_name, excp, traceback.format_exc())
+                        )
+                        continue
+                    node.delete()
+                    built.append(node_name)
+            finally:
+                group.delete()
+        finally:
+            Utils.UndoStack.EnableCapture()
+
+    logger.debug("[prewarmPrototypes] Built {} prototypes: {}".format(len(built), built))
+    return built
+
+
+def _prewarmPrototypesOnIdle(*args, **kwargs):
+    Utils.EventModule.UnregisterEventHandler(_prewarmPrototypesOnIdle, "event_idle")
+    try:
+        prewarmPrototypes()
+    except Exception as excp:
+        logger.error(
+            "[_prewarmPrototypesOnIdle] {}\n{}".format(excp, traceback.format_exc())
+        )
+
+
+def _registerPackage(package_id, lazy_loading, node_filter, registry_cache=None):
+    # type: (str, bool, filters.NodeFilter, Optional[cache.RegistryCache]) -> None
+    """
+    Register the nodes of the given library, using the fastest method available.
+
+    Args:
+        package_id: python package name of the library
+        lazy_loading: True to try to register the library without importing it
+        node_filter: filter to decide which nodes must be registered
+        registry_cache: optional cache to register from
+    """
+    if lazy_loading and _registerLazyPackage(package_id, node_filter, registry_cache):
+        return
+
+    if registry_cache and _registerCachedPackage(
+        package_id, node_filter, registry_cache
+    ):
+        return
+
+    try:
+        with profiling.PROFILER.measure("import"):
+            package = importlib.import_module(package_id)  # type: ModuleType
+    except Exception as excp:
+        logger.error(
+            "[registerNodesFor] Cannot import package <{}>: {}\n{}"
+            "".format(package_id, excp, traceback.format_exc())
+        )
+        return
+
+    # registered tools can be found in REGISTERED global anyway
+    _registerNodePackage(
+        package=package,
+        node_filter=node_filter,
+        registry_cache=registry_cache,
+    )
+    return
+
+
+def _registerNodePackage(package, node_filter=None, registry_cache=None):
+    # type: (ModuleType, Optional[filters.NodeFilter], Optional[cache.RegistryCache]) ->  Dict[str, Type[entities.BaseCustomNode]]
+    """
+
+    Args:
+        package: python <module> object to import the custom tools from
+        node_filter: filter to use, built from the environment if not specified
+        registry_cache:
+            if specified, used to skip validation of the nodes whose file didn't
+            change, and updated with the nodes found.
+
+    Returns:
+        all the custom tools loaded as dict[tool_name, tool_class]
+    """
+    validated = None
+    package_files = None
+    if registry_cache:
+        with profiling.PROFILER.measure("discovery"):
+            package_files = cache.getLibraryFiles(package.__path__[0])
+            entries, stale = registry_cache.getEntries(package.__name__, package_files)
+            validated = {
+                (entry.module, entry.class_name): valid for entry, valid in entries
+            }
+
+    discovered = _discoverNodesInPackage(package, validated=validated)
+
+    if registry_cache:
+        with profiling.PROFILER.measure("discovery"):
+            cached_entries = dict()
+            for tool_class, valid in discovered.values():
+                path = _getSourceFile(tool_class)
+                cached_entry = (registry.NodeEntry.fromClass(tool_class), valid)
+                cached_entries.setdefault(path, list()).append(cached_entry)
+            registry_cache.setEntries(
+                package.__name__, package_files, cached_entries
+            )
+
+    customnodes_dict = {
+        object_name: tool_class
+        for object_name, (tool_class, valid) in discovered.items()
+        if valid
+    }
+    customnodes_dict = _filterExcludedNodes(customnodes_dict, node_filter)
+    _registerNodeClasses(customnodes_dict, package)
+
+    logger.debug(
+        "[_registerNodePackage] Finished registering package {}, {} node found."
+        "".format(package, len(customnodes_dict))
+    )
+    return customnodes_dict
+
+
+def _registerNodeClasses(customnodes_dict, package):
+    # type: (Dict[str, Type[entities.BaseCustomNode]], ModuleType) -> None
+    """
+    Register the given BaseCustomNode classes, already validated and filtered.
+
+    Args:
+        customnodes_dict: classes per their name in the library namespace
+        package: library the classes are from
+    """
+    for tool_module_name, tool_class in customnodes_dict.items():
+
+        if tool_class._registered and tool_class.name not in REGISTERED:
+            logger.error(
+                "[_registerNodePackage] alreadyRegisteredError: the node has its class"
+                "variable `_registered` set to True while it is not in `REGISTERED`"
+                "which mean it has been registered from somewhere else.\n"
+                "(node=<{}>, package=<{}>)"
+                "".format(tool_module_name, package)
+            )
+            continue
+
+        if not _registerNode(tool_class, origin=package):
+            continue
+
+        tool_class._registered = True
+        _trackNodeSource(tool_class)
+        continue
+
+    return
+
+
+def _registerLazyPackage(package_id, node_filter, registry_cache=None):
+    # type: (str, filters.NodeFilter, Optional[cache.RegistryCache]) -> bool
+    """
+    Register lazily the nodes of the given library without importing it.
+
+    The nodes are retrieved from the library's manifest if it has one, else they are
+    statically discovered by parsing the library source files.
+
+    Args:
+        package_id: python package name of the library
+        node_filter: filter to decide which nodes must be registered
+        registry_cache: if specified used to skip parsing unmodified libraries.
+
+    Returns:
+        False if nothing was registered: the library cannot be found, or some of its
+        nodes cannot be discovered statically and it must be imported.
+    """
+    with profiling.PROFILER.measure("discovery"):
+        entries = _getManifestEntries(package_id)
+        if entries is None:
+            entries = _getStaticEntries(package_id, registry_cache)
+    if entries is None:
+        return False
+
+    _registerNodeEntries(entries, package_id, node_filter)
+    return True
+
+
+def _getStaticEntries(package_id, registry_cache=None):
+    # type: (str, Optional[cache.RegistryCache]) -> Optional[List[registry.NodeEntry]]
+    """
+    With a registry cache, only the files modified since they were cached are
+    parsed again. As nodes can inherit attributes from classes defined in other
+    files, all the entries are then resolved again from the parsed files.
+
+    Returns:
+        valid NodeEntry found by parsing the library source files, or None if the
+        library cannot be found or if some of its nodes can only be found by
+        importing it.
+    """
+    package_dir = util.findPackageDirectory(package_id)
+    if not package_dir:
+        return None
+
+    package_files = cache.getLibraryFiles(package_dir)
+    modules = dict()  # type: Dict[str, discovery.ModuleInfo]
+
+    if registry_cache:
+        entries, stale = registry_cache.getEntries(package_id, package_files)
+        if not stale:
+            return [entry for entry, valid in entries if valid]
+
+        fresh = [path for path in package_files if path not in stale]
+        for path, data in registry_cache.getModules(package_id, fresh).items():
+            try:
+                modules[path] = discovery.ModuleInfo.fromDict(data, path)
+            except (KeyError, TypeError, ValueError):
+                continue
+        logger.debug(
+            "[_getStaticEntries] <{}>: {} files changed, {} parsed files cached."
+            "".format(package_id, len(stale), len(modules))
+        )
+
+    modules.update(
+        discovery.parseDirectory(
+            package_dir,
+            package_id,
+            [path for path in package_files if path not in modules],
+        )
+    )
+    unresolved = list()  # type: List[discovery.ClassInfo]
+    discovered = discovery.discoverNodesInModules(
+        modules.values(), unresolved=unresolved, package=package_id
+    )
+    if unresolved:
+        # not cached, so the entries of the imported library are cached instead
+        logger.info(
+            "[_getStaticEntries] <{}> will be imported, {} nodes cannot be "
+            "discovered statically.".format(package_id, len(unresolved))
+        )
+        return None
+
+    if registry_cache:
+        registry_cache.setEntries(
+            package_id,
+            package_files,
+            discovered,
+            modules=dict(
+                (path, module_info.asdict()) for path, module_info in modules.items()
+            ),
+        )
+
+    return [
+        entry
+        for file_entries in discovered.values()
+        for entry, valid in file_entries
+        if valid
+    ]
+
+
+def _registerCachedPackage(package_id, node_filter, registry_cache):
+    # type: (str, filters.NodeFilter, cache.RegistryCache) -> bool
+    """
+    Register lazily the nodes of the given library from the cache, skipping import,
+    discovery and validation.
+
+    When some files changed since they were cached, the library is imported (to
+    know which nodes it exports) but only the nodes defined in the changed files are
+    discovered, validated and cached again. The other nodes are still registered
+    from the cache.
+
+    Returns:
+        False if nothing was registered: the library cannot be found or imported, or
+        its ``__init__`` changed and the nodes it exports might be different.
+    """
+    package_dir = util.findPackageDirectory(package_id)
+    if not package_dir:
+        return False
+
+    with profiling.PROFILER.measure("discovery"):
+        package_files = cache.getLibraryFiles(package_dir)
+        entries, stale = registry_cache.getEntries(package_id, package_files)
+
+    if os.path.join(package_dir, "__init__.py") in stale:
+        logger.debug(
+            "[_registerCachedPackage] Cache outdated for <{}>: __init__ changed."
+            "".format(package_id)
+        )
+        return False
+
+    if stale:
+        logger.debug(
+            "[_registerCachedPackage] {} files changed for <{}>, updating their "
+            "nodes only.".format(len(stale), package_id)
+        )
+        try:
+            with profiling.PROFILER.measure("import"):
+                package = importlib.import_module(package_id)  # type: ModuleType
+        except Exception as excp:
+            logger.debug(
+                "[_registerCachedPackage] Cannot import <{}>: {}".format(
+                    package_id, excp
+                )
             )
+            return False
+        _registerStaleNodes(
+            package, package_files, stale, entries, node_filter, registry_cache
+        )
+
+    entries = [entry for entry, valid in entries if valid]
+    _registerNodeEntries(entries, package_id, node_filter)
+    return True
+
+
+def _registerStaleNodes(
+    package, package_files, stale, entries, node_filter, registry_cache
+):
+    # type: (ModuleType, List[str], Set[str], List[Tuple[registry.NodeEntry, bool]], filters.NodeFilter, cache.RegistryCache) -> None
+    """
+    Register the nodes exported by the given library that are defined in the given
+    modified files, and update their cache.
+
+    Args:
+        package: imported library
+        package_files: all the python source files currently in the library
+        stale: source files modified since they were cached
+        entries: (entry, is_valid) cached for the other files
+        node_filter: filter to decide which nodes must be registered
+        registry_cache: cache to update
+    """
+    validated = dict(
+        ((entry.module, entry.class_name), valid) for entry, valid in entries
+    )
+    discovered = _discoverNodesInPackage(package, validated=validated)
+
+    existing = set(package_files)
+    stale_entries = dict(
+        (path, list()) for path in stale if path in existing
+    )  # type: Dict[str, List[Tuple[registry.NodeEntry, bool]]]
+    customnodes_dict = dict()
+
+    for object_name, (tool_class, valid) in discovered.items():
+        path = _getSourceFile(tool_class)
+        if path not in stale_entries:
+            continue  # registered from the cache
+        stale_entries[path].append((registry.NodeEntry.fromClass(tool_class), valid))
+        if valid:
+            customnodes_dict[object_name] = tool_class
+
+    registry_cache.updateEntries(package.__name__, package_files, stale_entries)
+    customnodes_dict = _filterExcludedNodes(customnodes_dict, node_filter)
+    _registerNodeClasses(customnodes_dict, package)
+    return
+
+
+def _registerNodeEntries(entries, package_id, node_filter):
+    # type: (List[registry.NodeEntry], str, filters.NodeFilter) -> None
+    """
+    Register the given entries lazily: the class they describe will only be imported
+    the first time they are accessed in ``REGISTERED``.
+
+    Args:
+        entries: entries from the library's manifest
+        package_id: name of the library the entries are from
+        node_filter: filter to decide which entries must be registered
+    """
+    excluded_dict = dict()
+    registered = 0
+
+    for entry in entries:
+
+        with profiling.PROFILER.measure("filtering", node=entry.name):
+            reason = node_filter.getExclusionReason(
+                entry.class_name, entry.module, entry.author, entry.name
+            )
+        if reason:
+            excluded_dict[entry.class_name] = reason
             continue
 
-        out[objectName] = objectData
+        if _registerNode(entry, origin=package_id):
+            registered += 1
+
+    logger.debug(
+        "[_registerNodeEntries] Finished registering package {}, {}/{} node "
+        "registered lazily. Excluded {} nodes: {}".format(
+            package_id,
+            registered,
+            len(entries),
+            len(excluded_dict),
+            json.dumps(excluded_dict, indent=4, default=str, sort_keys=True),
+        )
+    )
+    return
+
+
+def _registerNode(node, origin):
+    # type: (Union[Type[entities.BaseCustomNode], registry.NodeEntry], object) -> bool
+    """
+    Register the given BaseCustomNode class or NodeEntry in Katana and in the
+    REGISTERED global.
+
+    Args:
+        node: BaseCustomNode class or its lazy NodeEntry equivalent
+        origin: object the node is coming from, used for logging.
+
+    Returns:
+        True if the node was registered, False if an error happened.
+    """
+    if node.name in REGISTERED:
+        logger.error(
+            "[_registerNode] alreadyRegisteredError: node <{0}>"
+            "is already registered in the REGISTERED global.\n"
+            "(node=<{0}>, origin=<{1}>, object=<{2}>)"
+            "".format(node.name, origin, node)
+        )
+        return False
+
+    flavors = getattr(node, "flavors", (c.KATANA_FLAVOR_NAME,))
+
+    with profiling.PROFILER.measure("registration", node=node.name):
+        NodegraphAPI.RegisterPythonNodeFactory(node.name, _createCustomNode)
+        for flavor in flavors:
+            NodegraphAPI.AddNodeFlavor(node.name, flavor)
+        REGISTERED[node.name] = node
+
+    logger.debug("[_registerNode] registered ({}){}".format(origin, node))
+    return True
+
+
+def _resolveNodeEntry(entry):
+    # type: (registry.NodeEntry) -> Type[entities.BaseCustomNode]
+    """
+    Import the BaseCustomNode class described by the given lazy entry.
+
+    Raises:
+        TypeError: if the class is not a BaseCustomNode or doesn't match the entry.
+        AssertionError: if the class is malformed.
+    """
+    node_class = entry.load()
+
+    if not inspect.isclass(node_class) or not issubclass(
+        node_class, entities.BaseCustomNode
+    ):
+        raise TypeError("{} is not a BaseCustomNode subclass".format(node_class))
+
+    if node_class.name != entry.name:
+        raise TypeError(
+            "{} has name <{}> while it was registered as <{}>: the library "
+            "manifest might be outdated."
+            "".format(node_class, node_class.name, entry.name)
+        )
+
+    node_class._check()
+    node_class._registered = True
+    _trackNodeSource(node_class)
+    return node_class
+
+
+def _trackNodeSource(node_class):
+    # type: (Type[entities.BaseCustomNode]) -> None
+    """
+    Store the fingerprint of the given node's module so ``reloadNodes`` can find if
+    it has been modified since.
+    """
+    module_name = node_class.__module__
+    if module_name in _SOURCE_FINGERPRINTS:
+        return
+    _SOURCE_FINGERPRINTS[module_name] = cache.getFileFingerprint(
+        _getSourceFile(node_class)
+    )
+
+
+def _getManifestEntries(package_id):
+    # type: (str) -> Optional[List[registry.NodeEntry]]
+    """
+    Returns:
+        NodeEntry listed in the given library's manifest or None if the library
+        doesn't have a manifest.
+    """
+    package_dir = util.findPackageDirectory(package_id)
+    if not package_dir:
+        return None
+
+    return registry.readManifest(registry.getManifestPath(package_dir))
+
+
+def _getAvailableNodesInPackage(package):
+    # type: (ModuleType) -> Dict[str, Type[entities.BaseCustomNode]]
+    """
+    _getAllNodesInPackage() but filtered to remove the tools that have been asked to be
+    ignored using an environment variable.
+
+    Returns:
+        dict of module_name, BaseCustomNode class defined in the module
+    """
+    return _filterExcludedNodes(_getAllNodesInPackage(package))
+
+
+def _filterExcludedNodes(all_nodes, node_filter=None):
+    # type: (Dict[str, Type[entities.BaseCustomNode]], Optional[filters.NodeFilter]) -> Dict[str, Type[entities.BaseCustomNode]]
+    """
+    Remove from the given dict the tools that have been asked to be ignored using an
+    environment variable.
+
+    Args:
+        all_nodes: dict of module_name, BaseCustomNode class
+        node_filter: filter to use, built from the environment if not specified
+
+    Returns:
+        the given dict, modified in place.
+    """
+    if node_filter is None:
+        node_filter = filters.NodeFilter.fromEnv()
+    excluded_dict = dict()
+    excluded_keys = list()
+
+    for module_name, basecustomnode in all_nodes.items():
+
+        with profiling.PROFILER.measure("filtering", node=basecustomnode.name):
+            reason = node_filter.getExclusionReason(
+                basecustomnode.__name__,
+                basecustomnode.__module__,
+                basecustomnode.author,
+                basecustomnode.name,
+            )
+        if reason:
+            excluded_keys.append(module_name)
+            excluded_dict[basecustomnode.__name__] = reason
+
+    # as we can't delete key in a dict we are iterating over :
+    for excluded in excluded_keys:
+        del all_nodes[excluded]
+
+    logger.debug(
+        "[_filterExcludedNodes] Finished. Excluded {} nodes: {}".format(
+            len(excluded_dict),
+            json.dumps(excluded_dict, indent=4, default=str, sort_keys=True),
+        )
+    )
+    return all_nodes
+
+
+def _getAllNodesInPackage(package):
+    # type: (ModuleType) -> Dict[str, Type[entities.BaseCustomNode]]
+    """
+    Get a list of all the "tools" modules available in the given package.
+
+    Not recommended to use as the "final" function. See ``getAvailableTools()`` instead.
+
+    Returns:
+        dict of module_name, BaseCustomNode class defined in the module
+    """
+    return {
+        object_name: tool_class
+        for object_name, (tool_class, valid) in _discoverNodesInPackage(package).items()
+        if valid
+    }
+
+
+def _discoverNodesInPackage(package, validated=None):
+    # type: (ModuleType, Optional[Dict[Tuple[str, str], bool]]) -> Dict[str, Tuple[Type[entities.BaseCustomNode], bool]]
+    """
+    Find all the BaseCustomNode subclasses in the given package namespace and check
+    if they are valid.
+
+    SRC: https://stackoverflow.com/a/1310912/13806195
+
+    Args:
+        package: python package to find the BaseCustomNode in
+        validated:
+            (module, class name): is_valid of the classes whose validity is already
+            known and doesn't need to be checked again.
+
+    Returns:
+        dict of module_name, (BaseCustomNode class defined in the module, is_valid)
+    """
+    validated = validated or dict()
+    out = dict()
+
+    with profiling.PROFILER.measure("discovery"):
+        node_classes = [
+            (objectName, objectData)
+            for objectName, objectData in package.__dict__.items()
+            if not objectName.startswith("_")
+            and inspect.isclass(objectData)
+            and issubclass(objectData, entities.BaseCustomNode)
+        ]
+
+    for objectName, objectData in node_classes:
+
+        valid = validated.get((objectData.__module__, objectData.__name__))
+        if valid is None:
+            try:
+                with profiling.PROFILER.measure("validation", node=objectData.name):
+                    objectData._check()
+                valid = True
+            except AssertionError as excp:
+                logger.error(
+                    "[_discoverNodesInPackage] InvalidNodeClass: class <{}> for "
+                    "package {}:\n   {}".format(objectData, package, excp)
+                )
+                valid = False
+
+        out[objectName] = (objectData, valid)
         logger.debug(
-            "[_getAllNodesInPackage] Found [{}]={}".format(objectName, objectData)
+            "[_discoverNodesInPackage] Found [{}]={} (valid={})"
+            "".format(objectName, objectData, valid)
         )
 
     return out
+
+
+def _getSourceFile(node_class):
+    # type: (Union[Type[entities.BaseCustomNode], ModuleType]) -> str
+    """
+    Returns:
+        absolute path to the python file defining the given class (or module).
+    """
+    path = inspect.getsourcefile(node_class) or inspect.getfile(node_class)
+    return os.path.normpath(os.path.abspath(path))
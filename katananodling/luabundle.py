@@ -0,0 +1,181 @@
+"""
+Bundle the lua modules of the OpScriptCustomNode into a single file that preload them,
+so each lua state only read one file instead of searching every module on the
+``LUA_PATH``.
+
+Example, from a Katana session where the libraries are registered::
+
+    from katananodling import luabundle
+
+    luabundle.writeBundle("/shared/katananodling/bundle.lua")
+
+Then set ``KATANA_NODLING_LUA_BUNDLE`` to that path, see ``c.Env.LUA_BUNDLE``.
+"""
+import inspect
+import logging
+import os
+from collections import OrderedDict
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Type
+
+from . import c
+from .cache import writeFileAtomically
+
+__all__ = (
+    "buildBundle",
+    "collectLuaModules",
+    "getBundleLoadScript",
+    "getLoaderScript",
+    "getLuaModulePath",
+    "toLuaString",
+    "writeBundle",
+)
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FLAG = "katananodling.bundle"
+"""
+Name in ``package.loaded`` used to know if the bundle has been loaded in the lua state.
+"""
+
+
+def toLuaString(text):
+    # type: (str) -> str
+    """
+    Returns:
+        the given text as a double-quoted lua string literal content.
+    """
+    text = text.replace("\\", "\\\\").replace('"', '\\"')
+    return text.replace("\n", "\\n").replace("\r", "\\r")
+
+
+def getLuaModulePath(node_class):
+    # type: (Type) -> Optional[str]
+    """
+    Returns:
+        path of the lua file matching ``getLuaModuleName()`` for the given
+        OpScriptCustomNode subclass, None if it doesn't exist.
+    """
+    source = inspect.getfile(node_class)
+    if os.path.splitext(os.path.basename(source))[0] == "__init__":
+        path = os.path.join(os.path.dirname(source), "init.lua")
+    else:
+        path = os.path.splitext(source)[0] + ".lua"
+    return path if os.path.isfile(path) else None
+
+
+def collectLuaModules(node_classes):
+    # type: (Iterable[Type]) -> Dict[str, str]
+    """
+    Args:
+        node_classes: BaseCustomNode subclasses, only OpScriptCustomNode are used.
+
+    Returns:
+        lua file path per lua module name, sorted by name.
+    """
+    from .entities import OpScriptCustomNode
+
+    modules = dict()
+    for node_class in node_classes:
+        if not issubclass(node_class, OpScriptCustomNode):
+            continue
+
+        module_name = node_class.getLuaModuleName()
+        path = getLuaModulePath(node_class)
+        if not path:
+            logger.debug(
+                "[collectLuaModules] No lua file found for {} <{}>"
+                "".format(node_class.__name__, module_name)
+            )
+            continue
+        modules[module_name] = path
+
+    return OrderedDict(sorted(modules.items()))
+
+
+def buildBundle(modules):
+    # type: (Dict[str, str]) -> str
+    """
+    Args:
+        modules: lua file path per lua module name
+
+    Returns:
+        lua code registering each module content in ``package.preload``.
+    """
+    lines = [
+        "-- generated by katananodling {}, do not edit.".format(c.__version__),
+        "",
+    ]
+    for module_name, path in modules.items():
+        with open(path, "r") as lua_file:
+            content = lua_file.read()
+        lines += [
+            "-- {}".format(path),
+            'package.preload["{}"] = function(...)'.format(toLuaString(module_name)),
+            content.strip("\n"),
+            "end",
+            "",
+        ]
+    lines.append('package.loaded["{}"] = true'.format(BUNDLE_FLAG))
+    return "\n".join(lines) + "\n"
+
+
+def writeBundle(path, node_classes=None):
+    # type: (str, Optional[Iterable[Type]]) -> List[str]
+    """
+    Write the bundle of the lua modules used by the given nodes.
+
+    Args:
+        path: path of the lua file to write
+        node_classes: default to all the registered BaseCustomNode (which import them)
+
+    Returns:
+        name of the lua modules bundled.
+    """
+    if node_classes is None:
+        from .loader import REGISTERED
+
+        node_classes = REGISTERED.values()
+
+    modules = collectLuaModules(node_classes)
+    writeFileAtomically(path, buildBundle(modules))
+    logger.info(
+        "[writeBundle] Wrote {} lua modules to <{}>".format(len(modules), path)
+    )
+    return list(modules.keys())
+
+
+def getBundleLoadScript(bundle=None):
+    # type: (Optional[str]) -> str
+    """
+    Args:
+        bundle: path of the bundle to load, if any
+
+    Returns:
+        lua code loading the given bundle, empty if no bundle.
+    """
+    if not bundle:
+        return ""
+
+    return c.LUA_BUNDLE_LOAD_SCRIPT.format(
+        BUNDLE=toLuaString(bundle),
+        BUNDLE_ENV=c.Env.LUA_BUNDLE,
+        BUNDLE_FLAG=BUNDLE_FLAG,
+    )
+
+
+def getLoaderScript(module_name, bundle=None):
+    # type: (str, Optional[str]) -> str
+    """
+    Args:
+        module_name: name of the lua module to require
+        bundle: path of the bundle to load the module from, if any
+
+    Returns:
+        lua code to use in an OpScript to run the given module.
+    """
+    script = c.LUA_REQUIRE_SCRIPT.format(MODULE=toLuaString(module_name))
+    return getBundleLoadScript(bundle) + script
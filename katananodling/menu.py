@@ -1,5 +1,12 @@
+import heapq
 import logging
+import re
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import List
 from typing import Optional
+from typing import Tuple
 
 from Katana import NodegraphAPI
 from Katana import LayeredMenuAPI
@@ -8,25 +15,435 @@ from . import c
 from .loader import REGISTERED
 
 
-__all__ = ("getLayeredMenuForAllCustomNodes",)
+__all__ = (
+    "CATEGORY_SEPARATOR",
+    "MenuEntry",
+    "MenuIndex",
+    "SearchIndex",
+    "getLayeredMenuForAllCustomNodes",
+    "getMenuIndex",
+    "searchNodes",
+)
 
 logger = logging.getLogger(__name__)
 
+CATEGORY_SEPARATOR = "/"
+"""
+Separator between nested categories and between the category and the node name in
+the text of the LayeredMenu entries.
+"""
 
-def getLayeredMenuForAllCustomNodes():
-    # type: () -> LayeredMenuAPI.LayeredMenu
+
+class MenuEntry(object):
+    """
+    What is needed to display and create a registered node from the LayeredMenu.
+    """
+
+    __slots__ = ("key", "text", "color", "category", "description", "author")
+
+    def __init__(self, key, text, color, category, description, author):
+        self.key = key  # type: str
+        self.text = text  # type: str
+        self.color = color  # type: Tuple[float, float, float]
+        self.category = category  # type: str
+        self.description = description  # type: str
+        self.author = author  # type: str
+
+    def __repr__(self):
+        return "<{} {}>".format(self.__class__.__name__, self.text)
+
+
+SEARCH_WEIGHTS = {
+    "name": 4.0,
+    "word": 3.0,
+    "category": 2.0,
+    "description": 1.0,
+    "author": 1.0,
+}
+"""
+Score of a query term matching the start of a word, per field. ``name`` is the whole
+node name while ``word`` is one of the words of its camelCase name.
+"""
+
+SEARCH_EXACT_FACTOR = 1.5
+"""
+Multiply the score when a query term matches a whole word instead of its start.
+"""
+
+SEARCH_FUZZY_THRESHOLD = 0.5
+"""
+Minimal ratio of the query term trigrams a word must share to be a fuzzy match.
+"""
+
+SEARCH_FUZZY_FACTOR = 0.5
+"""
+Multiply the score of fuzzy matches so they rank below prefix matches.
+"""
+
+_WORD_REGEX = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+_QUERY_REGEX = re.compile(r"[\W_]+")
+
+
+def _splitWords(text):
+    # type: (str) -> List[str]
+    """
+    Split on camelCase, underscores, spaces and punctuation.
+    """
+    return [word.lower() for word in _WORD_REGEX.findall(text or "")]
+
+
+def _getTrigrams(word):
+    # type: (str) -> set
+    return set(word[index : index + 3] for index in range(len(word) - 2))
+
+
+class SearchIndex(object):
+    """
+    Ranked search over the name, category, description and author of MenuEntry.
+
+    A prefix trie gives the entries having a word starting with a query term, in a
+    time that only depends on the term length, while a trigram index gives the
+    entries with a similar word, to tolerate typos.
+
+    Args:
+        entries: entries to index
+    """
+
+    def __init__(self, entries):
+        # type: (Iterable[MenuEntry]) -> None
+        # node of the trie: [children, {key: score of prefix}, {key: score of word}]
+        self._trie = [dict(), dict(), dict()]  # type: List[Dict[str, Any]]
+        self._trigrams = dict()  # type: Dict[str, Dict[str, float]]
+        self._sort_keys = dict()  # type: Dict[str, str]
+
+        for entry in entries:
+            self._sort_keys[entry.key] = entry.key.lower()
+            for word, field in self._iterWords(entry):
+                self._addWord(entry.key, word, SEARCH_WEIGHTS[field])
+
+    def __len__(self):
+        return len(self._sort_keys)
+
+    @staticmethod
+    def _iterWords(entry):
+        # type: (MenuEntry) -> Iterable[Tuple[str, str]]
+        yield entry.key.lower(), "name"
+        for word in _splitWords(entry.key):
+            yield word, "word"
+        for field in ("category", "description", "author"):
+            for word in _splitWords(getattr(entry, field)):
+                yield word, field
+
+    def _addWord(self, key, word, weight):
+        # type: (str, str, float) -> None
+        node = self._trie
+        for char in word:
+            node = node[0].setdefault(char, [dict(), dict(), dict()])
+            if node[1].get(key, 0.0) < weight:
+                node[1][key] = weight
+        if node[2].get(key, 0.0) < weight:
+            node[2][key] = weight
+
+        for trigram in _getTrigrams(word):
+            keys = self._trigrams.setdefault(trigram, dict())
+            if keys.get(key, 0.0) < weight:
+                keys[key] = weight
+        return
+
+    def _findPrefix(self, term):
+        # type: (str) -> Tuple[Dict[str, float], Dict[str, float]]
+        """
+        Returns:
+            score of the entries having a word starting with the given term, and of
+            the entries having a word equal to it.
+        """
+        node = self._trie
+        for char in term:
+            node = node[0].get(char)
+            if node is None:
+                return {}, {}
+        return node[1], node[2]
+
+    def _scoreTerm(self, term, limit, keys=None):
+        # type: (str, Optional[int], Optional[Iterable[str]]) -> Dict[str, float]
+        """
+        Fuzzy matches are only searched when there is less than ``limit`` prefix
+        matches, as they are slower to find.
+
+        Args:
+            term: lowercase query term
+            limit: number of results wanted
+            keys: only score these entries, default to all of them
+
+        Returns:
+            score of each entry matching the given term.
+        """
+        prefix, exact = self._findPrefix(term)
+        if keys is None:
+            scores = dict(prefix)
+            exact_keys = exact
+        else:
+            scores = dict((key, prefix[key]) for key in keys if key in prefix)
+            exact_keys = [key for key in scores if key in exact]
+        for key in exact_keys:
+            scores[key] = max(scores[key], exact[key] * SEARCH_EXACT_FACTOR)
+
+        trigrams = _getTrigrams(term)
+        if not trigrams:
+            return scores
+
+        if limit is not None and len(scores) >= limit:
+            return scores
+
+        matches = dict()  # type: Dict[str, List[float]]
+        if keys is None:
+            for trigram in trigrams:
+                for key, weight in self._trigrams.get(trigram, {}).items():
+                    match = matches.setdefault(key, [0, 0.0])
+                    match[0] += 1
+                    match[1] += weight
+        else:
+            postings = [self._trigrams.get(trigram, {}) for trigram in trigrams]
+            for key in keys:
+                if key in scores:
+                    continue
+                weights = [posting[key] for posting in postings if key in posting]
+                if weights:
+                    matches[key] = [len(weights), sum(weights)]
+
+        for key, (count, weight) in matches.items():
+            ratio = count / float(len(trigrams))
+            if ratio < SEARCH_FUZZY_THRESHOLD:
+                continue
+            score = SEARCH_FUZZY_FACTOR * ratio * weight / count
+            if score > scores.get(key, 0.0):
+                scores[key] = score
+
+        return scores
+
+    def search(self, query, limit=c.LAYEREDMENU_SEARCH_LIMIT, keys=None):
+        # type: (str, Optional[int], Optional[Iterable[str]]) -> List[Tuple[str, float]]
+        """
+        Every term of the query must match for an entry to be returned.
+
+        Args:
+            query: space separated terms
+            limit: maximum number of results, None for all of them
+            keys: only search these entries, default to all of them
+
+        Returns:
+            (key, score) of the best matching entries, from best to worst.
+        """
+        terms = [term for term in _QUERY_REGEX.split(query.lower()) if term]
+        if not terms:
+            return []
+
+        # start with the most selective term so the others only score its matches
+        sizes = dict((term, len(self._findPrefix(term)[0])) for term in terms)
+        terms.sort(key=lambda term: (sizes[term] == 0, sizes[term]))
+
+        scores = self._scoreTerm(terms[0], limit, keys=keys)
+        for term in terms[1:]:
+            if not scores:
+                break
+            # all the previous matches must be scored, whatever the limit
+            term_scores = self._scoreTerm(term, None, keys=scores)
+            scores = dict(
+                (key, score + term_scores[key])
+                for key, score in scores.items()
+                if key in term_scores
+            )
+
+        def sort_key(item):
+            return -item[1], self._sort_keys[item[0]]
+
+        if limit is None:
+            return sorted(scores.items(), key=sort_key)
+        return heapq.nsmallest(limit, scores.items(), key=sort_key)
+
+
+class MenuIndex(object):
+    """
+    Index of entry key -> MenuEntry for all the registered nodes, built from the
+    registry without resolving its lazy entries.
+
+    The index is only rebuilt when the registry revision changed since the last
+    build.
+
+    Args:
+        registry: registry to index, default to the loader one
+    """
+
+    def __init__(self, registry=REGISTERED):
+        self.registry = registry
+        self.revision = None  # type: Optional[int]
+        self._entries = dict()  # type: Dict[str, MenuEntry]
+        self._sorted = list()  # type: List[MenuEntry]
+        self._search_index = None  # type: Optional[SearchIndex]
+
+    def __len__(self):
+        self.update()
+        return len(self._entries)
+
+    def __contains__(self, key):
+        self.update()
+        return key in self._entries
+
+    def update(self):
+        # type: () -> bool
+        """
+        Rebuild the index if the registry changed.
+
+        Returns:
+            True if the index was rebuilt.
+        """
+        if self.revision == self.registry.revision:
+            return False
+
+        entries = dict()
+        for key in self.registry:  # type: str
+            # peek to avoid importing lazily registered nodes just for their color
+            node = self.registry.peek(key)
+            category = (getattr(node, "category", "") or "").strip(CATEGORY_SEPARATOR)
+            text = key
+            if category:
+                text = "{}{}{}".format(category, CATEGORY_SEPARATOR, key)
+            entries[key] = MenuEntry(
+                key=key,
+                text=text,
+                color=getattr(node, "color", None) or c.COLORS.default,
+                category=category,
+                description=getattr(node, "description", ""),
+                author=getattr(node, "author", ""),
+            )
+
+        self._entries = entries
+        self._search_index = None
+        self._sorted = sorted(entries.values(), key=lambda entry: entry.text.lower())
+        self.revision = self.registry.revision
+        logger.debug("[MenuIndex][update] Indexed {} entries.".format(len(entries)))
+        return True
+
+    def get(self, key):
+        # type: (str) -> Optional[MenuEntry]
+        self.update()
+        return self._entries.get(key)
+
+    def getEntries(self, category=None):
+        # type: (Optional[str]) -> List[MenuEntry]
+        """
+        Args:
+            category: only return the entries in this category or its subcategories
+
+        Returns:
+            entries sorted by text, so grouped by category.
+        """
+        self.update()
+        if not category:
+            return list(self._sorted)
+
+        category = category.strip(CATEGORY_SEPARATOR)
+        prefix = category + CATEGORY_SEPARATOR
+        return [
+            entry
+            for entry in self._sorted
+            if entry.category == category or entry.category.startswith(prefix)
+        ]
+
+    def search(self, query, limit=c.LAYEREDMENU_SEARCH_LIMIT, category=None):
+        # type: (str, Optional[int], Optional[str]) -> List[MenuEntry]
+        """
+        The search index is built on the first search after the index changed.
+
+        Args:
+            query: space separated terms to find in the name, category, description
+                or author of the nodes. Tolerate small typos.
+            limit: maximum number of results, None for all of them
+            category: only search the entries in this category or its subcategories
+
+        Returns:
+            entries matching the given query, from best to worst match.
+        """
+        self.update()
+        if self._search_index is None:
+            self._search_index = SearchIndex(self._entries.values())
+        keys = None
+        if category:
+            keys = [entry.key for entry in self.getEntries(category)]
+        return [
+            self._entries[key]
+            for key, _ in self._search_index.search(query, limit, keys=keys)
+        ]
+
+    def getCategories(self):
+        # type: () -> List[str]
+        """
+        Returns:
+            sorted categories used by at least one entry, including the parent ones
+            of nested categories.
+        """
+        self.update()
+        categories = set()
+        for entry in self._entries.values():
+            parts = entry.category.split(CATEGORY_SEPARATOR) if entry.category else []
+            for index in range(len(parts)):
+                categories.add(CATEGORY_SEPARATOR.join(parts[: index + 1]))
+        return sorted(categories)
+
+
+_MENU_INDEX = MenuIndex()
+
+
+def getMenuIndex():
+    # type: () -> MenuIndex
+    """
+    Returns:
+        the MenuIndex of the registered nodes, shared by all the LayeredMenus.
+    """
+    _MENU_INDEX.update()
+    return _MENU_INDEX
+
+
+def searchNodes(query, limit=c.LAYEREDMENU_SEARCH_LIMIT):
+    # type: (str, Optional[int]) -> List[str]
+    """
+    Args:
+        query: space separated terms to find in the name, category, description
+            or author of the registered nodes.
+        limit: maximum number of results, None for all of them
+
+    Returns:
+        name of the registered nodes matching the query, from best to worst match.
+    """
+    return [entry.key for entry in getMenuIndex().search(query, limit)]
+
+
+def getLayeredMenuForAllCustomNodes(category=None, query=None):
+    # type: (Optional[str], Optional[str]) -> LayeredMenuAPI.LayeredMenu
     """
     Get a LayeredMenu instance to display that list all the BaseCustomNode registered in
     Katana.
+
+    Args:
+        category:
+            only list the nodes in this category (and its subcategories) instead of
+            all of them.
+        query:
+            only list the ``c.LAYEREDMENU_SEARCH_LIMIT`` nodes best matching this
+            search query, from best to worst match.
     """
 
+    def populateCallback(layered_menu):
+        _populateCallback(layered_menu, category=category, query=query)
+
     layeredMenu = LayeredMenuAPI.LayeredMenu(
-        _populateCallback,
+        populateCallback,
         _actionCallback,
         keyboardShortcut=c.LAYEREDMENU_SHORTCUT,
         alwaysPopulate=False,
         onlyMatchWordStart=False,
-        sortAlphabetically=True,
+        # keep the ranking of the search results
+        sortAlphabetically=not query,
         checkAvailabilityCallback=None,
     )
 
@@ -34,8 +451,8 @@ def getLayeredMenuForAllCustomNodes():
     return layeredMenu
 
 
-def _populateCallback(layered_menu):
-    # type: (LayeredMenuAPI.LayeredMenu) -> None
+def _populateCallback(layered_menu, category=None, query=None):
+    # type: (LayeredMenuAPI.LayeredMenu, Optional[str], Optional[str]) -> None
     """
     Called when the shortcut to raise the layeredMenu is pressed.
 
@@ -44,35 +461,17 @@ def _populateCallback(layered_menu):
 
     Args:
         layered_menu:
+        category: only add the entries in this category
+        query: only add the best entries matching this search query
     """
+    index = getMenuIndex()
+    if query:
+        entries = index.search(query, c.LAYEREDMENU_SEARCH_LIMIT, category=category)
+    else:
+        entries = index.getEntries(category)
 
-    available_tools = NodegraphAPI.GetFlavorNodes(
-        c.KATANA_FLAVOR_NAME, filterExists=True
-    )
-    for tool_name in available_tools:  # type: str
-
-        tool = REGISTERED.get(tool_name)
-        entry_color = c.COLORS.default
-
-        if tool:
-            try:
-                entry_color = tool.color or c.COLORS.default
-            except AttributeError as excp:
-                pass
-
-        else:
-            logger.warning(
-                "[_populateCallback] tool name <{}> doesn't seems to be registered "
-                "which shouldn't happens.".format(tool_name)
-            )
-
-        layered_menu.addEntry(
-            tool_name,
-            text=tool_name,
-            color=entry_color,
-        )
-
-        continue
+    for entry in entries:
+        layered_menu.addEntry(entry.key, text=entry.text, color=entry.color)
 
     return
 
@@ -89,30 +488,27 @@ def _actionCallback(key):
         created node corresponding ot the given key
     """
 
-    available_tools = NodegraphAPI.GetFlavorNodes(
-        c.KATANA_FLAVOR_NAME, filterExists=True
-    )
-    for tool_name in available_tools:  # type: str
-
-        if key != tool_name:
-            continue
-
-        try:
-            node = NodegraphAPI.CreateNode(tool_name, NodegraphAPI.GetRootNode())
-        except Exception as excp:
-            logger.error(
-                "[_actionCallback] Error when trying to create node <{}>: {}"
-                "".format(tool_name, excp),
-            )
-            raise
+    if getMenuIndex().get(key) is None:
+        logger.warning(
+            "[_actionCallback] key <{}> doesn't seems to be registered "
+            "which shouldn't happens.".format(key)
+        )
+        return None
 
-        if node is None:
-            logger.error(
-                "[_actionCallback] CreateNode({}) returned None. This might comes "
-                "from any error in the class registered for this tool so check the "
-                "code.".format(key)
-            )
+    try:
+        node = NodegraphAPI.CreateNode(key, NodegraphAPI.GetRootNode())
+    except Exception as excp:
+        logger.error(
+            "[_actionCallback] Error when trying to create node <{}>: {}"
+            "".format(key, excp),
+        )
+        raise
 
-        return node
+    if node is None:
+        logger.error(
+            "[_actionCallback] CreateNode({}) returned None. This might comes "
+            "from any error in the class registered for this tool so check the "
+            "code.".format(key)
+        )
 
-    return
+    return node
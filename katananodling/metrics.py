@@ -0,0 +1,169 @@
+"""
+Report of the BaseCustomNode used in the current scene : which types and versions,
+how many instances, how many internal nodes and parameters they add, and how long
+their creation and upgrade took in this session.
+
+Example::
+
+    from katananodling import metrics
+
+    report = metrics.getSceneReport()
+    metrics.writeSceneReport("/tmp/scene_report.json")
+"""
+import json
+import logging
+from typing import Any
+from typing import Dict
+
+from Katana import NodegraphAPI
+
+from . import c
+from . import profiling
+from .cache import writeFileAtomically
+from .loader import REGISTERED
+from .util import Version
+
+__all__ = (
+    "getNodeMetrics",
+    "getSceneReport",
+    "writeSceneReport",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _countNodes(node):
+    # type: (NodegraphAPI.Node) -> int
+    count = 0
+    stack = list(node.getChildren())
+    while stack:
+        child = stack.pop()
+        count += 1
+        if hasattr(child, "getChildren"):
+            stack.extend(child.getChildren())
+    return count
+
+
+def _countParams(param):
+    # type: (NodegraphAPI.Parameter) -> int
+    count = 0
+    stack = list(param.getChildren())
+    while stack:
+        child = stack.pop()
+        count += 1
+        stack.extend(child.getChildren())
+    return count
+
+
+def getNodeMetrics(node):
+    # type: (NodegraphAPI.Node) -> Dict[str, Any]
+    """
+    Returns:
+        version stored on the given BaseCustomNode, number of nodes it contains
+        (recursively) and number of parameters on it and its internal nodes.
+    """
+    params = _countParams(node.getParameters())
+    stack = list(node.getChildren())
+    while stack:
+        child = stack.pop()
+        params += _countParams(child.getParameters())
+        if hasattr(child, "getChildren"):
+            stack.extend(child.getChildren())
+
+    return {
+        "version": node.about._getValue(node.about.ParamNames.version),
+        "internal_nodes": _countNodes(node),
+        "params": params,
+    }
+
+
+def getSceneReport(include_unused=False):
+    # type: (bool) -> Dict[str, Any]
+    """
+    Args:
+        include_unused: True to also report the registered types without instance
+
+    Returns:
+        json-serializable aggregates per node type and for the whole scene.
+    """
+    types = dict()
+    total = {
+        "types": 0,
+        "instances": 0,
+        "outdated": 0,
+        "internal_nodes": 0,
+        "params": 0,
+    }
+    total.update(dict((phase, 0.0) for phase in profiling.NODE_PHASES))
+
+    for node_type in sorted(NodegraphAPI.GetFlavorNodes(c.KATANA_FLAVOR_NAME)):
+
+        # unresolved types can't have instances yet
+        if REGISTERED.isResolved(node_type):
+            node_class = REGISTERED[node_type]
+            nodes = NodegraphAPI.GetAllNodesByType(node_type)
+        else:
+            node_class = None
+            nodes = list()
+
+        if not nodes and not include_unused:
+            continue
+
+        class_version = str(Version(node_class.version)) if node_class else None
+        class_path = None
+        if node_class:
+            class_path = "{}.{}".format(node_class.__module__, node_class.__name__)
+
+        versions = dict()
+        internal_nodes = 0
+        params = 0
+        for node in nodes:
+            node_metrics = getNodeMetrics(node)
+            version = node_metrics["version"]
+            versions[version] = versions.get(version, 0) + 1
+            internal_nodes += node_metrics["internal_nodes"]
+            params += node_metrics["params"]
+
+        count = len(nodes)
+        outdated = count - versions.get(class_version, 0)
+        timings = profiling.NODE_TIMINGS.get(node_type)
+        types[node_type] = {
+            "class": class_path,
+            "version": class_version,
+            "instances": count,
+            "versions": versions,
+            "outdated": outdated,
+            "internal_nodes": internal_nodes,
+            "params": params,
+            "internal_nodes_per_instance": internal_nodes / max(count, 1.0),
+            "params_per_instance": params / max(count, 1.0),
+            "timings": timings,
+        }
+
+        total["types"] += 1 if count else 0
+        total["instances"] += count
+        total["outdated"] += outdated
+        total["internal_nodes"] += internal_nodes
+        total["params"] += params
+        for phase in profiling.NODE_PHASES:
+            total[phase] += timings[phase]["total"]
+
+    return {
+        "api_version": c.__version__,
+        "types": types,
+        "total": total,
+    }
+
+
+def writeSceneReport(path, include_unused=False):
+    # type: (str, bool) -> Dict[str, Any]
+    """
+    Write ``getSceneReport`` to the given json file.
+
+    Returns:
+        the report written.
+    """
+    report = getSceneReport(include_unused=include_unused)
+    writeFileAtomically(path, json.dumps(report, indent=4, sort_keys=True))
+    logger.info("[writeSceneReport] Wrote <{}>".format(path))
+    return report
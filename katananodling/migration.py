@@ -0,0 +1,344 @@
+"""
+Declarative upgrade of BaseCustomNode instances, using migration steps tied to the
+version range they apply on.
+
+Example::
+
+    class MyNode(BaseCustomNode):
+        version = (0, 3, 0)
+
+        @migration.migrate("0.1.x", "0.2.0")
+        def _addAmountParam(self):
+            self.user_param.createChildNumber("amount", 1)
+
+        @migration.migrate("0.2.x", "0.3.0")
+        def _renameCel(self):
+            ...
+"""
+import logging
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterable
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Type
+from typing import Union
+
+from .util import Version
+from .util import VersionRange
+from .util import VersionableType
+
+__all__ = (
+    "MigrationStep",
+    "VersionPattern",
+    "getMigrationSteps",
+    "migrate",
+    "planMigration",
+    "previewMigration",
+    "previewMigrations",
+    "upgradeNode",
+)
+
+logger = logging.getLogger(__name__)
+
+_STEP_ATTRIBUTE = "__migration__"
+
+_WILDCARDS = ("x", "X", "*")
+
+_RANGE_CHARACTERS = ("<", ">", "=", "!", ",")
+
+
+class VersionPattern(object):
+    """
+    A version where some components can be a wildcard : ``"0.1.x"``, ``"1.*.*"``.
+
+    Missing components are considered wildcards so ``"0.1"`` is the same as
+    ``"0.1.x"``.
+
+    Args:
+        pattern: string pattern or a fully specified version
+    """
+
+    def __init__(self, pattern):
+        # type: (Union[str, VersionableType]) -> None
+        if not isinstance(pattern, str):
+            pattern = str(Version(pattern))
+
+        parts = pattern.split(".")
+        if not 0 < len(parts) <= 3:
+            raise ValueError("Invalid version pattern <{}>".format(pattern))
+
+        # None is a wildcard
+        self.parts = tuple(
+            None if part in _WILDCARDS else int(part) for part in parts
+        ) + (None,) * (3 - len(parts))  # type: Tuple[Optional[int], ...]
+        self._fixed = tuple(
+            (index, part) for index, part in enumerate(self.parts) if part is not None
+        )
+
+    def __str__(self):
+        return ".".join("x" if part is None else str(part) for part in self.parts)
+
+    def __repr__(self):
+        return "<{} {}>".format(self.__class__.__name__, self)
+
+    @property
+    def lowest(self):
+        # type: () -> Tuple[int, int, int]
+        """
+        Lowest version matching this pattern.
+        """
+        return tuple(part or 0 for part in self.parts)
+
+    def match(self, version):
+        # type: (Version) -> bool
+        components = version.version
+        for index, part in self._fixed:
+            if components[index] != part:
+                return False
+        return True
+
+
+class MigrationStep(object):
+    """
+    Function upgrading a node whose version match ``source`` to ``target``.
+
+    Args:
+        source: version pattern or range of the nodes to upgrade
+        target: version of the node once upgraded
+        function: called with the node as single argument
+    """
+
+    def __init__(self, source, target, function):
+        # type: (Union[VersionPattern, VersionRange], Version, Callable[[Any], None]) -> None
+        self.source = source
+        self.target = target
+        self.function = function
+
+    def __repr__(self):
+        return "<{} {} ({} -> {})>".format(
+            self.__class__.__name__, self.name, self.source, self.target
+        )
+
+    @property
+    def name(self):
+        # type: () -> str
+        return self.function.__name__
+
+    @property
+    def description(self):
+        # type: () -> str
+        """
+        First line of the function docstring.
+        """
+        doc = (self.function.__doc__ or "").strip()
+        return doc.splitlines()[0] if doc else ""
+
+
+def migrate(source, target):
+    # type: (Union[str, VersionableType], VersionableType) -> Callable
+    """
+    Decorator to declare a method of a BaseCustomNode subclass as a migration step.
+
+    Args:
+        source:
+            version pattern of the nodes the step applies on, ex: ``"0.1.x"``, or a
+            version range like ``">=0.1.2,<0.3"`` (see ``util.VersionRange``)
+        target: version of the node once the step is applied, ex: ``"0.2.0"``
+    """
+    if isinstance(source, str) and any(char in source for char in _RANGE_CHARACTERS):
+        source = VersionRange(source)
+    else:
+        source = VersionPattern(source)
+    target = Version(target)
+
+    def decorator(function):
+        setattr(function, _STEP_ATTRIBUTE, (source, target))
+        return function
+
+    return decorator
+
+
+_STEPS_CACHE = dict()  # type: Dict[type, List[MigrationStep]]
+
+
+def getMigrationSteps(node_class):
+    # type: (Type) -> List[MigrationStep]
+    """
+    Returns:
+        all the migration steps declared on the given class and its bases, sorted by
+        target version.
+    """
+    steps = _STEPS_CACHE.get(node_class)
+    if steps is not None:
+        return steps
+
+    functions = dict()
+    # reversed so subclasses override their bases
+    for klass in reversed(node_class.__mro__):
+        for name, function in vars(klass).items():
+            if hasattr(function, _STEP_ATTRIBUTE):
+                functions[name] = function
+            elif name in functions:
+                # overridden without decorator
+                del functions[name]
+
+    steps = [
+        MigrationStep(
+            source=getattr(function, _STEP_ATTRIBUTE)[0],
+            target=getattr(function, _STEP_ATTRIBUTE)[1],
+            function=function,
+        )
+        for function in functions.values()
+    ]
+    steps.sort(key=lambda step: (step.target, step.name))
+    _STEPS_CACHE[node_class] = steps
+    return steps
+
+
+def planMigration(node_class, stored_version):
+    # type: (Type, Version) -> List[MigrationStep]
+    """
+    Find the steps to run, in order, to upgrade a node of the given class from the
+    given version to the class version.
+
+    Steps are considered by ascending target version. A step is picked if its source
+    match the current version, or if the current version is below its source (no step
+    was needed in between). The current version then become the step target.
+
+    Args:
+        node_class: BaseCustomNode subclass
+        stored_version: version stored on the node
+
+    Returns:
+        steps to run, empty if the node is up-to-date.
+    """
+    class_version = Version(node_class.version)
+    current = stored_version
+    plan = list()
+
+    if current >= class_version:
+        return plan
+
+    for step in getMigrationSteps(node_class):
+        if not current < step.target <= class_version:
+            continue
+        if step.source.match(current) or current.version < step.source.lowest:
+            plan.append(step)
+            current = step.target
+
+    return plan
+
+
+def _getStoredVersion(node):
+    # type: (Any) -> Optional[Version]
+    try:
+        return node.about.version
+    except (ValueError, TypeError, AssertionError) as excp:
+        logger.warning(
+            "[migration] Invalid version stored on node {}: {}".format(node, excp)
+        )
+        return None
+
+
+def upgradeNode(node):
+    # type: (Any) -> List[MigrationStep]
+    """
+    Run the migration steps required to upgrade the given BaseCustomNode instance to
+    its class version, sync its declared ``user_params``, then update its ``About``
+    parameters.
+
+    Nothing is done if the node is already up-to-date.
+
+    Returns:
+        steps that have been run.
+    """
+    class_version = Version(node.version)
+    stored = node.about._getValue(node.about.ParamNames.version)
+    # most nodes are up-to-date, avoid any extra work for them
+    if stored == str(class_version):
+        return list()
+
+    stored_version = _getStoredVersion(node)
+    if stored_version is None:
+        return list()
+
+    if stored_version > class_version:
+        logger.warning(
+            "[upgradeNode] Node {} has version {} which is newer than its class "
+            "version {}: not downgrading.".format(
+                node.getName(), stored_version, class_version
+            )
+        )
+        return list()
+
+    plan = planMigration(node.__class__, stored_version)
+    for step in plan:
+        logger.debug(
+            "[upgradeNode] {}: running {}".format(node.getName(), step)
+        )
+        step.function(node)
+
+    # after the steps, so they can still read the previous interface
+    if getattr(node, "user_params", None):
+        node.__upgradeparams__()
+
+    node.about.__update__()
+    return plan
+
+
+def previewMigration(node):
+    # type: (Any) -> Optional[Dict[str, Any]]
+    """
+    Dry-run of ``upgradeNode``: find what would be done to the node without
+    modifying it.
+
+    Returns:
+        None if the node is up-to-date else a json-serializable dict with the node
+        name, type, stored version, class version, the steps that would be run and
+        the changes on the declared ``user_params``.
+    """
+    stored_version = _getStoredVersion(node)
+    class_version = Version(node.version)
+    if stored_version is None or stored_version == class_version:
+        return None
+
+    params = list()
+    if stored_version > class_version:
+        steps = list()
+    else:
+        steps = planMigration(node.__class__, stored_version)
+        if getattr(node, "user_params", None):
+            params = [str(change) for change in node._diffUserParams()]
+
+    return {
+        "node": node.getName(),
+        "type": node.getType(),
+        "from": str(stored_version),
+        "to": str(class_version),
+        "steps": [
+            {
+                "name": step.name,
+                "source": str(step.source),
+                "target": str(step.target),
+                "description": step.description,
+            }
+            for step in steps
+        ],
+        "params": params,
+    }
+
+
+def previewMigrations(nodes):
+    # type: (Iterable[Any]) -> List[Dict[str, Any]]
+    """
+    ``previewMigration`` for multiple nodes, only the outdated nodes are returned.
+    """
+    report = list()
+    for node in nodes:
+        preview = previewMigration(node)
+        if preview is not None:
+            report.append(preview)
+    return report
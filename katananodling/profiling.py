@@ -0,0 +1,227 @@
+"""
+Measure the time spent registering BaseCustomNode at startup, per library and
+per node, and the time spent creating and upgrading their instances.
+"""
+import contextlib
+import json
+import logging
+import time
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+
+__all__ = (
+    "NODE_PHASES",
+    "NODE_TIMINGS",
+    "NodeTimings",
+    "PHASES",
+    "PROFILER",
+    "RegistrationProfiler",
+    "getRegistrationProfile",
+    "timer",
+)
+
+logger = logging.getLogger(__name__)
+
+timer = getattr(time, "perf_counter", time.time)  # python-2 doesn't have it
+
+PHASES = ("import", "discovery", "filtering", "validation", "registration")
+"""
+Steps of the registration process that are measured.
+"""
+
+
+class RegistrationProfiler(object):
+    """
+    Collect the wall time spent in each registration phase.
+
+    Measures can be nested, in which case the time of the inner measure is
+    subtracted from the outer one, so each record store the time spent exclusively in
+    its phase and records can be summed.
+    """
+
+    def __init__(self):
+        self.records = list()  # type: List[Dict[str, Any]]
+        self.total = 0.0
+        self._package = None  # type: Optional[str]
+        self._stack = list()  # type: List[List[float]]
+
+    def reset(self):
+        """
+        Discard all the records.
+        """
+        self.__init__()
+
+    @contextlib.contextmanager
+    def package(self, package_id):
+        # type: (str) -> None
+        """
+        Context where all the measures are assigned to the given library.
+        """
+        previous = self._package
+        self._package = package_id
+        try:
+            yield
+        finally:
+            self._package = previous
+
+    @contextlib.contextmanager
+    def measure(self, phase, node=None):
+        # type: (str, Optional[str]) -> None
+        """
+        Context to measure the time spent in it.
+
+        Args:
+            phase: one of ``PHASES``
+            node: name of the node being processed if specific to one.
+        """
+        # [start time, time spent in nested measures]
+        frame = [timer(), 0.0]
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            duration = timer() - frame[0]
+            if self._stack:
+                self._stack[-1][1] += duration
+            self.records.append(
+                {
+                    "phase": phase,
+                    "package": self._package,
+                    "node": node,
+                    "duration": duration - frame[1],
+                }
+            )
+
+    def _sumBy(self, key):
+        # type: (str) -> Dict[str, Dict[str, float]]
+        out = dict()
+        for record in self.records:
+            if record[key] is None:
+                continue
+            phases = out.setdefault(record[key], dict.fromkeys(PHASES, 0.0))
+            phases[record["phase"]] += record["duration"]
+        return out
+
+    def getPackageTimings(self):
+        # type: () -> Dict[str, Dict[str, float]]
+        """
+        Returns:
+            seconds spent in each phase, per library.
+        """
+        return self._sumBy("package")
+
+    def getNodeTimings(self):
+        # type: () -> Dict[str, Dict[str, float]]
+        """
+        Returns:
+            seconds spent in each phase, per node, for the phases specific to a node.
+        """
+        return self._sumBy("node")
+
+    def asdict(self):
+        # type: () -> Dict[str, Any]
+        """
+        Returns:
+            json serializable summary of all the timings.
+        """
+        phases = dict.fromkeys(PHASES, 0.0)
+        for record in self.records:
+            phases[record["phase"]] += record["duration"]
+
+        return {
+            "total": self.total,
+            "phases": phases,
+            "packages": self.getPackageTimings(),
+            "nodes": self.getNodeTimings(),
+        }
+
+    def dump(self, path):
+        # type: (str) -> None
+        """
+        Write the summary of the timings to the given json file.
+        """
+        with open(path, "w") as profile_file:
+            json.dump(self.asdict(), profile_file, indent=4, sort_keys=True)
+        logger.info("[RegistrationProfiler][dump] Wrote <{}>".format(path))
+        return
+
+
+PROFILER = RegistrationProfiler()
+"""
+Profiler used during ``loader.registerNodesFor()``.
+"""
+
+
+def getRegistrationProfile():
+    # type: () -> Dict[str, Any]
+    """
+    Returns:
+        timings of the last ``loader.registerNodesFor()`` call,
+        see ``RegistrationProfiler.asdict``.
+    """
+    return PROFILER.asdict()
+
+
+NODE_PHASES = ("create", "upgrade")
+"""
+Steps of a BaseCustomNode instance lifetime that are measured.
+"""
+
+
+class NodeTimings(object):
+    """
+    Accumulate the count and the time spent in each ``NODE_PHASES`` per node type.
+
+    Only sums are stored so recording stays cheap whatever the number of nodes.
+    """
+
+    def __init__(self):
+        # {node type: {phase: [count, total seconds]}}
+        self._timings = dict()  # type: Dict[str, Dict[str, List[float]]]
+
+    def reset(self):
+        """
+        Discard all the timings.
+        """
+        self._timings.clear()
+
+    def record(self, node_type, phase, duration):
+        # type: (str, str, float) -> None
+        phases = self._timings.get(node_type)
+        if phases is None:
+            phases = self._timings[node_type] = dict(
+                (name, [0, 0.0]) for name in NODE_PHASES
+            )
+        timing = phases[phase]
+        timing[0] += 1
+        timing[1] += duration
+
+    def get(self, node_type):
+        # type: (str) -> Dict[str, Dict[str, float]]
+        """
+        Returns:
+            count, total and mean seconds of each phase for the given node type.
+        """
+        phases = self._timings.get(node_type) or dict()
+        out = dict()
+        for phase in NODE_PHASES:
+            count, total = phases.get(phase, (0, 0.0))
+            out[phase] = {
+                "count": count,
+                "total": total,
+                "mean": total / count if count else 0.0,
+            }
+        return out
+
+    def getNodeTypes(self):
+        # type: () -> List[str]
+        return sorted(self._timings.keys())
+
+
+NODE_TIMINGS = NodeTimings()
+"""
+Timings recorded by the loader when creating and upgrading BaseCustomNode.
+"""
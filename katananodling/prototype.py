@@ -0,0 +1,181 @@
+"""
+Cache of BaseCustomNode "prototypes": the xml serialization of a freshly built node
+that is loaded to create new instances, instead of building them again.
+
+Only used for classes with ``use_prototype_cache = True``.
+"""
+import inspect
+import json
+import logging
+import os
+from typing import Dict
+from typing import Optional
+from typing import Type
+
+from Katana import NodegraphAPI
+
+try:
+    from Katana import PyXmlIO
+except ImportError:  # older Katana only expose it as a top-level module
+    import PyXmlIO
+
+from . import c
+from .cache import getFileFingerprint
+from .cache import writeFileAtomically
+from .util import Version
+
+__all__ = (
+    "PROTOTYPES",
+    "PrototypeCache",
+    "instantiatePrototype",
+    "serializeNode",
+)
+
+logger = logging.getLogger(__name__)
+
+
+def serializeNode(node):
+    # type: (NodegraphAPI.Node) -> str
+    """
+    Returns:
+        xml representation of the node, including its children, parameters and ports.
+    """
+    return NodegraphAPI.BuildNodesXmlIO([node]).writeString()
+
+
+def instantiatePrototype(xml_text, parent=None):
+    # type: (str, Optional[NodegraphAPI.Node]) -> Optional[NodegraphAPI.Node]
+    """
+    Create a new node from the given serialized node.
+
+    Returns:
+        the node created or None if the xml doesn't describe any node.
+    """
+    parent = parent or NodegraphAPI.GetRootNode()
+    nodes = NodegraphAPI.LoadElementsFromXmlIO(PyXmlIO.Parse(xml_text), parent)
+    return nodes[0] if nodes else None
+
+
+class PrototypeCache(object):
+    """
+    Prototypes per node name, invalidated when the node class version, its source file
+    or the katananodling version change.
+
+    Args:
+        directory: optional directory where prototypes are persisted between sessions.
+    """
+
+    def __init__(self, directory=None):
+        # type: (Optional[str]) -> None
+        self.directory = directory
+        # {node name: (key, xml)}
+        self._prototypes = dict()  # type: Dict[str, tuple]
+        self._keys = dict()  # type: Dict[Type, str]
+
+    def __contains__(self, node_class):
+        return self.get(node_class) is not None
+
+    def getKey(self, node_class):
+        # type: (Type) -> str
+        """
+        Returns:
+            identifier of the given class that change as soon as its prototype might
+            be different.
+        """
+        key = self._keys.get(node_class)
+        if key is None:
+            key = self._keys[node_class] = self._computeKey(node_class)
+        return key
+
+    @staticmethod
+    def _computeKey(node_class):
+        # type: (Type) -> str
+        try:
+            path = inspect.getsourcefile(node_class) or inspect.getfile(node_class)
+            fingerprint = getFileFingerprint(path)
+        except TypeError:
+            fingerprint = None
+        return "{}|{}|{}|{}|{}".format(
+            node_class.__module__,
+            node_class.__name__,
+            Version(node_class.version),
+            c.__version__,
+            list(fingerprint) if fingerprint else None,
+        )
+
+    def _getPath(self, node_name):
+        # type: (str) -> Optional[str]
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, "{}.prototype.json".format(node_name))
+
+    def _read(self, node_name):
+        # type: (str) -> Optional[tuple]
+        path = self._getPath(node_name)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as prototype_file:
+                content = json.load(prototype_file)
+            return content["key"], content["xml"]
+        except Exception as excp:
+            logger.warning(
+                "[PrototypeCache][_read] Ignoring invalid prototype <{}>: {}"
+                "".format(path, excp)
+            )
+            return None
+
+    def get(self, node_class):
+        # type: (Type) -> Optional[str]
+        """
+        Returns:
+            the serialized prototype of the given class or None if not cached yet or
+            outdated.
+        """
+        key = self.getKey(node_class)
+        prototype = self._prototypes.get(node_class.name)
+        if prototype is None:
+            prototype = self._read(node_class.name)
+            if prototype is not None:
+                self._prototypes[node_class.name] = prototype
+
+        if prototype is None or prototype[0] != key:
+            return None
+        return prototype[1]
+
+    def set(self, node_class, xml_text):
+        # type: (Type, str) -> None
+        """
+        Store the prototype of the given class, on disk too if a directory is set.
+        """
+        key = self.getKey(node_class)
+        self._prototypes[node_class.name] = (key, xml_text)
+
+        path = self._getPath(node_class.name)
+        if not path:
+            return
+        try:
+            writeFileAtomically(path, json.dumps({"key": key, "xml": xml_text}))
+        except Exception as excp:
+            logger.warning(
+                "[PrototypeCache][set] Cannot write prototype <{}>: {}"
+                "".format(path, excp)
+            )
+        return
+
+    def discard(self, node_name):
+        # type: (str) -> None
+        self._prototypes.pop(node_name, None)
+
+    def clear(self):
+        """
+        Discard all the prototypes in memory, the ones on disk are kept.
+        """
+        self._prototypes.clear()
+        self._keys.clear()
+
+
+PROTOTYPES = PrototypeCache()
+"""
+Prototypes used by ``loader._createCustomNode``.
+"""
@@ -0,0 +1,325 @@
+"""
+Lightweight description of the registered BaseCustomNode classes, so they can be
+registered in Katana without having to import the python modules defining them.
+"""
+import importlib
+import json
+import logging
+import os
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import FrozenSet
+from typing import List
+from typing import Optional
+from typing import Tuple
+from typing import Type
+
+from . import c
+
+__all__ = (
+    "NodeEntry",
+    "NodeRegistry",
+    "readManifest",
+    "writeManifest",
+)
+
+logger = logging.getLogger(__name__)
+
+
+class NodeEntry(object):
+    """
+    Describe a BaseCustomNode subclass using only builtin python types.
+
+    The class described can then be retrieved using :func:`NodeEntry.load`.
+
+    Args:
+        name: BaseCustomNode.name, identifier used to register the node in Katana
+        class_name: name of the python class, as defined in its module
+        module: importable python name of the module defining the class
+        version: BaseCustomNode.version
+        color: BaseCustomNode.color
+        description: BaseCustomNode.description
+        author: BaseCustomNode.author
+        category: BaseCustomNode.category
+        flavors: list of Katana node flavors to assign to the node type
+    """
+
+    __slots__ = (
+        "name",
+        "class_name",
+        "module",
+        "version",
+        "color",
+        "description",
+        "author",
+        "category",
+        "flavors",
+    )
+
+    def __init__(
+        self,
+        name,
+        class_name,
+        module,
+        version=(0, 0, 0),
+        color=None,
+        description="",
+        author="",
+        category="",
+        flavors=(c.KATANA_FLAVOR_NAME,),
+    ):
+        self.name = name  # type: str
+        self.class_name = class_name  # type: str
+        self.module = module  # type: str
+        self.version = tuple(version)  # type: Tuple[int, int, int]
+        self.color = tuple(color) if color else None  # type: Optional[Tuple[float, float, float]]
+        self.description = description  # type: str
+        self.author = author  # type: str
+        self.category = category  # type: str
+        self.flavors = tuple(flavors)  # type: Tuple[str, ...]
+
+    def __repr__(self):
+        return "<{} {} ({}.{})>".format(
+            self.__class__.__name__, self.name, self.module, self.class_name
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, NodeEntry):
+            return False
+        return self.asdict() == other.asdict()
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    @classmethod
+    def fromClass(cls, node_class):
+        # type: (Type) -> NodeEntry
+        """
+        Args:
+            node_class: BaseCustomNode subclass to describe
+
+        Returns:
+            new NodeEntry instance describing the given class
+        """
+        return cls(
+            name=node_class.name,
+            class_name=node_class.__name__,
+            module=node_class.__module__,
+            version=node_class.version,
+            color=node_class.color,
+            description=node_class.description,
+            author=node_class.author,
+            category=getattr(node_class, "category", ""),
+        )
+
+    @classmethod
+    def fromDict(cls, data):
+        # type: (Dict[str, Any]) -> NodeEntry
+        """
+        Inverse of :func:`NodeEntry.asdict`.
+        """
+        return cls(**{key: data[key] for key in cls.__slots__ if key in data})
+
+    def asdict(self):
+        # type: () -> Dict[str, Any]
+        """
+        Returns:
+            json serializable representation of this instance.
+        """
+        return {
+            "name": self.name,
+            "class_name": self.class_name,
+            "module": self.module,
+            "version": list(self.version),
+            "color": list(self.color) if self.color else None,
+            "description": self.description,
+            "author": self.author,
+            "category": self.category,
+            "flavors": list(self.flavors),
+        }
+
+    def load(self):
+        # type: () -> Type
+        """
+        Import the module defining the class and return the class.
+
+        Raises:
+            ImportError: if the class cannot be found in its module.
+        """
+        module = importlib.import_module(self.module)
+        node_class = getattr(module, self.class_name, None)
+        if node_class is None:
+            raise ImportError(
+                "Class <{}> not found in module <{}>".format(self.class_name, module)
+            )
+        return node_class
+
+
+class NodeRegistry(dict):
+    """
+    A dict of node name -> BaseCustomNode class, where values can also be a
+    :class:`NodeEntry` that is resolved to its class the first time it's accessed.
+
+    Iterating over keys never resolve entries, use :func:`NodeRegistry.peek`
+    to retrieve a value without resolving it.
+
+    :func:`NodeRegistry.names` gives a cached frozenset of the keys for fast
+    membership tests.
+
+    :attr:`NodeRegistry.revision` is incremented each time a key is added, removed or
+    its value replaced (but not when an entry is resolved), so caches built from the
+    registry know when to rebuild.
+
+    Args:
+        resolver:
+            callable that receive a NodeEntry and return the corresponding class.
+            Expected to raise if the class is invalid.
+    """
+
+    def __init__(self, resolver=None):
+        # type: (Optional[Callable[[NodeEntry], Type]]) -> None
+        super(NodeRegistry, self).__init__()
+        self.resolver = resolver or NodeEntry.load
+        self._names = None  # type: Optional[FrozenSet[str]]
+        self.revision = 0  # type: int
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self._names = None
+        self.revision += 1
+        super(NodeRegistry, self).__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._names = None
+        self.revision += 1
+        super(NodeRegistry, self).__delitem__(key)
+
+    def clear(self):
+        self._names = None
+        self.revision += 1
+        super(NodeRegistry, self).clear()
+
+    def pop(self, *args):
+        self._names = None
+        self.revision += 1
+        return super(NodeRegistry, self).pop(*args)
+
+    def popitem(self):
+        self._names = None
+        self.revision += 1
+        return super(NodeRegistry, self).popitem()
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self.peek(key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def names(self):
+        # type: () -> FrozenSet[str]
+        """
+        Returns:
+            all the keys, as a frozenset only rebuilt when keys are added or removed.
+        """
+        if self._names is None:
+            self._names = frozenset(self.keys())
+        return self._names
+
+    def __getitem__(self, key):
+        value = super(NodeRegistry, self).__getitem__(key)
+        if isinstance(value, NodeEntry):
+            value = self._resolve(key, value)
+        return value
+
+    def _resolve(self, key, entry):
+        # type: (str, NodeEntry) -> Type
+        try:
+            node_class = self.resolver(entry)
+        except Exception as excp:
+            logger.error(
+                "[NodeRegistry][_resolve] Cannot resolve {}: {}".format(entry, excp)
+            )
+            raise
+        super(NodeRegistry, self).__setitem__(key, node_class)
+        logger.debug("[NodeRegistry][_resolve] resolved {}".format(entry))
+        return node_class
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        return self[key]
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def peek(self, key, default=None):
+        # type: (str, Any) -> Any
+        """
+        Same as ``get()`` but doesn't resolve the value if it's still a NodeEntry.
+
+        NodeEntry and BaseCustomNode class share the same information attributes
+        (name, version, color, ...) so the returned value can be used the same way
+        as long as the actual class is not needed.
+        """
+        return super(NodeRegistry, self).get(key, default)
+
+    def isResolved(self, key):
+        # type: (str) -> bool
+        """
+        Returns:
+            False if the value for the given key has still not been imported.
+        """
+        return not isinstance(self.peek(key), NodeEntry)
+
+
+def getManifestPath(package_directory):
+    # type: (str) -> str
+    return os.path.join(package_directory, c.MANIFEST_FILENAME)
+
+
+def readManifest(path):
+    # type: (str) -> Optional[List[NodeEntry]]
+    """
+    Args:
+        path: path to an existing manifest file
+
+    Returns:
+        entries stored in the manifest or None if the manifest is missing or invalid.
+    """
+    if not os.path.isfile(path):
+        return None
+
+    try:
+        with open(path, "r") as manifest_file:
+            content = json.load(manifest_file)
+        return [NodeEntry.fromDict(data) for data in content["nodes"]]
+    except Exception as excp:
+        logger.error("[readManifest] Cannot read manifest <{}>: {}".format(path, excp))
+        return None
+
+
+def writeManifest(path, entries):
+    # type: (str, List[NodeEntry]) -> None
+    """
+    Args:
+        path: path to a file to write, overwritten if existing.
+        entries: entries to store in the manifest
+    """
+    content = {
+        "api_version": c.__version__,
+        "nodes": [entry.asdict() for entry in entries],
+    }
+    with open(path, "w") as manifest_file:
+        json.dump(content, manifest_file, indent=4, sort_keys=True)
+
+    logger.debug(
+        "[writeManifest] Wrote {} entries to <{}>".format(len(entries), path)
+    )
+    return
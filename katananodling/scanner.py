@@ -0,0 +1,383 @@
+"""
+Find which node types are used in a Katana scene file, without loading it.
+
+Must stay fast and dependency-free as it runs before Katana load the scene, in batch
+mode, and can be used without Katana to find which scenes use which BaseCustomNode
+at which version::
+
+    python -m katananodling.scanner /shows/abc/shots --type Demo --version "<0.2"
+
+Scene files can be gzip-compressed.
+"""
+import argparse
+import fnmatch
+import gzip
+import json
+import logging
+import os
+import re
+import sys
+from typing import Any
+from typing import Dict
+from typing import Iterable
+from typing import Iterator
+from typing import List
+from typing import Optional
+from typing import Set
+from xml.parsers import expat
+
+from .util import VersionRange
+
+__all__ = (
+    "SceneNode",
+    "getKatanaFileFromArgv",
+    "getSceneNodeTypes",
+    "iterCustomNodes",
+    "iterSceneFiles",
+    "main",
+    "scanScene",
+)
+
+logger = logging.getLogger(__name__)
+
+_NODE_TYPE_REGEX = re.compile(r"<node\s[^>]*?\btype=\"([^\"]+)\"")
+
+_CHUNK_SIZE = 1024 * 1024
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+SCENE_PATTERNS = ("*.katana", "*.katana.gz")
+"""
+File name patterns of the scene files searched in directories.
+"""
+
+ABOUT_PARAM_PATH = ("user", "About")
+"""
+Path of the ``AboutGroupParam`` group on BaseCustomNode, mirrors
+``AboutGroupParam.ParamNames`` that can't be imported without Katana.
+"""
+
+ABOUT_VERSION_PARAMS = ("version", "api_version")
+"""
+Parameters read in the ``About`` group.
+"""
+
+
+def getKatanaFileFromArgv(argv=None):
+    # type: (Optional[Iterable[str]]) -> Optional[str]
+    """
+    Args:
+        argv: command line arguments, default to ``sys.argv``
+
+    Returns:
+        path of the scene passed with ``--katana-file`` to the katana process, if any.
+    """
+    argv = list(sys.argv if argv is None else argv)
+    for index, arg in enumerate(argv):
+        if arg.startswith("--katana-file="):
+            return arg.split("=", 1)[1]
+        if arg == "--katana-file" and index + 1 < len(argv):
+            return argv[index + 1]
+    return None
+
+
+def _isGzip(path):
+    # type: (str) -> bool
+    with open(path, "rb") as scene_file:
+        return scene_file.read(2) == _GZIP_MAGIC
+
+
+def _openScene(path, text=False):
+    """
+    Open the given scene file for reading, decompressing it if needed.
+    """
+    if _isGzip(path):
+        if text and sys.version_info[0] >= 3:
+            return gzip.open(path, "rt")
+        return gzip.open(path, "rb")
+    return open(path, "r" if text else "rb")
+
+
+def getSceneNodeTypes(path):
+    # type: (str) -> Set[str]
+    """
+    Read the given scene file by chunks to find the type of all the nodes it contains.
+
+    Args:
+        path: path to a .katana file
+
+    Returns:
+        all the node types used in the scene, including nodes inside groups.
+    """
+    node_types = set()
+    remainder = ""
+
+    with _openScene(path, text=True) as scene_file:
+        while True:
+            chunk = scene_file.read(_CHUNK_SIZE)
+            if not chunk:
+                break
+
+            content = remainder + chunk
+            # a tag might be cut at the end of the chunk, keep it for the next one
+            cut = content.rfind("<")
+            if cut != -1 and content.find(">", cut) == -1:
+                remainder = content[cut:]
+                content = content[:cut]
+            else:
+                remainder = ""
+
+            node_types.update(_NODE_TYPE_REGEX.findall(content))
+
+    logger.debug(
+        "[getSceneNodeTypes] Found {} node types in <{}>".format(len(node_types), path)
+    )
+    return node_types
+
+
+class SceneNode(object):
+    """
+    A BaseCustomNode found in a scene file.
+
+    Args:
+        path: names of the node parents and of the node, joined with ``/``
+        node_type: node type
+        version: value of the About version parameter
+        api_version: value of the About api_version parameter
+    """
+
+    __slots__ = ("path", "type", "version", "api_version")
+
+    def __init__(self, path, node_type, version=None, api_version=None):
+        # type: (str, str, Optional[str], Optional[str]) -> None
+        self.path = path
+        self.type = node_type
+        self.version = version
+        self.api_version = api_version
+
+    def __repr__(self):
+        return "<{} {} ({} {})>".format(
+            self.__class__.__name__, self.path, self.type, self.version
+        )
+
+    @property
+    def name(self):
+        # type: () -> str
+        return self.path.rsplit("/", 1)[-1]
+
+    def asdict(self):
+        # type: () -> Dict[str, Optional[str]]
+        return {
+            "path": self.path,
+            "type": self.type,
+            "version": self.version,
+            "api_version": self.api_version,
+        }
+
+
+class _NodeContext(object):
+
+    __slots__ = ("path", "type", "params", "about", "values")
+
+    def __init__(self, path, node_type):
+        self.path = path  # type: str
+        self.type = node_type  # type: str
+        # names of the parameters being parsed, the first one is the root group
+        self.params = list()  # type: List[str]
+        self.about = False
+        self.values = dict()  # type: Dict[str, str]
+
+
+def iterCustomNodes(path, node_types=None):
+    # type: (str, Optional[Iterable[str]]) -> Iterator[SceneNode]
+    """
+    Stream-parse the given scene file to find the BaseCustomNode it contains.
+
+    The file is read by chunks with an incremental parser that doesn't build any
+    xml tree, so memory usage doesn't depend on the scene size.
+
+    Args:
+        path: path to a .katana file, can be gzip-compressed
+        node_types:
+            types of the BaseCustomNode to find. If None, any node with an ``About``
+            group parameter like the one created by ``AboutGroupParam`` is returned.
+
+    Returns:
+        BaseCustomNode found, in the order they are closed in the file (children
+        before their parent).
+
+    Raises:
+        expat.ExpatError: if the file is not valid xml.
+    """
+    node_types = frozenset(node_types) if node_types is not None else None
+    about_depth = len(ABOUT_PARAM_PATH) + 1
+    nodes = list()  # type: List[_NodeContext]
+    found = list()  # type: List[SceneNode]
+
+    def onStart(tag, attributes):
+        if tag == "node":
+            name = attributes.get("name", "")
+            parent_path = nodes[-1].path + "/" if nodes else ""
+            nodes.append(_NodeContext(parent_path + name, attributes.get("type")))
+
+        elif nodes and tag.endswith("_parameter"):
+            node = nodes[-1]
+            params = node.params
+            params.append(attributes.get("name"))
+            depth = len(params)
+            if depth == about_depth:
+                if tuple(params[1:]) == ABOUT_PARAM_PATH:
+                    node.about = True
+            elif depth == about_depth + 1 and node.about:
+                if params[-1] in ABOUT_VERSION_PARAMS:
+                    if tuple(params[1:-1]) == ABOUT_PARAM_PATH:
+                        node.values[params[-1]] = attributes.get("value")
+
+    def onEnd(tag):
+        if tag == "node":
+            node = nodes.pop()
+            if node_types is not None:
+                if node.type not in node_types:
+                    return
+            elif not node.about:
+                return
+            found.append(
+                SceneNode(
+                    path=node.path,
+                    node_type=node.type,
+                    version=node.values.get("version"),
+                    api_version=node.values.get("api_version"),
+                )
+            )
+
+        elif nodes and tag.endswith("_parameter"):
+            nodes[-1].params.pop()
+
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = onStart
+    parser.EndElementHandler = onEnd
+
+    with _openScene(path) as scene_file:
+        while True:
+            chunk = scene_file.read(_CHUNK_SIZE)
+            parser.Parse(chunk, not chunk)
+            for node in found:
+                yield node
+            del found[:]
+            if not chunk:
+                break
+
+    return
+
+
+def scanScene(path, node_types=None, version_range=None):
+    # type: (str, Optional[Iterable[str]], Optional[str]) -> Dict[str, Any]
+    """
+    Args:
+        path: path to a .katana file, can be gzip-compressed
+        node_types: see ``iterCustomNodes``
+        version_range:
+            only report the nodes whose version is in this range, see
+            ``util.VersionRange``
+
+    Returns:
+        json-serializable report of the BaseCustomNode found in the given scene,
+        with the count of nodes per type and version.
+    """
+    version_range = VersionRange(version_range) if version_range else None
+    nodes = list()
+    versions = dict()  # type: Dict[str, Dict[str, int]]
+    report = {"path": path, "nodes": nodes, "versions": versions}
+
+    # much faster than parsing, skip most scenes when searching specific types
+    if node_types is not None:
+        node_types = set(node_types)
+        if not node_types.intersection(getSceneNodeTypes(path)):
+            return report
+
+    for node in iterCustomNodes(path, node_types):
+        if version_range is not None:
+            try:
+                if node.version is None or node.version not in version_range:
+                    continue
+            except (ValueError, TypeError, AssertionError) as excp:
+                logger.warning(
+                    "[scanScene] Skipping {} in <{}>, invalid version stored: {}"
+                    "".format(node.path, path, excp)
+                )
+                continue
+        nodes.append(node.asdict())
+        counts = versions.setdefault(node.type, dict())
+        counts[node.version] = counts.get(node.version, 0) + 1
+
+    return report
+
+
+def iterSceneFiles(paths, patterns=SCENE_PATTERNS):
+    # type: (Iterable[str], Iterable[str]) -> Iterator[str]
+    """
+    Args:
+        paths: scene files, or directories searched recursively for scene files
+        patterns: file name patterns of the scene files searched in directories
+
+    Returns:
+        path of the scene files, sorted per directory.
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        for directory, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if any(fnmatch.fnmatch(filename, pattern) for pattern in patterns):
+                    yield os.path.join(directory, filename)
+
+
+def main(argv=None):
+    # type: (Optional[List[str]]) -> int
+    """
+    Command line entry point, see ``--help``.
+
+    Returns:
+        exit code: 1 if a scene could not be read.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m katananodling.scanner",
+        description="Find the BaseCustomNode used in Katana scene files, without "
+        "Katana. Print one json report per line and per scene.",
+    )
+    parser.add_argument(
+        "paths", nargs="+", help="scene files or directories to search recursively"
+    )
+    parser.add_argument(
+        "--type",
+        dest="node_types",
+        action="append",
+        help="only report nodes of this type, can be used multiple times",
+    )
+    parser.add_argument(
+        "--version", help='only report nodes in this version range, ex: ">=0.2,<1"'
+    )
+    parser.add_argument(
+        "--all", action="store_true", help="also print the scenes without match"
+    )
+    args = parser.parse_args(argv)
+
+    exit_code = 0
+    for path in iterSceneFiles(args.paths):
+        try:
+            report = scanScene(path, args.node_types, args.version)
+        except Exception as excp:
+            logger.error("[main] Cannot scan <{}>: {}".format(path, excp))
+            exit_code = 1
+            continue
+        if report["nodes"] or args.all:
+            sys.stdout.write(json.dumps(report, sort_keys=True) + "\n")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
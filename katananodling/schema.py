@@ -0,0 +1,343 @@
+"""
+Declarative description of the ``user`` parameters of a BaseCustomNode, used to build
+them and to upgrade existing nodes by only applying what changed.
+
+Example::
+
+    class MyNode(BaseCustomNode):
+
+        user_params = [
+            schema.StringParam("CEL", hints={"widget": "cel"}),
+            schema.GroupParam(
+                "options",
+                [schema.NumberParam("amount", 1, hints={"slider": True})],
+            ),
+        ]
+"""
+import ast
+import logging
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+
+__all__ = (
+    "GroupParam",
+    "NumberArrayParam",
+    "NumberParam",
+    "Param",
+    "ParamChange",
+    "StringArrayParam",
+    "StringParam",
+    "applyChanges",
+    "buildParams",
+    "diffParams",
+    "syncParams",
+)
+
+logger = logging.getLogger(__name__)
+
+
+class Param(object):
+    """
+    Abstract description of a parameter.
+
+    Args:
+        name: name of the parameter
+        default: value of the parameter when created
+        hints: hints of the parameter, as a dict
+        expression: optional expression to set on the parameter when created
+    """
+
+    TYPE = None  # type: str
+    """
+    Type of the parameter, as returned by ``NodegraphAPI.Parameter.getType()``.
+    """
+
+    def __init__(self, name, default=None, hints=None, expression=None):
+        # type: (str, Any, Optional[Dict[str, Any]], Optional[str]) -> None
+        self.name = name
+        self.default = default
+        self.hints = hints or dict()
+        self.expression = expression
+
+    def __repr__(self):
+        return "<{} {}>".format(self.__class__.__name__, self.name)
+
+    def getHintString(self):
+        # type: () -> str
+        return repr(self.hints) if self.hints else ""
+
+    def _createParam(self, parent):
+        raise NotImplementedError()
+
+    def create(self, parent):
+        """
+        Create the parameter described as the last child of the given parameter.
+
+        Returns:
+            NodegraphAPI.Parameter: the parameter created.
+        """
+        param = self._createParam(parent)
+        if self.hints:
+            param.setHintString(self.getHintString())
+        if self.expression:
+            param.setExpression(self.expression)
+        return param
+
+    def isCompatible(self, param):
+        # type: (Any) -> bool
+        """
+        Returns:
+            True if the given existing parameter can be kept to match this description.
+        """
+        return param.getType() == self.TYPE
+
+
+class StringParam(Param):
+    TYPE = "string"
+
+    def _createParam(self, parent):
+        return parent.createChildString(self.name, self.default or "")
+
+
+class NumberParam(Param):
+    TYPE = "number"
+
+    def _createParam(self, parent):
+        return parent.createChildNumber(self.name, self.default or 0)
+
+
+class _ArrayParam(Param):
+    """
+    Args:
+        name: name of the parameter
+        default: list of values, define the size of the array
+        hints: hints of the parameter, as a dict
+    """
+
+    def __init__(self, name, default=(), hints=None):
+        # type: (str, Sequence[Any], Optional[Dict[str, Any]]) -> None
+        super(_ArrayParam, self).__init__(name, list(default), hints)
+
+    def _createArray(self, parent):
+        raise NotImplementedError()
+
+    def _createParam(self, parent):
+        param = self._createArray(parent)
+        for index, value in enumerate(self.default):
+            param.getChildByIndex(index).setValue(value, 0)
+        return param
+
+    def isCompatible(self, param):
+        return (
+            param.getType() == self.TYPE
+            and param.getNumChildren() == len(self.default)
+        )
+
+
+class StringArrayParam(_ArrayParam):
+    TYPE = "stringArray"
+
+    def _createArray(self, parent):
+        return parent.createChildStringArray(self.name, len(self.default))
+
+
+class NumberArrayParam(_ArrayParam):
+    TYPE = "numberArray"
+
+    def _createArray(self, parent):
+        return parent.createChildNumberArray(self.name, len(self.default))
+
+
+class GroupParam(Param):
+    """
+    Args:
+        name: name of the parameter
+        children: description of the child parameters, in order
+        hints: hints of the parameter, as a dict
+    """
+
+    TYPE = "group"
+
+    def __init__(self, name, children=(), hints=None):
+        # type: (str, Sequence[Param], Optional[Dict[str, Any]]) -> None
+        super(GroupParam, self).__init__(name, None, hints)
+        self.children = list(children)
+
+    def _createParam(self, parent):
+        param = parent.createChildGroup(self.name)
+        buildParams(param, self.children)
+        return param
+
+
+def buildParams(parent, params):
+    # type: (Any, Sequence[Param]) -> None
+    """
+    Create all the described parameters under the given parameter, in order.
+    """
+    for param in params:
+        param.create(parent)
+
+
+class ParamChange(object):
+    """
+    An operation to apply on a parameter so it match its description.
+
+    Args:
+        action: one of ``ACTIONS``
+        parent: the existing parent parameter
+        name: name of the parameter to operate on
+        param: description of the parameter, None for "remove"
+        order: for "reorder", the names of the children in the expected order
+    """
+
+    ACTIONS = ("add", "remove", "replace", "hints", "reorder")
+
+    def __init__(self, action, parent, name, param=None, order=None):
+        # type: (str, Any, str, Optional[Param], Optional[List[str]]) -> None
+        self.action = action
+        self.parent = parent
+        self.name = name
+        self.param = param
+        self.order = order
+
+    def __str__(self):
+        path = self.parent.getFullName(False)
+        return "{} {}".format(self.action, "{}.{}".format(path, self.name).strip("."))
+
+    def __repr__(self):
+        return "<{} {}>".format(self.__class__.__name__, self)
+
+
+def _parseHints(hint_string):
+    # type: (str) -> Dict[str, Any]
+    try:
+        return ast.literal_eval(hint_string) if hint_string else dict()
+    except (ValueError, SyntaxError):
+        return dict()
+
+
+def diffParams(parent, params, ignored=()):
+    # type: (Any, Sequence[Param], Sequence[str]) -> List[ParamChange]
+    """
+    Compare the existing children of the given parameter with their description.
+
+    Values and expressions of existing parameters are not compared, as they can have
+    been edited by the user.
+
+    Args:
+        parent: existing parameter
+        params: expected children
+        ignored: name of the children to never remove, kept after the described ones
+
+    Returns:
+        changes to apply so the parameter match its description.
+    """
+    changes = list()
+    existing = dict((child.getName(), child) for child in parent.getChildren())
+    added = False
+
+    for param in params:
+
+        child = existing.get(param.name)
+
+        if child is None:
+            changes.append(ParamChange("add", parent, param.name, param))
+            added = True
+            continue
+
+        if not param.isCompatible(child):
+            changes.append(ParamChange("replace", parent, param.name, param))
+            continue
+
+        # compare the parsed hints only if needed, as formatting can differ
+        hint_string = child.getHintString() or ""
+        if hint_string != param.getHintString():
+            if _parseHints(hint_string) != param.hints:
+                changes.append(ParamChange("hints", parent, param.name, param))
+
+        if isinstance(param, GroupParam):
+            changes += diffParams(child, param.children)
+
+    names = [param.name for param in params]
+    existing_names = [child.getName() for child in parent.getChildren()]
+    for name in existing_names:
+        if name not in names and name not in ignored:
+            changes.append(ParamChange("remove", parent, name))
+
+    # added parameters are created last, so they always need a reorder
+    order = names + [name for name in existing_names if name in ignored]
+    current = [name for name in existing_names if name in order]
+    if added or current != [name for name in order if name in existing]:
+        changes.append(ParamChange("reorder", parent, "", order=order))
+
+    return changes
+
+
+def applyChanges(changes):
+    # type: (Sequence[ParamChange]) -> None
+    """
+    Apply the changes computed by ``diffParams``.
+
+    Replaced array parameters keep the values of the indexes that still exist.
+    """
+    reorders = list()
+
+    for change in changes:
+
+        logger.debug("[applyChanges] {}".format(change))
+        parent = change.parent
+
+        if change.action == "add":
+            change.param.create(parent)
+
+        elif change.action == "remove":
+            parent.deleteChild(parent.getChild(change.name))
+
+        elif change.action == "replace":
+            previous = parent.getChild(change.name)
+            index = previous.getIndex()
+            values = None
+            if previous.getType() == change.param.TYPE:
+                values = [
+                    child.getValue(0) for child in previous.getChildren()
+                ]
+            parent.deleteChild(previous)
+            param = change.param.create(parent)
+            parent.reorderChild(param, index)
+            for value, child in zip(values or (), param.getChildren()):
+                child.setValue(value, 0)
+
+        elif change.action == "hints":
+            parent.getChild(change.name).setHintString(change.param.getHintString())
+
+        elif change.action == "reorder":
+            # applied last, once all the children exist
+            reorders.append(change)
+
+    for change in reorders:
+        index = 0
+        for name in change.order:
+            child = change.parent.getChild(name)
+            if child is None:
+                continue
+            change.parent.reorderChild(child, index)
+            index += 1
+
+    return
+
+
+def syncParams(parent, params, ignored=()):
+    # type: (Any, Sequence[Param], Sequence[str]) -> List[ParamChange]
+    """
+    Edit the children of the given parameter so they match their description, only
+    applying what changed.
+
+    Returns:
+        the changes applied.
+    """
+    changes = diffParams(parent, params, ignored)
+    applyChanges(changes)
+    return changes
@@ -0,0 +1,259 @@
+"""
+Benchmark the lifecycle of BaseCustomNode using the in-memory Katana fake, so
+performance regressions can be caught without a Katana license.
+
+Usage::
+
+    python katananodling/tests/benchmark.py --sizes 10 100 1000 10000
+    python katananodling/tests/benchmark.py --sizes 100000 --json bench.json
+
+Each size N measure :
+
+- ``register``: ``loader.registerNodesFor`` for a library of N node types
+- ``create_bulk``: creating N nodes with ``loader.createNodes``, events included
+  (so to compare with ``create`` + ``create_events``)
+- ``create``: creating N nodes (``_createCustomNode`` + ``__build__``)
+- ``create_events``: processing the ``node_create`` events of the above
+- ``create_prototype``: creating N nodes of 10 types with ``use_prototype_cache``
+- ``load``: loading the N nodes above from their xml (no ``__build__``)
+- ``load_events``: processing the ``node_create`` events of the above
+- ``wire``: wiring N internal nodes in one node with ``wireInsertGraph``, as
+  branches of 10 nodes merged together
+- ``menu_populate``: populating the LayeredMenu with the N node types
+- ``menu_action``: creating a node from the LayeredMenu, 100 times
+- ``menu_search_index``: building the search index of the N node types
+- ``menu_search``: 100 ranked searches in the N node types, with typos
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import types
+
+THISDIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, THISDIR)
+sys.path.insert(0, os.path.dirname(os.path.dirname(THISDIR)))
+
+from fakes import resetSession
+from Katana import LayeredMenuAPI
+from Katana import NodegraphAPI
+from Katana import Utils
+
+from katananodling import loader
+from katananodling import menu
+from katananodling import profiling
+from katananodling import wiring
+from katananodling.entities import BaseCustomNode
+from katananodling.entities import OpScriptCustomNode
+
+logger = logging.getLogger(__name__)
+
+LIBRARY_NAME = "benchlibrary"
+
+
+class _BenchNode(BaseCustomNode):
+    def _build(self):
+        prunenode = NodegraphAPI.CreateNode("Prune", self)
+        prunenode.getParameter("cel").setExpression("=^/user.CEL")
+        self.wireInsertNodes([prunenode])
+
+        p = self.user_param.createChildString("CEL", "")
+        p.setHintString(repr({"widget": "cel"}))
+        self.moveAboutParamToBottom()
+
+
+class _BenchOpScriptNode(OpScriptCustomNode):
+    def _build(self):
+        opscriptnode = self.getDefaultOpScriptNode()
+        opscriptnode.getParameter("CEL").setExpression("=^/user.CEL", True)
+        opscriptnode.getParameter("script.lua").setValue("", 0)
+
+        p = self.user_param.createChildString("CEL", "")
+        p.setHintString(repr({"widget": "cel"}))
+        self.moveAboutParamToBottom()
+
+
+def createLibrary(size):
+    # type: (int) -> types.ModuleType
+    """
+    Create an importable library package with the given number of node types.
+    """
+    library = types.ModuleType(LIBRARY_NAME)
+    library.__file__ = os.path.abspath(__file__)
+    library.__path__ = [THISDIR]
+
+    for index in range(size):
+        base = _BenchOpScriptNode if index % 2 else _BenchNode
+        class_name = "Bench{}Node".format(index)
+        node_class = type(
+            class_name,
+            (base,),
+            {
+                "name": "Bench{}".format(index),
+                "version": (0, 1, 0),
+                "color": BaseCustomNode.Colors.blue,
+                "description": "benchmark node {}".format(index),
+                "author": "bench",
+                "__module__": LIBRARY_NAME,
+            },
+        )
+        setattr(library, class_name, node_class)
+
+    sys.modules[LIBRARY_NAME] = library
+    return library
+
+
+def resetBenchmark():
+    resetSession()
+    sys.modules.pop(LIBRARY_NAME, None)
+
+
+def benchmark(size):
+    # type: (int) -> dict
+    """
+    Returns:
+        seconds spent in each step for the given number of nodes.
+    """
+    timings = dict()
+    timer = profiling.timer
+
+    resetBenchmark()
+    createLibrary(size)
+
+    start = timer()
+    loader.registerNodesFor([LIBRARY_NAME])
+    timings["register"] = timer() - start
+
+    loader.registerCallbacks()
+    node_types = sorted(loader.REGISTERED.keys())
+    root = NodegraphAPI.GetRootNode()
+
+    # first, so nodes are created in an empty scene like for "create"
+    start = timer()
+    loader.createNodes([node_types[index % len(node_types)] for index in range(size)])
+    Utils.EventModule.ProcessAllEvents()
+    timings["create_bulk"] = timer() - start
+    with loader.suspendCallbacks():
+        for node in root.getChildren():
+            node.delete()
+
+    start = timer()
+    for index in range(size):
+        NodegraphAPI.CreateNode(node_types[index % len(node_types)], root)
+    timings["create"] = timer() - start
+
+    start = timer()
+    Utils.EventModule.ProcessAllEvents()
+    timings["create_events"] = timer() - start
+
+    existing = root.getChildren()
+
+    _BenchNode.use_prototype_cache = _BenchOpScriptNode.use_prototype_cache = True
+    start = timer()
+    for index in range(size):
+        NodegraphAPI.CreateNode(node_types[index % min(10, len(node_types))], root)
+    timings["create_prototype"] = timer() - start
+    _BenchNode.use_prototype_cache = _BenchOpScriptNode.use_prototype_cache = False
+    with loader.suspendCallbacks():
+        for node in root.getChildren():
+            if node not in existing:
+                node.delete()
+
+    scene = NodegraphAPI.BuildNodesXmlIO(root.getChildren())
+    for node in root.getChildren():
+        node.delete()
+
+    NodegraphAPI._setLoading(True)
+    start = timer()
+    NodegraphAPI.LoadElementsFromXmlIO(scene, root)
+    timings["load"] = timer() - start
+    NodegraphAPI._setLoading(False)
+
+    start = timer()
+    Utils.EventModule.ProcessAllEvents()
+    timings["load_events"] = timer() - start
+
+    node = NodegraphAPI.CreateNode(node_types[0], root)
+    graph = wiring.NodeGraph()
+    branches = dict()
+    for index in range(size):
+        upstream = branches.get(index // 10, wiring.INPUT)
+        prunenode = NodegraphAPI.CreateNode("Prune", node)
+        branches[index // 10] = graph.add(prunenode, [upstream])
+    merge = NodegraphAPI.CreateNode("Merge", node)
+    graph.add(merge, dict(("i{}".format(i), n) for i, n in branches.items()))
+    graph.setOutput(merge)
+    start = timer()
+    node.wireInsertGraph(graph)
+    timings["wire"] = timer() - start
+
+    layered_menu = menu.getLayeredMenuForAllCustomNodes()
+    start = timer()
+    layered_menu._show()
+    timings["menu_populate"] = timer() - start
+
+    start = timer()
+    for index in range(100):
+        layered_menu._select(node_types[(index * 7919) % len(node_types)])
+    timings["menu_action"] = timer() - start
+
+    menu_index = menu.getMenuIndex()
+    start = timer()
+    menu_index.search("bench")
+    timings["menu_search_index"] = timer() - start
+
+    start = timer()
+    for index in range(100):
+        number = (index * 7919) % len(node_types)
+        query = "bnech{}".format(number) if index % 2 else "node {}".format(number)
+        menu_index.search(query)
+    timings["menu_search"] = timer() - start
+
+    resetBenchmark()
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1000, 10000],
+        help="number of nodes to benchmark",
+    )
+    parser.add_argument("--json", help="path of a json file to write results to")
+    args = parser.parse_args(argv)
+
+    # the loader log errors for any unexpected issue
+    logging.basicConfig(level=logging.ERROR)
+
+    results = dict()
+    print("{:>8} {:>15} {:>12} {:>12}".format("N", "step", "seconds", "us/node"))
+    for size in args.sizes:
+        # like timeit, so a step doesn't pay for the objects left by the previous ones
+        gc.collect()
+        gc.disable()
+        try:
+            timings = benchmark(size)
+        finally:
+            gc.enable()
+        results[size] = timings
+        for step, seconds in timings.items():
+            count = 100 if step == "menu_action" else size
+            print(
+                "{:>8} {:>15} {:>12.4f} {:>12.2f}"
+                "".format(size, step, seconds, seconds / count * 1e6)
+            )
+
+    if args.json:
+        with open(args.json, "w") as json_file:
+            json.dump(results, json_file, indent=4, sort_keys=True)
+
+    return results
+
+
+if __name__ == "__main__":
+    main()
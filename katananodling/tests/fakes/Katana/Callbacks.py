@@ -0,0 +1,31 @@
+"""
+Fake of Katana's ``Callbacks`` module.
+"""
+
+
+class Type:
+    onStartupComplete = "onStartupComplete"
+    onSceneLoad = "onSceneLoad"
+
+
+_CALLBACKS = dict()
+
+
+def addCallback(callbackType, callbackFcn):
+    _CALLBACKS.setdefault(callbackType, list()).append(callbackFcn)
+
+
+def delCallback(callbackType, callbackFcn):
+    _CALLBACKS.get(callbackType, list()).remove(callbackFcn)
+
+
+def _trigger(callbackType, **kwargs):
+    """
+    Call all the callbacks registered for the given type.
+    """
+    for callback in list(_CALLBACKS.get(callbackType, list())):
+        callback(objectHash=None, **kwargs)
+
+
+def _reset():
+    _CALLBACKS.clear()
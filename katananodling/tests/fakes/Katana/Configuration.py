@@ -0,0 +1,18 @@
+"""
+Fake of Katana's ``Configuration`` module.
+"""
+
+_VALUES = {"KATANA_UI_MODE": "1"}
+
+
+def get(key, default=None):
+    return _VALUES.get(key, default)
+
+
+def set(key, value):
+    _VALUES[key] = value
+
+
+def _reset():
+    _VALUES.clear()
+    _VALUES["KATANA_UI_MODE"] = "1"
@@ -0,0 +1,11 @@
+"""
+Fake of Katana's ``DrawingModule`` module.
+"""
+
+
+def SetCustomNodeColor(node, r, g, b):
+    node._color = (r, g, b)
+
+
+def GetCustomNodeColor(node):
+    return getattr(node, "_color", None)
@@ -0,0 +1,59 @@
+"""
+Fake of Katana's ``KatanaFile`` module. Scenes are saved as the xml produced by the
+fake ``NodegraphAPI.BuildNodesXmlIO``.
+"""
+import gzip
+
+from . import NodegraphAPI
+from . import PyXmlIO
+from . import Utils
+
+_CURRENT = [None]
+
+
+def New():
+    for node in NodegraphAPI.GetRootNode().getChildren():
+        node.delete()
+    _CURRENT[0] = None
+
+
+def Save(filepath, extraOptionsDict=None):
+    root = NodegraphAPI.GetRootNode()
+    element = NodegraphAPI.BuildNodesXmlIO(root.getChildren())
+    text = element.writeString()
+    opener = gzip.open if filepath.endswith(".gz") else open
+    with opener(filepath, "wt") as scene_file:
+        scene_file.write(text)
+    _CURRENT[0] = filepath
+    return True
+
+
+def Load(filepath, isCrashFile=False):
+    """
+    Load the scene. Like Katana, ``node_create`` events are processed before the
+    end of the loading.
+    """
+    with open(filepath, "rb") as scene_file:
+        is_gzip = scene_file.read(2) == b"\x1f\x8b"
+    opener = gzip.open if is_gzip else open
+    with opener(filepath, "rt") as scene_file:
+        element = PyXmlIO.Parse(scene_file.read())
+
+    New()
+    NodegraphAPI._setLoading(True)
+    try:
+        NodegraphAPI.LoadElementsFromXmlIO(element, NodegraphAPI.GetRootNode())
+        Utils.EventModule.ProcessAllEvents()
+    finally:
+        NodegraphAPI._setLoading(False)
+    Utils.EventModule.ProcessAllEvents()
+    _CURRENT[0] = filepath
+    return True
+
+
+def Paste(element, parentNode):
+    return NodegraphAPI.LoadElementsFromXmlIO(element, parentNode)
+
+
+def GetFilePath():
+    return _CURRENT[0]
@@ -0,0 +1,107 @@
+"""
+Fake of Katana's ``LayeredMenuAPI`` module.
+"""
+
+_REGISTERED = dict()
+
+
+class LayeredMenuEntry(object):
+    def __init__(self, value, text=None, color=None, size=None):
+        self._value = value
+        self._text = text if text is not None else str(value)
+        self._color = color
+        self._size = size
+
+    def getValue(self):
+        return self._value
+
+    def getText(self):
+        return self._text
+
+    def getColor(self):
+        return self._color
+
+
+class LayeredMenu(object):
+    def __init__(
+        self,
+        populateCallback,
+        actionCallback,
+        keyboardShortcut=None,
+        alwaysPopulate=False,
+        onlyMatchWordStart=True,
+        sortAlphabetically=True,
+        checkAvailabilityCallback=None,
+    ):
+        self._populateCallback = populateCallback
+        self._actionCallback = actionCallback
+        self._keyboardShortcut = keyboardShortcut
+        self._alwaysPopulate = alwaysPopulate
+        self._onlyMatchWordStart = onlyMatchWordStart
+        self._sortAlphabetically = sortAlphabetically
+        self._checkAvailabilityCallback = checkAvailabilityCallback
+        self._entries = list()
+        self._populated = False
+
+    def addEntry(self, value, text=None, color=None, size=None):
+        self._entries.append(LayeredMenuEntry(value, text, color, size))
+
+    def clear(self):
+        self._entries = list()
+
+    def getEntries(self):
+        return list(self._entries)
+
+    def getKeyboardShortcut(self):
+        return self._keyboardShortcut
+
+    def onlyMatchWordStart(self):
+        return self._onlyMatchWordStart
+
+    def sortAlphabetically(self):
+        return self._sortAlphabetically
+
+    def _show(self):
+        """
+        Simulate the user pressing the menu shortcut.
+        """
+        if self._populated and not self._alwaysPopulate:
+            return
+        self.clear()
+        self._populateCallback(self)
+        self._populated = True
+
+    def _filter(self, text):
+        """
+        Simulate the user typing text in the menu.
+
+        Returns:
+            values of the entries displayed.
+        """
+        text = text.lower()
+        out = list()
+        for entry in self._entries:
+            entry_text = entry.getText().lower()
+            if self._onlyMatchWordStart:
+                match = entry_text.startswith(text)
+            else:
+                match = text in entry_text
+            if match:
+                out.append(entry.getValue())
+        if self._sortAlphabetically:
+            out.sort()
+        return out
+
+    def _select(self, value):
+        """
+        Simulate the user selecting an entry.
+        """
+        return self._actionCallback(value)
+
+
+def RegisterLayeredMenu(layeredMenu, name):
+    _REGISTERED[name] = layeredMenu
+
+
+def _reset():
+    _REGISTERED.clear()
@@ -0,0 +1,831 @@
+"""
+Fake of Katana's ``NodegraphAPI`` module.
+"""
+import re
+
+from . import PyXmlIO
+from . import Utils
+
+
+class Port(object):
+    TYPE_PRODUCER = "out"
+    TYPE_CONSUMER = "in"
+
+    def __init__(self, node, name, port_type):
+        self._node = node
+        self._name = name
+        self._type = port_type
+        self._connected = list()
+
+    def __repr__(self):
+        return "<Port {}.{} ({})>".format(self._node.getName(), self._name, self._type)
+
+    def getName(self):
+        return self._name
+
+    def getNode(self):
+        return self._node
+
+    def getType(self):
+        return self._type
+
+    def getIndex(self):
+        if self._type == self.TYPE_CONSUMER:
+            return self._node._inputs.index(self)
+        return self._node._outputs.index(self)
+
+    def connect(self, other, doCleanup=True):
+        if other is self or other in self._connected:
+            return False
+        # a consumer port only accept one connection
+        for port in (self, other):
+            if port._type == self.TYPE_CONSUMER and port._connected:
+                port.disconnect(port._connected[0])
+        self._connected.append(other)
+        other._connected.append(self)
+        Utils.UndoStack._capture("connect")
+        return True
+
+    def disconnect(self, other):
+        if other not in self._connected:
+            return False
+        self._connected.remove(other)
+        other._connected.remove(self)
+        Utils.UndoStack._capture("disconnect")
+        return True
+
+    def getConnectedPort(self, index):
+        if index >= len(self._connected):
+            return None
+        return self._connected[index]
+
+    def getConnectedPorts(self):
+        return list(self._connected)
+
+    def getNumConnectedPorts(self):
+        return len(self._connected)
+
+    def isConnected(self, other):
+        return other in self._connected
+
+    def _disconnectAll(self):
+        for other in list(self._connected):
+            self.disconnect(other)
+
+
+class Parameter(object):
+    def __init__(self, node, name, param_type, parent=None, value=None):
+        self._node = node
+        self._name = name
+        self._type = param_type
+        self._parent = parent
+        self._value = value
+        self._expression = None
+        self._hints = ""
+        self._children = list()
+        self._children_by_name = dict()
+
+    def __repr__(self):
+        return "<Parameter {} ({})>".format(self.getFullName(), self._type)
+
+    def getName(self):
+        return self._name
+
+    def getType(self):
+        return self._type
+
+    def getNode(self):
+        return self._node
+
+    def getParent(self):
+        return self._parent
+
+    def getFullName(self, includeNodeName=True):
+        names = list()
+        param = self
+        while param._parent is not None:
+            names.append(param._name)
+            param = param._parent
+        if includeNodeName:
+            names.append(self._node.getName())
+        return ".".join(reversed(names))
+
+    # children
+
+    def getChildren(self):
+        return list(self._children)
+
+    def getNumChildren(self):
+        return len(self._children)
+
+    def getChild(self, name):
+        return self._children_by_name.get(name)
+
+    def getChildByIndex(self, index):
+        return self._children[index]
+
+    def getIndex(self):
+        return self._parent._children.index(self) if self._parent else 0
+
+    def _createChild(self, name, param_type, value=None):
+        if self._type not in ("group", "stringArray", "numberArray"):
+            raise TypeError("Cannot create child on {} parameter".format(self._type))
+        unique = name
+        index = 1
+        while unique in self._children_by_name:
+            unique = "{}{}".format(name, index)
+            index += 1
+        child = Parameter(self._node, unique, param_type, self, value)
+        self._children.append(child)
+        self._children_by_name[unique] = child
+        Utils.UndoStack._capture("createParameter")
+        return child
+
+    def createChildGroup(self, name, index=-1):
+        child = self._createChild(name, "group")
+        if index >= 0:
+            self.reorderChild(child, index)
+        return child
+
+    def createChildString(self, name, value, index=-1):
+        child = self._createChild(name, "string", str(value))
+        if index >= 0:
+            self.reorderChild(child, index)
+        return child
+
+    def createChildNumber(self, name, value, index=-1):
+        child = self._createChild(name, "number", float(value))
+        if index >= 0:
+            self.reorderChild(child, index)
+        return child
+
+    def createChildStringArray(self, name, size, index=-1):
+        child = self._createChild(name, "stringArray")
+        for item in range(size):
+            child._createChild("i{}".format(item), "string", "")
+        if index >= 0:
+            self.reorderChild(child, index)
+        return child
+
+    def createChildNumberArray(self, name, size, index=-1):
+        child = self._createChild(name, "numberArray")
+        for item in range(size):
+            child._createChild("i{}".format(item), "number", 0.0)
+        if index >= 0:
+            self.reorderChild(child, index)
+        return child
+
+    def deleteChild(self, child):
+        self._children.remove(child)
+        del self._children_by_name[child._name]
+        child._parent = None
+        Utils.UndoStack._capture("deleteParameter")
+
+    def reorderChild(self, child, index):
+        self._children.remove(child)
+        self._children.insert(index, child)
+
+    # values
+
+    def getValue(self, time):
+        if self._type in ("group", "stringArray", "numberArray"):
+            raise TypeError("{} parameter has no value".format(self._type))
+        return self._value
+
+    def setValue(self, value, time, final=True):
+        if self._type == "number":
+            value = float(value)
+        elif self._type == "string":
+            value = str(value)
+        else:
+            raise TypeError("Cannot set value on {} parameter".format(self._type))
+        self._value = value
+        Utils.UndoStack._capture("setValue")
+
+    def setExpression(self, expression, enable=True):
+        self._expression = expression if enable else None
+        Utils.UndoStack._capture("setExpression")
+
+    def getExpression(self):
+        return self._expression
+
+    def isExpression(self):
+        return self._expression is not None
+
+    def setExpressionFlag(self, enable):
+        if not enable:
+            self._expression = None
+
+    def getHintString(self):
+        return self._hints
+
+    def setHintString(self, hints):
+        self._hints = hints
+
+
+class Node(object):
+    """
+    Base class of all nodes, instances are created using ``CreateNode``.
+    """
+
+    # ports created for builtin node types, (inputs, outputs)
+    _DEFAULT_PORTS = ((), ())
+
+    def _setup(self, node_type, parent):
+        self._type = node_type
+        self._name = None
+        self._parent = None
+        self._inputs = list()
+        self._outputs = list()
+        self._attrs = dict()
+        self._position = (0.0, 0.0)
+        self._bypassed = False
+        self._deleted = False
+        self._params = Parameter(self, "", "group")
+        self.setName(node_type)
+        if parent is not None:
+            self.setParent(parent)
+        for name in self._DEFAULT_PORTS[0]:
+            self.addInputPort(name)
+        for name in self._DEFAULT_PORTS[1]:
+            self.addOutputPort(name)
+
+    def __repr__(self):
+        return "<{} {} ({})>".format(self.__class__.__name__, self._name, self._type)
+
+    # identity
+
+    def getName(self):
+        return self._name
+
+    def setName(self, name):
+        if name == self._name:
+            return name
+        _unregisterName(self)
+        self._name = _getUniqueName(name)
+        _NODES_BY_NAME[self._name] = self
+        return self._name
+
+    def getType(self):
+        return self._type
+
+    def setType(self, node_type):
+        _unregisterType(self)
+        self._type = node_type
+        _registerType(self)
+
+    def getParent(self):
+        return self._parent
+
+    def setParent(self, parent):
+        if self._parent is not None:
+            self._parent._children.remove(self)
+        self._parent = parent
+        if parent is not None:
+            parent._children.append(self)
+
+    def delete(self):
+        if self._deleted:
+            return
+        for child in getattr(self, "_children", list())[:]:
+            child.delete()
+        for port in self._inputs + self._outputs:
+            port._disconnectAll()
+        self.setParent(None)
+        _unregisterName(self)
+        _unregisterType(self)
+        self._deleted = True
+        Utils.UndoStack._capture("deleteNode")
+
+    def isBypassed(self):
+        return self._bypassed
+
+    def setBypassed(self, bypassed):
+        self._bypassed = bool(bypassed)
+
+    # parameters
+
+    def getParameters(self):
+        return self._params
+
+    def getParameter(self, path):
+        param = self._params
+        for name in path.split("."):
+            param = param.getChild(name)
+            if param is None:
+                return None
+        return param
+
+    # ports
+
+    def addInputPort(self, name):
+        port = Port(self, name, Port.TYPE_CONSUMER)
+        self._inputs.append(port)
+        return port
+
+    def addOutputPort(self, name):
+        port = Port(self, name, Port.TYPE_PRODUCER)
+        self._outputs.append(port)
+        return port
+
+    def getInputPorts(self):
+        return list(self._inputs)
+
+    def getOutputPorts(self):
+        return list(self._outputs)
+
+    def getNumInputPorts(self):
+        return len(self._inputs)
+
+    def getNumOutputPorts(self):
+        return len(self._outputs)
+
+    def getInputPort(self, name):
+        for port in self._inputs:
+            if port.getName() == name:
+                return port
+        return None
+
+    def getOutputPort(self, name):
+        for port in self._outputs:
+            if port.getName() == name:
+                return port
+        return None
+
+    def getInputPortByIndex(self, index):
+        return self._inputs[index] if index < len(self._inputs) else None
+
+    def getOutputPortByIndex(self, index):
+        return self._outputs[index] if index < len(self._outputs) else None
+
+
+class GroupNode(Node):
+    def _setup(self, node_type, parent):
+        self._children = list()
+        self._send_ports = dict()
+        self._return_ports = dict()
+        super(GroupNode, self)._setup(node_type, parent)
+
+    def getChildren(self):
+        return list(self._children)
+
+    def getNumChildren(self):
+        return len(self._children)
+
+    def getChildByIndex(self, index):
+        return self._children[index]
+
+    def addInputPort(self, name):
+        port = super(GroupNode, self).addInputPort(name)
+        self._send_ports[name] = Port(self, name, Port.TYPE_PRODUCER)
+        return port
+
+    def addOutputPort(self, name):
+        port = super(GroupNode, self).addOutputPort(name)
+        self._return_ports[name] = Port(self, name, Port.TYPE_CONSUMER)
+        return port
+
+    def getSendPort(self, name):
+        return self._send_ports.get(name)
+
+    def getReturnPort(self, name):
+        return self._return_ports.get(name)
+
+
+class PythonGroupNode(GroupNode):
+    """
+    Base class for group node types registered with ``RegisterPythonGroupType``.
+    """
+
+    pass
+
+
+class _DotNode(Node):
+    _DEFAULT_PORTS = (("input",), ("output",))
+
+
+class _OpScriptNode(Node):
+    _DEFAULT_PORTS = (("i0",), ("out",))
+
+    def _setup(self, node_type, parent):
+        super(_OpScriptNode, self)._setup(node_type, parent)
+        params = self.getParameters()
+        params.createChildString("CEL", "")
+        params.createChildString("location", "/root/world/geo/opscript")
+        params.createChildString("applyWhere", "at all locations")
+        params.createChildString("applyWhen", "during op resolve")
+        script = params.createChildGroup("script")
+        script.createChildString("lua", "")
+        params.createChildString("executionMode", "immediate")
+
+
+class _PruneNode(Node):
+    _DEFAULT_PORTS = (("A",), ("out",))
+
+    def _setup(self, node_type, parent):
+        super(_PruneNode, self)._setup(node_type, parent)
+        self.getParameters().createChildString("cel", "")
+
+
+class _MergeNode(Node):
+    _DEFAULT_PORTS = (("i0", "i1"), ("out",))
+
+
+_BUILTIN_TYPES = {
+    "Group": GroupNode,
+    "Dot": _DotNode,
+    "OpScript": _OpScriptNode,
+    "Prune": _PruneNode,
+    "Merge": _MergeNode,
+}
+
+_PYTHON_GROUP_TYPES = dict()
+_NODE_FACTORIES = dict()
+_FLAVORS = dict()
+_NODES_BY_NAME = dict()
+_NODES_BY_TYPE = dict()
+_NAME_COUNTERS = dict()
+_ROOT = None
+_LOADING = [False]
+_EVENT_ID = [0]
+
+
+class NodegraphGlobals(object):
+    @staticmethod
+    def IsLoading():
+        return _LOADING[0]
+
+
+def _setLoading(loading):
+    """
+    Simulate Katana loading a scene, the load events are queued like Katana does.
+    """
+    loading = bool(loading)
+    if loading == _LOADING[0]:
+        return
+    _LOADING[0] = loading
+    event = "nodegraph_loadBegin" if loading else "nodegraph_loadEnd"
+    Utils.EventModule.QueueEvent(event, _nextEventID())
+
+
+def _nextEventID():
+    _EVENT_ID[0] += 1
+    return _EVENT_ID[0]
+
+
+_NAME_REGEX = re.compile(r"^(.*?)(\d*)$")
+
+
+def _getUniqueName(name):
+    if name not in _NODES_BY_NAME:
+        return name
+    prefix, digits = _NAME_REGEX.match(name).groups()
+    width = len(digits)
+    index = max(_NAME_COUNTERS.get(prefix, 0), int(digits or 0)) + 1
+    while True:
+        candidate = "{}{}".format(prefix, str(index).zfill(width))
+        if candidate not in _NODES_BY_NAME:
+            _NAME_COUNTERS[prefix] = index
+            return candidate
+        index += 1
+
+
+def _unregisterName(node):
+    if _NODES_BY_NAME.get(node._name) is node:
+        del _NODES_BY_NAME[node._name]
+
+
+def _registerType(node):
+    _NODES_BY_TYPE.setdefault(node._type, dict())[id(node)] = node
+
+
+def _unregisterType(node):
+    _NODES_BY_TYPE.get(node._type, dict()).pop(id(node), None)
+
+
+def _instantiate(node_class, node_type, parent):
+    node = node_class.__new__(node_class)
+    node._setup(node_type, parent)
+    _registerType(node)
+    return node
+
+
+def _reset():
+    global _ROOT
+    _PYTHON_GROUP_TYPES.clear()
+    _NODE_FACTORIES.clear()
+    _FLAVORS.clear()
+    _NODES_BY_NAME.clear()
+    _NODES_BY_TYPE.clear()
+    _NAME_COUNTERS.clear()
+    _LOADING[0] = False
+    _ROOT = None
+    _ROOT = _instantiate(GroupNode, "Group", None)
+    _ROOT.setName("rootNode")
+
+
+# registering
+
+
+def RegisterPythonGroupType(nodeType, nodeClass):
+    _PYTHON_GROUP_TYPES[nodeType] = nodeClass
+
+
+def RegisterPythonNodeFactory(nodeType, factory):
+    _NODE_FACTORIES[nodeType] = factory
+
+
+def AddNodeFlavor(nodeType, flavor):
+    _FLAVORS.setdefault(flavor, list())
+    if nodeType not in _FLAVORS[flavor]:
+        _FLAVORS[flavor].append(nodeType)
+
+
+def GetFlavorNodes(flavor, filterExists=True):
+    node_types = _FLAVORS.get(flavor, list())
+    if filterExists:
+        return [
+            node_type
+            for node_type in node_types
+            if node_type in _NODE_FACTORIES
+            or node_type in _PYTHON_GROUP_TYPES
+            or node_type in _BUILTIN_TYPES
+        ]
+    return list(node_types)
+
+
+def GetNodeFlavors(nodeType):
+    return [flavor for flavor, types in _FLAVORS.items() if nodeType in types]
+
+
+def NodeMatchesFlavors(nodeType, includedFlavors, excludedFlavors=None):
+    flavors = set(GetNodeFlavors(nodeType))
+    if excludedFlavors and flavors.intersection(excludedFlavors):
+        return False
+    return bool(flavors.intersection(includedFlavors))
+
+
+# nodes
+
+
+def GetRootNode():
+    return _ROOT
+
+
+def GetNode(name):
+    return _NODES_BY_NAME.get(name)
+
+
+def GetAllNodes(includeDeleted=False, sortByName=False):
+    nodes = list(_NODES_BY_NAME.values())
+    if sortByName:
+        nodes.sort(key=lambda node: node.getName())
+    return nodes
+
+
+def GetAllNodesByType(nodeType, includeDeleted=False, sortByName=False):
+    nodes = list(_NODES_BY_TYPE.get(nodeType, dict()).values())
+    if sortByName:
+        nodes.sort(key=lambda node: node.getName())
+    return nodes
+
+
+def CreateNode(nodeType, parent=None):
+    """
+    Create a node of the given type, ``parent`` default to the root node.
+
+    Node types registered with ``RegisterPythonNodeFactory`` are created by calling
+    their factory. A ``node_create`` event is queued for every node created.
+    """
+    parent = parent if parent is not None else _ROOT
+
+    if nodeType in _NODE_FACTORIES:
+        node = _NODE_FACTORIES[nodeType](nodeType)
+        if node is None:
+            return None
+        if node.getParent() is not parent:
+            node.setParent(parent)
+
+    elif nodeType in _PYTHON_GROUP_TYPES:
+        node_class = _PYTHON_GROUP_TYPES[nodeType]
+        node = _instantiate(node_class, nodeType, parent)
+        node.__init__()
+
+    else:
+        node_class = _BUILTIN_TYPES.get(nodeType, Node)
+        node = _instantiate(node_class, nodeType, parent)
+
+    Utils.UndoStack._capture("createNode")
+    Utils.EventModule.QueueEvent(
+        "node_create",
+        _nextEventID(),
+        node=node,
+        nodeType=node.getType(),
+        nodeName=node.getName(),
+    )
+    return node
+
+
+# serialization
+
+_PARAM_TAGS = {
+    "group": "group_parameter",
+    "string": "string_parameter",
+    "number": "number_parameter",
+    "stringArray": "stringarray_parameter",
+    "numberArray": "numberarray_parameter",
+}
+_PARAM_TYPES = dict((tag, param_type) for param_type, tag in _PARAM_TAGS.items())
+
+
+def _buildParameterXml(param, name=None):
+    element = PyXmlIO.Element(_PARAM_TAGS[param.getType()])
+    element.setAttr("name", name or param.getName())
+    if param.getHintString():
+        element.setAttr("hints", param.getHintString())
+    if param.getType() in ("string", "number"):
+        element.setAttr("value", param.getValue(0))
+    if param.isExpression():
+        element.setAttr("expression", param.getExpression())
+    for child in param.getChildren():
+        element.addChild(_buildParameterXml(child))
+    return element
+
+
+def _parseParameterXml(param, element):
+    if element.hasAttr("hints"):
+        param.setHintString(element.getAttr("hints"))
+    if element.hasAttr("value"):
+        param._value = element.getAttr("value")
+        if param.getType() == "number":
+            param._value = float(param._value)
+    if element.hasAttr("expression"):
+        param._expression = element.getAttr("expression")
+
+    for child_element in element.getChildren():
+        name = child_element.getAttr("name")
+        child = param.getChild(name)
+        if child is None:
+            param_type = _PARAM_TYPES[child_element.getTag()]
+            child = param._createChild(name, param_type)
+        _parseParameterXml(child, child_element)
+
+
+def _buildNodeXml(node):
+    element = PyXmlIO.Element("node")
+    element.setAttr("name", node.getName())
+    element.setAttr("type", node.getType())
+    element.setAttr("baseType", "Group" if isinstance(node, GroupNode) else "Node")
+    element.setAttr("x", node._position[0])
+    element.setAttr("y", node._position[1])
+    if node.isBypassed():
+        element.setAttr("bypassed", "true")
+    for name, value in sorted(node._attrs.items()):
+        element.setAttr("ns_{}".format(name), value)
+
+    for port in node.getInputPorts():
+        port_element = element.addChild(PyXmlIO.Element("port"))
+        port_element.setAttr("name", port.getName())
+        port_element.setAttr("type", "in")
+        source = port.getConnectedPort(0)
+        if source is not None:
+            port_element.setAttr(
+                "source", "{}.{}".format(source.getNode().getName(), source.getName())
+            )
+
+    for port in node.getOutputPorts():
+        port_element = element.addChild(PyXmlIO.Element("port"))
+        port_element.setAttr("name", port.getName())
+        port_element.setAttr("type", "out")
+        if isinstance(node, GroupNode):
+            source = node.getReturnPort(port.getName()).getConnectedPort(0)
+            if source is not None:
+                port_element.setAttr(
+                    "returnSource",
+                    "{}.{}".format(source.getNode().getName(), source.getName()),
+                )
+
+    element.addChild(_buildParameterXml(node.getParameters(), node.getName()))
+
+    for child in getattr(node, "_children", list()):
+        element.addChild(_buildNodeXml(child))
+
+    return element
+
+
+def BuildNodesXmlIO(nodes, forcePersistant=False):
+    element = PyXmlIO.Element("katana")
+    element.setAttr("release", "fake")
+    nodes_element = element.addChild(PyXmlIO.Element("nodes"))
+    for node in nodes:
+        nodes_element.addChild(_buildNodeXml(node))
+    return element
+
+
+def _loadNodeXml(element, parent, created):
+    node = CreateNode(element.getAttr("type"), parent)
+    if node is None:
+        return None
+    created[element.getAttr("name")] = node
+    node.setName(element.getAttr("name"))
+    node._position = (float(element.getAttr("x")), float(element.getAttr("y")))
+    node._bypassed = element.getAttr("bypassed") == "true"
+    for name in element.getAttrNames():
+        if name.startswith("ns_"):
+            node._attrs[name[3:]] = element.getAttr(name)
+
+    for child in element.getChildren():
+        if child.getTag() == "port":
+            name = child.getAttr("name")
+            if child.getAttr("type") == "in" and not node.getInputPort(name):
+                node.addInputPort(name)
+            elif child.getAttr("type") == "out" and not node.getOutputPort(name):
+                node.addOutputPort(name)
+        elif child.getTag() == "group_parameter":
+            _parseParameterXml(node.getParameters(), child)
+        elif child.getTag() == "node":
+            _loadNodeXml(child, node, created)
+
+    return node
+
+
+def _connectNodeXml(element, created):
+    node = created.get(element.getAttr("name"))
+    if node is None:
+        return
+
+    def findSource(source, consumer_parent):
+        node_name, port_name = source.rsplit(".", 1)
+        source_node = created.get(node_name) or GetNode(node_name)
+        if source_node is None:
+            return None
+        if source_node is consumer_parent:
+            return source_node.getSendPort(port_name)
+        return source_node.getOutputPort(port_name)
+
+    for child in element.getChildren():
+        if child.getTag() == "node":
+            _connectNodeXml(child, created)
+            continue
+        if child.getTag() != "port":
+            continue
+        if child.hasAttr("source"):
+            port = node.getInputPort(child.getAttr("name"))
+            source = findSource(child.getAttr("source"), node.getParent())
+            if source is not None:
+                port.connect(source)
+        if child.hasAttr("returnSource"):
+            port = node.getReturnPort(child.getAttr("name"))
+            source = findSource(child.getAttr("returnSource"), None)
+            if source is not None:
+                port.connect(source)
+
+
+def LoadElementsFromXmlIO(element, parentNode=None, *args, **kwargs):
+    """
+    Create the nodes serialized in the given element. Node names are kept if
+    possible. ``NodegraphGlobals.IsLoading()`` return True while it's running.
+    """
+    parentNode = parentNode if parentNode is not None else _ROOT
+    was_loading = _LOADING[0]
+    _LOADING[0] = True
+    created = dict()
+    nodes = list()
+    try:
+        node_elements = list()
+        for child in element.getChildren():
+            if child.getTag() == "nodes":
+                node_elements += child.getChildren()
+            elif child.getTag() == "node":
+                node_elements.append(child)
+        for node_element in node_elements:
+            node = _loadNodeXml(node_element, parentNode, created)
+            if node is not None:
+                nodes.append(node)
+        for node_element in node_elements:
+            _connectNodeXml(node_element, created)
+    finally:
+        _LOADING[0] = was_loading
+    return nodes
+
+
+# node attributes
+
+
+def SetNodeShapeAttr(node, attrName, value):
+    node._attrs[attrName] = value
+
+
+def GetNodeShapeAttr(node, attrName):
+    return node._attrs.get(attrName)
+
+
+def GetNodePosition(node):
+    return node._position
+
+
+def SetNodePosition(node, position):
+    node._position = (float(position[0]), float(position[1]))
+
+
+_reset()
@@ -0,0 +1,47 @@
+"""
+Fake of Katana's ``PyXmlIO`` module, backed by ``xml.etree``.
+"""
+import xml.etree.ElementTree as ElementTree
+
+
+class Element(object):
+    def __init__(self, tag, _element=None):
+        self._element = _element if _element is not None else ElementTree.Element(tag)
+
+    def __repr__(self):
+        return "<Element {}>".format(self.getTag())
+
+    def getTag(self):
+        return self._element.tag
+
+    def getAttr(self, name):
+        return self._element.get(name)
+
+    def hasAttr(self, name):
+        return name in self._element.attrib
+
+    def setAttr(self, name, value):
+        self._element.set(name, str(value))
+
+    def getAttrNames(self):
+        return list(self._element.attrib.keys())
+
+    def addChild(self, child):
+        self._element.append(child._element)
+        return child
+
+    def getChildren(self):
+        return [Element(child.tag, child) for child in self._element]
+
+    def getNumChildren(self):
+        return len(self._element)
+
+    def getChild(self, index):
+        return Element(None, self._element[index])
+
+    def writeString(self):
+        return ElementTree.tostring(self._element, encoding="unicode")
+
+
+def Parse(text):
+    return Element(None, ElementTree.fromstring(text))
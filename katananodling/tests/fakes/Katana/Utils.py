@@ -0,0 +1,109 @@
+"""
+Fake of Katana's ``Utils`` module (``EventModule`` and ``UndoStack``).
+"""
+import collections
+
+
+class _EventModule(object):
+    """
+    Events are queued and dispatched when ``ProcessAllEvents`` is called, like
+    Katana does on idle.
+    """
+
+    def __init__(self):
+        self._handlers = list()  # (handler, eventType, eventID, enabled)
+        self._queue = collections.deque()
+
+    def RegisterEventHandler(self, handler, eventType=None, eventID=None, enabled=True):
+        self._handlers.append([handler, eventType, eventID, enabled])
+
+    def UnregisterEventHandler(self, handler, eventType=None, eventID=None):
+        for index, registered in enumerate(self._handlers):
+            if registered[:3] == [handler, eventType, eventID]:
+                del self._handlers[index]
+                return
+        raise ValueError("Handler {} not registered for {}".format(handler, eventType))
+
+    def SetHandlerEnabled(self, handler, eventType=None, eventID=None, enabled=True):
+        for registered in self._handlers:
+            if registered[:3] == [handler, eventType, eventID]:
+                registered[3] = enabled
+
+    def IsHandlerRegistered(self, handler, eventType=None, eventID=None):
+        return any(
+            registered[:3] == [handler, eventType, eventID]
+            for registered in self._handlers
+        )
+
+    def QueueEvent(self, eventType, eventID, **kwargs):
+        self._queue.append((eventType, eventID, kwargs))
+
+    def ProcessEvents(self):
+        self.ProcessAllEvents()
+
+    def ProcessAllEvents(self):
+        while self._queue:
+            eventType, eventID, kwargs = self._queue.popleft()
+            self._dispatch(eventType, eventID, kwargs)
+
+    def _dispatch(self, eventType, eventID, kwargs):
+        for handler, handlerType, handlerID, enabled in list(self._handlers):
+            if not enabled:
+                continue
+            if handlerType is not None and handlerType != eventType:
+                continue
+            if handlerID is not None and handlerID != eventID:
+                continue
+            handler(eventType, eventID, **kwargs)
+
+    def _getQueueSize(self):
+        return len(self._queue)
+
+
+class _UndoStack(object):
+    def __init__(self):
+        self._disabled = 0
+        self._groups = list()
+        self._entries = list()
+
+    def DisableCapture(self):
+        self._disabled += 1
+
+    def EnableCapture(self):
+        self._disabled = max(0, self._disabled - 1)
+
+    def IsUndoEnabled(self):
+        return self._disabled == 0
+
+    def OpenGroup(self, name):
+        self._groups.append([name, 0])
+
+    def CloseGroup(self):
+        name, count = self._groups.pop()
+        if self._groups:
+            self._groups[-1][1] += count
+        elif count:
+            self._entries.append(name)
+
+    def _capture(self, name):
+        """
+        Record an undoable action, called by the fake NodegraphAPI.
+        """
+        if self._disabled:
+            return
+        if self._groups:
+            self._groups[-1][1] += 1
+            return
+        self._entries.append(name)
+
+    def _getEntries(self):
+        return list(self._entries)
+
+
+EventModule = _EventModule()
+UndoStack = _UndoStack()
+
+
+def _reset():
+    EventModule.__init__()
+    UndoStack.__init__()
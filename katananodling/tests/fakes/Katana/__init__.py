@@ -0,0 +1,33 @@
+"""
+In-memory stand-in of the subset of the Katana python API used by katananodling.
+
+Allow to run tests and benchmarks outside Katana. Add the parent ``fakes/``
+directory to the ``PYTHONPATH`` (or ``sys.path``) so ``from Katana import ...``
+resolve to this package.
+
+Behaviors are modeled on Katana's documented API, but only as far as katananodling
+needs them : expressions are stored but never evaluated, there is no scene graph, ...
+
+Functions prefixed with an underscore are specific to the fake and don't exist in
+Katana; they allow tests to control the session, like ``_resetSession()``.
+"""
+from . import Callbacks
+from . import Configuration
+from . import DrawingModule
+from . import KatanaFile
+from . import LayeredMenuAPI
+from . import NodegraphAPI
+from . import PyXmlIO
+from . import Utils
+
+
+def _resetSession():
+    """
+    Reset the whole fake Katana session to its startup state.
+    """
+    Utils._reset()
+    NodegraphAPI._reset()
+    KatanaFile._CURRENT[0] = None
+    LayeredMenuAPI._reset()
+    Callbacks._reset()
+    Configuration._reset()
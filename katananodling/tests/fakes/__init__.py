@@ -0,0 +1,118 @@
+"""
+Helpers shared by the tests and benchmarks running on the fake ``Katana`` package.
+
+Importing this package makes ``from Katana import ...`` resolve to the fake.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import textwrap
+
+THISDIR = os.path.dirname(os.path.abspath(__file__))
+if THISDIR not in sys.path:
+    sys.path.insert(0, THISDIR)
+
+import Katana
+
+from katananodling import loader
+from katananodling import migration
+from katananodling import profiling
+from katananodling import prototype
+
+
+def resetSession():
+    """
+    Reset Katana and the katananodling globals to their startup state.
+    """
+    loader.unregisterCallbacks()
+    Katana._resetSession()
+    for node_class in loader.REGISTERED.values():
+        node_class._registered = False
+    loader.REGISTERED.clear()
+    loader._SOURCE_FINGERPRINTS.clear()
+    del loader._DEFERRED_NODES[:]
+    loader._DEFER_STATE.update(depth=0, loading=False)
+    prototype.PROTOTYPES.clear()
+    prototype.PROTOTYPES.directory = None
+    profiling.NODE_TIMINGS.reset()
+    migration._STEPS_CACHE.clear()
+
+
+NODE_MODULE = """
+from katananodling import schema
+from katananodling.entities import BaseCustomNode
+
+class {name}Node(BaseCustomNode):
+    name = "{name}"
+    version = {version}
+    color = None
+    description = "{name} node"
+    author = "tests"
+
+    user_params = [{params}]
+
+    def _build(self):
+        pass
+"""
+"""
+Source of a node module written by ``DiskLibrary.writeNode``.
+"""
+
+
+class DiskLibrary(object):
+    """
+    Importable library written in a temporary directory, with the nodes ``A`` and
+    ``B`` in version 0.1.0 defined in ``a.py`` and ``b.py``, to test what happens
+    when its files are modified.
+
+    Args:
+        package: importable python name of the library
+    """
+
+    def __init__(self, package):
+        # type: (str) -> None
+        self.package = package
+        self.tmpdir = tempfile.mkdtemp()
+        self.libdir = os.path.join(self.tmpdir, package)
+        os.mkdir(self.libdir)
+        self.writeFile("__init__.py", "from .a import ANode\nfrom .b import BNode\n")
+        self.writeNode("a.py", "A", (0, 1, 0))
+        self.writeNode("b.py", "B", (0, 1, 0))
+        sys.path.insert(0, self.tmpdir)
+
+    def writeFile(self, name, content):
+        # type: (str, str) -> str
+        """
+        Returns:
+            absolute path of the file written.
+        """
+        path = os.path.join(self.libdir, name)
+        content = textwrap.dedent(content)
+        # make sure the fingerprint changes, whatever the mtime resolution
+        if os.path.exists(path) and os.path.getsize(path) == len(content):
+            content += "\n"
+        with open(path, "w") as module_file:
+            module_file.write(content)
+        return path
+
+    def writeNode(self, filename, name, version, params=""):
+        # type: (str, str, tuple, str) -> str
+        """
+        Write a module defining the node ``name``, see ``NODE_MODULE``.
+        """
+        content = NODE_MODULE.format(name=name, version=version, params=params)
+        return self.writeFile(filename, content)
+
+    def unload(self):
+        """
+        Remove the library modules from ``sys.modules``, so it's imported again.
+        """
+        for module_name in list(sys.modules):
+            if module_name.split(".")[0] == self.package:
+                del sys.modules[module_name]
+
+    def cleanup(self):
+        self.unload()
+        sys.path.remove(self.tmpdir)
+        shutil.rmtree(self.tmpdir)
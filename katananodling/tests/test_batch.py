@@ -0,0 +1,248 @@
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fakes import resetSession
+from Katana import KatanaFile
+from Katana import NodegraphAPI
+
+from katananodling import batch
+from katananodling import c
+from katananodling import loader
+from katananodling import scanner
+
+logger = logging.getLogger(__name__)
+
+
+class BatchTest(unittest.TestCase):
+    def setUp(self):
+        resetSession()
+        loader.registerNodesFor(["demolibrary"])
+        loader.registerCallbacks()
+        self.tmpdir = tempfile.mkdtemp()
+        self.progress_path = os.path.join(self.tmpdir, "progress.jsonl")
+
+        self.outdated_path = self.writeScene("outdated.katana", "0.0.1", "1.0.0")
+        self.current_path = self.writeScene("current.katana")
+        self.class_versions = batch.getClassVersions(["demolibrary"])
+
+        self.migrated = list()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+        resetSession()
+
+    def writeScene(self, filename, version=None, api_version=None):
+        path = os.path.join(self.tmpdir, filename)
+        KatanaFile.New()
+        node = NodegraphAPI.CreateNode("Demo", NodegraphAPI.GetRootNode())
+        NodegraphAPI.CreateNode("PackageDemo", NodegraphAPI.GetRootNode())
+        about = node.about
+        if version:
+            node.getParameter(about.ParamNames.getPath("version")).setValue(version, 0)
+        if api_version:
+            node.getParameter(about.ParamNames.getPath("api_version")).setValue(
+                api_version, 0
+            )
+        KatanaFile.Save(path)
+        KatanaFile.New()
+        return path
+
+    def runner(self, scene_paths):
+        # the fake Katana session, in place of a Katana process
+        self.migrated += scene_paths
+        return [batch.migrateScene(path) for path in scene_paths]
+
+    def test_getOutdatedNodes(self):
+
+        self.assertEqual(self.class_versions["Demo"], "0.1.0")
+        self.assertEqual(self.class_versions["PackageDemo"], "0.1.5")
+
+        (node,) = batch.getOutdatedNodes(self.outdated_path, self.class_versions)
+        self.assertEqual((node.type, node.version), ("Demo", "0.0.1"))
+        self.assertEqual(
+            batch.getOutdatedNodes(self.current_path, self.class_versions), []
+        )
+        self.assertEqual(batch.getOutdatedNodes(self.outdated_path, {}), [])
+
+    def test_migrateScene(self):
+
+        report = batch.migrateScene(self.outdated_path, dry_run=True)
+        self.assertEqual(report["status"], batch.Status.OUTDATED)
+        with open(self.outdated_path) as scene_file:
+            content = scene_file.read()
+        self.assertIn('value="0.0.1"', content)
+
+        report = batch.migrateScene(self.outdated_path)
+        self.assertEqual(report["status"], batch.Status.UPGRADED)
+        (node_report,) = report["nodes"]
+        self.assertEqual(node_report["node"], "Demo_0001")
+        self.assertEqual((node_report["from"], node_report["to"]), ("0.0.1", "0.1.0"))
+        self.assertEqual(node_report["errors"], [])
+        json.dumps(report)
+
+        (node,) = scanner.iterCustomNodes(self.outdated_path, ["Demo"])
+        self.assertEqual((node.version, node.api_version), ("0.1.0", c.__version__))
+        # no temporary file left
+        self.assertEqual(
+            sorted(os.listdir(self.tmpdir)), ["current.katana", "outdated.katana"]
+        )
+
+        report = batch.migrateScene(self.current_path)
+        self.assertEqual(report["status"], batch.Status.UP_TO_DATE)
+
+        missing_path = os.path.join(self.tmpdir, "missing.katana")
+        report = batch.migrateScene(missing_path)
+        self.assertEqual(report["status"], batch.Status.FAILED)
+
+    def test_upgradeError(self):
+
+        node_class = loader.REGISTERED["Demo"]
+
+        def upgrade(node):
+            raise RuntimeError("broken")
+
+        node_class.upgrade = upgrade
+        self.addCleanup(delattr, node_class, "upgrade")
+
+        mtime = os.path.getmtime(self.outdated_path)
+        report = batch.migrateScene(self.outdated_path)
+        self.assertEqual(report["status"], batch.Status.FAILED)
+        self.assertIn("broken", report["nodes"][0]["errors"][0])
+        self.assertEqual(os.path.getmtime(self.outdated_path), mtime)
+
+    def test_saveScene(self):
+
+        save = KatanaFile.Save
+        self.addCleanup(setattr, KatanaFile, "Save", save)
+
+        def saveReturningNone(path):
+            save(path)
+
+        KatanaFile.Save = saveReturningNone
+        report = batch.migrateScene(self.outdated_path)
+        self.assertEqual(report["status"], batch.Status.UPGRADED)
+
+        self.writeScene("outdated.katana", "0.0.1")
+        KatanaFile.Save = lambda path: None
+        mtime = os.path.getmtime(self.outdated_path)
+        report = batch.migrateScene(self.outdated_path)
+        self.assertEqual(report["status"], batch.Status.FAILED)
+        self.assertIn("failed to save", report["error"])
+        self.assertEqual(os.path.getmtime(self.outdated_path), mtime)
+        self.assertEqual(
+            sorted(os.listdir(self.tmpdir)), ["current.katana", "outdated.katana"]
+        )
+
+    def test_migrateScenes(self):
+
+        broken_path = os.path.join(self.tmpdir, "broken.katana")
+        with open(broken_path, "w") as scene_file:
+            scene_file.write('<katana><node name="Demo_0001" type="Demo">')
+
+        reports = batch.migrateScenes(
+            [self.tmpdir],
+            ["demolibrary"],
+            processes=1,
+            progress_path=self.progress_path,
+            runner=self.runner,
+        )
+        statuses = dict((report["path"], report["status"]) for report in reports)
+        self.assertEqual(
+            statuses,
+            {
+                broken_path: batch.Status.FAILED,
+                self.current_path: batch.Status.UP_TO_DATE,
+                self.outdated_path: batch.Status.UPGRADED,
+            },
+        )
+        # up-to-date scenes are not opened
+        self.assertEqual(self.migrated, [self.outdated_path])
+        self.assertEqual(
+            batch.getSummary(reports),
+            {
+                "failed": 1,
+                "failed_nodes": 0,
+                "up-to-date": 1,
+                "up-to-date_nodes": 0,
+                "upgraded": 1,
+                "upgraded_nodes": 1,
+            },
+        )
+
+        progress = batch.readProgress(self.progress_path)
+        self.assertEqual(sorted(progress), sorted(statuses))
+
+        # resume: only the failed scene is processed again
+        del self.migrated[:]
+        with open(self.progress_path, "a") as progress_file:
+            progress_file.write('{"path": "interrupted')
+        reports = batch.migrateScenes(
+            [self.tmpdir],
+            ["demolibrary"],
+            processes=1,
+            progress_path=self.progress_path,
+            runner=self.runner,
+        )
+        self.assertEqual(self.migrated, [])
+        self.assertEqual(reports[0]["status"], batch.Status.FAILED)
+
+        # modified scenes are processed again
+        self.writeScene("outdated.katana", "0.0.2")
+        os.utime(self.outdated_path, (0, 0))
+        reports = batch.migrateScenes(
+            [self.outdated_path],
+            ["demolibrary"],
+            processes=1,
+            progress_path=self.progress_path,
+            runner=self.runner,
+        )
+        self.assertEqual(self.migrated, [self.outdated_path])
+        self.assertEqual(reports[0]["nodes"][0]["from"], "0.0.2")
+
+    def test_workerCrash(self):
+
+        other_path = self.writeScene("other.katana", "0.0.1")
+
+        def runner(scene_paths):
+            if scene_paths == [other_path]:
+                raise OSError("katana not found")
+            return list()
+
+        reports = batch.migrateScenes(
+            [self.outdated_path, other_path],
+            ["demolibrary"],
+            processes=2,
+            chunk_size=1,
+            runner=runner,
+        )
+        self.assertEqual(
+            [report["path"] for report in reports], [self.outdated_path, other_path]
+        )
+        for report in reports:
+            self.assertEqual(report["status"], batch.Status.FAILED)
+            self.assertTrue(report["error"])
+
+    def test_runWorker(self):
+
+        report_path = os.path.join(self.tmpdir, "report.jsonl")
+        argv = ["--report", report_path, "--package", "demolibrary"]
+        exit_code = batch.runWorker(argv + [self.outdated_path, self.current_path])
+        self.assertEqual(exit_code, 0)
+
+        with open(report_path) as report_file:
+            reports = [json.loads(line) for line in report_file]
+        self.assertEqual(
+            [report["status"] for report in reports],
+            [batch.Status.UPGRADED, batch.Status.UP_TO_DATE],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
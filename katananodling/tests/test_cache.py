@@ -0,0 +1,278 @@
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fakes import NODE_MODULE
+from fakes import DiskLibrary
+from fakes import resetSession
+
+from katananodling import discovery
+from katananodling import filters
+from katananodling import loader
+from katananodling.cache import RegistryCache
+from katananodling.cache import getLibraryFiles
+from katananodling.registry import NodeEntry
+
+logger = logging.getLogger(__name__)
+
+
+class RegistryCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.libdir = os.path.join(self.tmpdir, "lib")
+        os.mkdir(self.libdir)
+        self.fileA = self._writeFile("a.py", "A = 1")
+        self.fileB = self._writeFile("b.py", "B = 1")
+        self.cache_path = os.path.join(self.tmpdir, "cache", "registry.json")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _writeFile(self, name, content):
+        path = os.path.join(self.libdir, name)
+        with open(path, "w") as file:
+            file.write(content)
+        return path
+
+    def test_invalidation(self):
+
+        entryA = NodeEntry("A", "ANode", "lib.a")
+        entryB = NodeEntry("B", "BNode", "lib.b")
+
+        files = getLibraryFiles(self.libdir)
+        self.assertEqual(sorted(files), [self.fileA, self.fileB])
+
+        cache = RegistryCache(self.cache_path)
+        entries, stale = cache.getEntries("lib", files)
+        self.assertEqual(entries, [])
+        self.assertEqual(stale, set(files))
+
+        cache.setEntries(
+            "lib",
+            files,
+            {self.fileA: [(entryA, True)], self.fileB: [(entryB, False)]},
+        )
+        cache.write()
+
+        cache = RegistryCache(self.cache_path)
+        entries, stale = cache.getEntries("lib", files)
+        self.assertEqual(stale, set())
+        entries.sort(key=lambda entry: entry[0].name)
+        self.assertEqual(entries, [(entryA, True), (entryB, False)])
+
+        self._writeFile("b.py", "B = 2 # modified")
+        fileC = self._writeFile("c.py", "C = 1")
+        files = getLibraryFiles(self.libdir)
+
+        entries, stale = cache.getEntries("lib", files)
+        self.assertEqual(entries, [(entryA, True)])
+        self.assertEqual(stale, {self.fileB, fileC})
+
+    def test_updateEntries(self):
+
+        entryA = NodeEntry("A", "ANode", "lib.a")
+        entryB = NodeEntry("B", "BNode", "lib.b")
+        entryC = NodeEntry("C", "CNode", "lib.c")
+
+        files = getLibraryFiles(self.libdir)
+        cache = RegistryCache(self.cache_path)
+        cache.setEntries(
+            "lib",
+            files,
+            {self.fileA: [(entryA, True)], self.fileB: [(entryB, True)]},
+            modules={self.fileA: {"name": "lib.a"}},
+        )
+        self.assertEqual(
+            cache.getModules("lib", [self.fileA, self.fileB]),
+            {self.fileA: {"name": "lib.a"}},
+        )
+
+        os.remove(self.fileB)
+        fileC = self._writeFile("c.py", "C = 1")
+        files = getLibraryFiles(self.libdir)
+        entries, stale = cache.getEntries("lib", files)
+        self.assertEqual(stale, {self.fileB, fileC})
+
+        cache.updateEntries("lib", files, {fileC: [(entryC, False)]})
+        cache.write()
+
+        cache = RegistryCache(self.cache_path)
+        entries, stale = cache.getEntries("lib", files)
+        self.assertEqual(stale, set())
+        entries.sort(key=lambda entry: entry[0].name)
+        self.assertEqual(entries, [(entryA, True), (entryC, False)])
+        # untouched files keep their parsed content
+        self.assertEqual(
+            cache.getModules("lib", files), {self.fileA: {"name": "lib.a"}}
+        )
+
+
+class LoaderCacheTest(unittest.TestCase):
+    """
+    Register a library written on disk with a registry cache, to check that only
+    the modified files are parsed, imported and validated again.
+    """
+
+    package = "nodlingcachelib"
+
+    def setUp(self):
+        resetSession()
+        self.library = DiskLibrary(self.package)
+        self.addCleanup(self.library.cleanup)
+        self.libdir = self.library.libdir
+        self.fileB = os.path.join(self.libdir, "b.py")
+        self.cache_path = os.path.join(self.library.tmpdir, "registry.json")
+
+        self.parsed = list()
+        parseModule = discovery.parseModule
+
+        def countingParseModule(path, module_name):
+            self.parsed.append(os.path.basename(path))
+            return parseModule(path, module_name)
+
+        discovery.parseModule = countingParseModule
+        self.addCleanup(setattr, discovery, "parseModule", parseModule)
+
+    def tearDown(self):
+        resetSession()
+
+    def getVersions(self, entries):
+        return dict((entry.name, entry.version) for entry in entries)
+
+    def test_staticEntries(self):
+
+        cache = RegistryCache(self.cache_path)
+        entries = loader._getStaticEntries(self.package, cache)
+        self.assertEqual(
+            self.getVersions(entries), {"A": (0, 1, 0), "B": (0, 1, 0)}
+        )
+        self.assertEqual(sorted(self.parsed), ["__init__.py", "a.py", "b.py"])
+        cache.write()
+
+        del self.parsed[:]
+        cache = RegistryCache(self.cache_path)
+        loader._getStaticEntries(self.package, cache)
+        self.assertEqual(self.parsed, [])
+
+        self.library.writeNode("b.py", "B", (0, 2, 0))
+        entries = loader._getStaticEntries(self.package, cache)
+        self.assertEqual(
+            self.getVersions(entries), {"A": (0, 1, 0), "B": (0, 2, 0)}
+        )
+        self.assertEqual(self.parsed, ["b.py"])
+        self.assertEqual(cache.getEntries(self.package, [self.fileB])[1], set())
+
+    def test_cachedModules(self):
+
+        cache = RegistryCache(self.cache_path)
+        loader._getStaticEntries(self.package, cache)
+        cache.write()
+
+        # as read back by a later session (unicode strings on python-2)
+        cache = RegistryCache(self.cache_path)
+        files = getLibraryFiles(self.libdir)
+        modules = [
+            discovery.ModuleInfo.fromDict(data, path)
+            for path, data in cache.getModules(self.package, files).items()
+        ]
+        self.assertEqual(len(modules), 3)
+        discovered = discovery.discoverNodesInModules(modules)
+        entries = [
+            entry for file_entries in discovered.values() for entry in file_entries
+        ]
+        self.assertEqual(
+            sorted((entry.name, valid) for entry, valid in entries),
+            [("A", True), ("B", True)],
+        )
+
+        # the unchanged files are restored from the cache and validated again
+        self.library.writeNode("b.py", "B", (0, 2, 0))
+        entries = loader._getStaticEntries(self.package, cache)
+        self.assertEqual(
+            self.getVersions(entries), {"A": (0, 1, 0), "B": (0, 2, 0)}
+        )
+        cached, stale = cache.getEntries(self.package, files)
+        self.assertEqual(stale, set())
+        self.assertTrue(all(valid for entry, valid in cached))
+
+    def test_cachedPackage(self):
+
+        node_filter = filters.NodeFilter()
+        cache = RegistryCache(self.cache_path)
+        loader._registerPackage(self.package, False, node_filter, cache)
+        self.assertEqual(sorted(loader.REGISTERED.keys()), ["A", "B"])
+        cache.write()
+
+        resetSession()
+        self.library.unload()
+        cache = RegistryCache(self.cache_path)
+        self.library.writeNode("b.py", "B", (0, 2, 0))
+        self.assertTrue(loader._registerCachedPackage(self.package, node_filter, cache))
+
+        # A is registered from the cache, only B is discovered and validated again
+        self.assertFalse(loader.REGISTERED.isResolved("A"))
+        self.assertTrue(loader.REGISTERED.isResolved("B"))
+        self.assertEqual(loader.REGISTERED["B"].version, (0, 2, 0))
+        self.assertEqual(loader.REGISTERED["A"].version, (0, 1, 0))
+
+        files = getLibraryFiles(self.libdir)
+        entries, stale = cache.getEntries(self.package, files)
+        self.assertEqual(stale, set())
+        versions = self.getVersions(entry for entry, valid in entries)
+        self.assertEqual(versions["B"], (0, 2, 0))
+
+        # the nodes exported might have changed
+        resetSession()
+        self.library.unload()
+        self.library.writeFile("__init__.py", "from .a import ANode\n")
+        self.assertFalse(
+            loader._registerCachedPackage(self.package, node_filter, cache)
+        )
+
+    def test_notExported(self):
+
+        # a node of the library not imported in its __init__
+        self.library.writeNode("c.py", "C", (0, 1, 0))
+        entries = loader._getStaticEntries(self.package)
+        self.assertEqual(sorted(self.getVersions(entries)), ["A", "B"])
+
+        # same nodes as when importing the library
+        node_filter = filters.NodeFilter()
+        loader._registerPackage(self.package, True, node_filter)
+        self.assertEqual(sorted(loader.REGISTERED.keys()), ["A", "B"])
+        self.assertFalse(loader.REGISTERED.isResolved("A"))
+        resetSession()
+        loader._registerPackage(self.package, False, node_filter)
+        self.assertEqual(sorted(loader.REGISTERED.keys()), ["A", "B"])
+        self.assertTrue(loader.REGISTERED.isResolved("A"))
+
+    def test_unresolvedName(self):
+
+        self.library.writeFile(
+            "c.py",
+            NODE_MODULE.format(name="C", version=(0, 1, 0), params="").replace(
+                'name = "C"', 'name = "C".upper()'
+            ),
+        )
+        self.library.writeFile(
+            "__init__.py",
+            "from .a import ANode\nfrom .b import BNode\nfrom .c import CNode\n",
+        )
+        node_filter = filters.NodeFilter()
+        cache = RegistryCache(self.cache_path)
+        self.assertIsNone(loader._getStaticEntries(self.package, cache))
+        self.assertFalse(cache.modified)
+
+        # the library is imported instead, so C is not missing
+        loader._registerPackage(self.package, True, node_filter, cache)
+        self.assertEqual(sorted(loader.REGISTERED.keys()), ["A", "B", "C"])
+        self.assertTrue(loader.REGISTERED.isResolved("C"))
+
+
+if __name__ == "__main__":
+    unittest.main()
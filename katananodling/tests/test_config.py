@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from katananodling import c
+from katananodling import config
+
+logger = logging.getLogger(__name__)
+
+
+class ConfigTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _writeFile(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, "w") as config_file:
+            config_file.write(content)
+        return path
+
+    def test_default(self):
+
+        settings = config.loadConfig(environ={})
+        self.assertFalse(settings.lazy_loading)
+        self.assertIsNone(settings.batch_mode)
+        self.assertEqual(settings.excluded_nodes, ())
+        self.assertEqual(settings.getSource("lazy_loading"), "default")
+        self.assertEqual(settings.files, ())
+
+        with self.assertRaises(AttributeError):
+            settings.lazy_loading = True
+
+    def test_env(self):
+
+        environ = {
+            c.Env.LAZY_LOADING: "1",
+            c.Env.BATCH_MODE: "0",
+            c.Env.EXCLUDED_NODES: os.pathsep.join(["Lxm*", "", "author=*Liam*"]),
+            c.Env.PROFILE_PATH: "",
+        }
+        settings = config.loadConfig(environ=environ)
+        self.assertIs(settings.lazy_loading, True)
+        self.assertIs(settings.batch_mode, False)
+        self.assertEqual(settings.excluded_nodes, ("Lxm*", "author=*Liam*"))
+        self.assertIsNone(settings.profile_path)
+        self.assertEqual(
+            settings.getSource("lazy_loading"), "env:{}".format(c.Env.LAZY_LOADING)
+        )
+        self.assertEqual(settings.getSource("profile_path"), "default")
+
+    def test_files(self):
+
+        show_path = self._writeFile(
+            "show.json",
+            json.dumps(
+                {
+                    "lazy_loading": True,
+                    "excluded_nodes": ["module=lib.deprecated.*"],
+                    "registry_cache": "/show/registry.json",
+                    "unknown": 1,
+                    "upgrade_disable": "yes",
+                }
+            ),
+        )
+        user_path = self._writeFile(
+            "user.json", json.dumps({"registry_cache": "/user/registry.json"})
+        )
+        missing_path = os.path.join(self.tmpdir, "missing.json")
+        environ = {
+            c.Env.CONFIG: os.pathsep.join([show_path, missing_path, user_path]),
+            c.Env.EXCLUDED_NODES: "Lxm*",
+        }
+
+        settings = config.loadConfig(environ=environ)
+        self.assertEqual(settings.files, (show_path, user_path))
+        self.assertTrue(settings.lazy_loading)
+        self.assertEqual(
+            settings.getSource("lazy_loading"), "file:{}".format(show_path)
+        )
+        # later files override previous ones
+        self.assertEqual(settings.registry_cache, "/user/registry.json")
+        self.assertEqual(
+            settings.getSource("registry_cache"), "file:{}".format(user_path)
+        )
+        # environment override files
+        self.assertEqual(settings.excluded_nodes, ("Lxm*",))
+        # invalid values are ignored
+        self.assertFalse(settings.upgrade_disable)
+
+        data = settings.asdict(with_sources=True)
+        self.assertEqual(data["excluded_nodes"][0], ["Lxm*"])
+        json.dumps(data)
+
+    def test_filePaths(self):
+
+        paths = {
+            "lua_bundle": "/show/lua",
+            "profile_path": "/show/profile.json",
+            "prototype_cache": "~/prototypes",
+            "registry_cache": "$NODLING_TEST_ROOT/registry.json",
+        }
+        path = self._writeFile("show.json", json.dumps(paths))
+        # json gives back unicode strings on python-2
+        with open(path) as config_file:
+            self.assertEqual(json.load(config_file), paths)
+
+        os.environ["NODLING_TEST_ROOT"] = "/root"
+        self.addCleanup(os.environ.pop, "NODLING_TEST_ROOT")
+        settings = config.loadConfig(environ={}, paths=[path])
+        self.assertEqual(settings.lua_bundle, "/show/lua")
+        self.assertEqual(settings.profile_path, "/show/profile.json")
+        self.assertEqual(
+            settings.prototype_cache, os.path.expanduser("~/prototypes")
+        )
+        self.assertEqual(settings.registry_cache, "/root/registry.json")
+        for name in paths:
+            self.assertEqual(
+                settings.getSource(name), "file:{}".format(path), name
+            )
+
+        self.assertEqual(config._toPath(u"/show/lua", False), "/show/lua")
+        self.assertEqual(config._toPatterns(u"Demo*", False), ("Demo*",))
+        with self.assertRaises(TypeError):
+            config._toPath(["/show/lua"], False)
+
+    @unittest.skipIf(sys.version_info < (3, 11), "requires tomllib")
+    def test_toml(self):
+
+        path = self._writeFile(
+            "show.toml", 'lazy_loading = true\nincluded_nodes = ["Demo*"]\n'
+        )
+        settings = config.loadConfig(environ={}, paths=[path])
+        self.assertTrue(settings.lazy_loading)
+        self.assertEqual(settings.included_nodes, ("Demo*",))
+
+    def test_refresh(self):
+
+        self.addCleanup(config.refreshConfig)
+        settings = config.refreshConfig(environ={c.Env.UPGRADE_DISABLE: "1"})
+        self.assertIs(config.getConfig(), settings)
+        self.assertTrue(config.getConfig().upgrade_disable)
+
+        config.refreshConfig(environ={})
+        self.assertFalse(config.getConfig().upgrade_disable)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,302 @@
+import logging
+import os
+import shutil
+import tempfile
+import textwrap
+import unittest
+
+from katananodling import c
+from katananodling.discovery import discoverNodesInDirectory
+from katananodling.discovery import discoverNodesInModules
+from katananodling.discovery import parseDirectory
+from katananodling.discovery import parseModule
+
+logger = logging.getLogger(__name__)
+
+
+class DiscoveryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.libdir = os.path.join(self.tmpdir, "lib")
+        os.makedirs(os.path.join(self.libdir, "sub"))
+        self._writeFile("__init__.py", "raise RuntimeError('must not be executed')")
+        self._writeFile("sub/__init__.py", "")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _writeFile(self, name, content):
+        path = os.path.join(self.libdir, *name.split("/"))
+        with open(path, "w") as file:
+            file.write(textwrap.dedent(content))
+        return path
+
+    def _discover(self):
+        out = dict()
+        for entries in discoverNodesInDirectory(self.libdir, "lib").values():
+            for entry, valid in entries:
+                out[entry.name] = (entry, valid)
+        return out
+
+    def test_discover(self):
+
+        self._writeFile(
+            "base.py",
+            """
+            from katananodling.entities import BaseCustomNode
+
+            class StudioNode(BaseCustomNode):
+                author = "studio"
+                color = BaseCustomNode.Colors.red
+                category = "studio"
+
+            class _PrivateNode(StudioNode):
+                name = "Private"
+
+            class NotANode(object):
+                name = "NotANode"
+            """,
+        )
+        self._writeFile(
+            "sub/tools.py",
+            """
+            from katananodling import entities
+            from lib.base import StudioNode
+
+            NAME = "Dynamic"
+
+            class ToolNode(StudioNode):
+                name = "Tool"
+                version = (1, 2, 3)
+                description = "a tool"
+
+            class LuaNode(entities.OpScriptCustomNode):
+                name = "Lua"
+                version = (0, 1, 0)
+
+            class BadNode(StudioNode):
+                name = "Bad Name"
+
+            class DynamicNode(StudioNode):
+                name = NAME
+            """,
+        )
+
+        nodes = self._discover()
+        self.assertEqual(sorted(nodes.keys()), ["Bad Name", "Lua", "Tool"])
+
+        entry, valid = nodes["Tool"]
+        self.assertTrue(valid)
+        self.assertEqual(entry.module, "lib.sub.tools")
+        self.assertEqual(entry.class_name, "ToolNode")
+        self.assertEqual(entry.version, (1, 2, 3))
+        self.assertEqual(entry.author, "studio")
+        self.assertEqual(entry.color, c.COLORS.red)
+        self.assertEqual(entry.category, "studio")
+
+        entry, valid = nodes["Lua"]
+        self.assertTrue(valid)
+        self.assertIsNone(entry.color)
+        self.assertEqual(entry.category, "")
+
+        entry, valid = nodes["Bad Name"]
+        self.assertFalse(valid)
+
+    def test_sameClassNames(self):
+
+        self._writeFile(
+            "studio.py",
+            """
+            from katananodling.entities import BaseCustomNode
+
+            class Base(BaseCustomNode):
+                author = "studio"
+                version = (1, 0, 0)
+            """,
+        )
+        self._writeFile(
+            "sub/show.py",
+            """
+            from katananodling import entities
+
+            class Base(entities.BaseCustomNode):
+                author = "show"
+                category = "show"
+            """,
+        )
+        # re-exported by the package
+        self._writeFile("sub/__init__.py", "from .show import Base as ShowBase")
+        self._writeFile(
+            "tools.py",
+            """
+            import lib.studio as studio
+            from .sub import ShowBase
+            from lib.sub import show
+
+            class Base(object):
+                name = "NotANode"
+
+            class StudioTool(studio.Base):
+                name = "StudioTool"
+
+            class ShowTool(ShowBase):
+                name = "ShowTool"
+
+            class OtherShowTool(show.Base):
+                name = "OtherShowTool"
+
+            class NotATool(Base):
+                name = "NotATool"
+            """,
+        )
+
+        nodes = self._discover()
+        self.assertEqual(
+            sorted(nodes.keys()), ["OtherShowTool", "ShowTool", "StudioTool"]
+        )
+
+        entry, valid = nodes["StudioTool"]
+        self.assertEqual((entry.author, entry.version), ("studio", (1, 0, 0)))
+        self.assertEqual(entry.category, "")
+
+        for name in ("ShowTool", "OtherShowTool"):
+            entry, valid = nodes[name]
+            self.assertTrue(valid)
+            self.assertEqual((entry.author, entry.category), ("show", "show"))
+            self.assertEqual(entry.version, (0, 0, 0))
+
+    def test_nonLiteralAttributes(self):
+
+        self._writeFile(
+            "tools.py",
+            """
+            from katananodling.entities import BaseCustomNode
+
+            VERSION = (1, 0, 0)
+
+            class Base(BaseCustomNode):
+                name = "Base" + "Node"
+
+            class ChildTool(Base):
+                version = VERSION
+
+            class NamedTool(Base):
+                name = "NamedTool"
+                version = VERSION
+                color = (1, 0, 0)
+                description = str("dynamic")
+            """,
+        )
+
+        nodes = self._discover()
+        # inherit a non-literal name
+        self.assertEqual(sorted(nodes.keys()), ["NamedTool"])
+        entry, valid = nodes["NamedTool"]
+        # the default values are used, check is partial
+        self.assertTrue(valid)
+        self.assertEqual(entry.version, (0, 0, 0))
+        self.assertEqual(entry.description, "")
+        self.assertEqual(entry.color, (1, 0, 0))
+
+        unresolved = list()
+        discoverNodesInModules(
+            parseDirectory(self.libdir, "lib").values(), unresolved=unresolved
+        )
+        self.assertEqual(
+            sorted(class_info.name for class_info in unresolved), ["Base", "ChildTool"]
+        )
+
+    def test_parseModule(self):
+
+        path = self._writeFile(
+            "sub/tools.py",
+            """
+            import os.path
+            import lib.base as base
+            from . import helpers
+            from .. import studio
+            from ..studio import Node as StudioNode
+            from katananodling.entities import *
+
+            class Tool(base.Node, StudioNode):
+                pass
+            """,
+        )
+
+        module_info = parseModule(path, "lib.sub.tools")
+        self.assertFalse(module_info.is_package)
+        self.assertEqual(
+            module_info.imports,
+            {
+                "os": "os",
+                "base": "lib.base",
+                "helpers": "lib.sub.helpers",
+                "studio": "lib.studio",
+                "StudioNode": "lib.studio.Node",
+                "katananodling.entities.*": "katananodling.entities.*",
+            },
+        )
+        (class_info,) = module_info.classes
+        self.assertEqual(class_info.key, ("lib.sub.tools", "Tool"))
+        self.assertEqual(class_info.bases, ["base.Node", "StudioNode"])
+
+        path = os.path.join(self.libdir, "sub", "__init__.py")
+        module_info = parseModule(path, "lib.sub")
+        self.assertTrue(module_info.is_package)
+
+
+    def test_exportedOnly(self):
+
+        self._writeFile(
+            "__init__.py",
+            """
+            from .tools import ExportedTool as Tool
+            from .more import *
+            """,
+        )
+        self._writeFile(
+            "tools.py",
+            """
+            from katananodling.entities import BaseCustomNode
+
+            class ExportedTool(BaseCustomNode):
+                name = "ExportedTool"
+
+            class HiddenTool(BaseCustomNode):
+                name = "HiddenTool"
+            """,
+        )
+        self._writeFile(
+            "more.py",
+            """
+            from .tools import ExportedTool
+            from .sub.other import OtherTool, _PrivateTool
+            """,
+        )
+        self._writeFile(
+            "sub/other.py",
+            """
+            from katananodling.entities import BaseCustomNode
+
+            class OtherTool(BaseCustomNode):
+                name = "OtherTool"
+
+            class _PrivateTool(BaseCustomNode):
+                name = "PrivateTool"
+
+            class UnusedTool(BaseCustomNode):
+                name = "UnusedTool"
+            """,
+        )
+
+        self.assertEqual(
+            sorted(self._discover().keys()),
+            ["ExportedTool", "HiddenTool", "OtherTool", "UnusedTool"],
+        )
+        discovered = discoverNodesInDirectory(self.libdir, "lib", exported_only=True)
+        names = [entry.name for entries in discovered.values() for entry, _ in entries]
+        self.assertEqual(sorted(names), ["ExportedTool", "OtherTool"])
+
+
+if __name__ == "__main__":
+    unittest.main()
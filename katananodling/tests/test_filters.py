@@ -0,0 +1,66 @@
+import logging
+import os
+import unittest
+
+from katananodling import c
+from katananodling import config
+from katananodling.filters import NodeFilter
+
+logger = logging.getLogger(__name__)
+
+
+class NodeFilterTest(unittest.TestCase):
+    def test_exclusion(self):
+
+        node_filter = NodeFilter(
+            excluded=["Lxm*", "SceneGenerator[12]", "", "module=lib.old.*"]
+        )
+        self.assertTrue(node_filter)
+        self.assertTrue(node_filter.isExcluded("LxmTool"))
+        self.assertTrue(node_filter.isExcluded("SceneGenerator2"))
+        self.assertFalse(node_filter.isExcluded("SceneGenerator3"))
+        self.assertTrue(node_filter.isExcluded("Tool", module="lib.old.tool"))
+        self.assertFalse(node_filter.isExcluded("Tool", module="lib.new.tool"))
+        self.assertEqual(
+            node_filter.getExclusionReason("SceneGenerator1"),
+            "excluded by: class=SceneGenerator[12]",
+        )
+
+    def test_inclusion(self):
+
+        node_filter = NodeFilter(excluded=["*Beta"], included=["author=*Liam*"])
+        self.assertFalse(node_filter.isExcluded("Tool", author="Liam Collod"))
+        self.assertTrue(node_filter.isExcluded("ToolBeta", author="Liam Collod"))
+        self.assertEqual(
+            node_filter.getExclusionReason("Tool", author="Someone"), "not included"
+        )
+
+    def test_fromEnv(self):
+
+        self.addCleanup(config.refreshConfig)
+        config.refreshConfig(
+            environ={
+                c.Env.EXCLUDED_NODES: os.pathsep.join(
+                    ["module=lib.old.*", "author=*Liam*", "Lxm*"]
+                )
+            }
+        )
+        node_filter = NodeFilter.fromEnv()
+        self.assertTrue(node_filter.isExcluded("Tool", module="lib.old.tool"))
+        self.assertTrue(node_filter.isExcluded("Tool", author="Liam Collod"))
+        self.assertTrue(node_filter.isExcluded("LxmTool"))
+        self.assertFalse(node_filter.isExcluded("Tool", module="lib.new.tool"))
+        self.assertEqual(
+            node_filter.getExclusionReason("Tool", module="lib.old.tool"),
+            "excluded by: module=lib.old.*",
+        )
+
+    def test_empty(self):
+
+        node_filter = NodeFilter()
+        self.assertFalse(node_filter)
+        self.assertFalse(node_filter.isExcluded("Anything"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fakes import resetSession
+from Katana import NodegraphAPI
+
+from katananodling import fusion
+from katananodling import loader
+from katananodling.entities import OpScriptCustomNode
+
+logger = logging.getLogger(__name__)
+
+
+class FusionTest(unittest.TestCase):
+    def setUp(self):
+        resetSession()
+        loader.registerNodesFor(["demolibrary"])
+        self.addCleanup(setattr, OpScriptCustomNode, "fusible", False)
+        OpScriptCustomNode.fusible = True
+
+    def tearDown(self):
+        resetSession()
+
+    def createChain(self, node_types):
+        root = NodegraphAPI.GetRootNode()
+        nodes = list()
+        for node_type in node_types:
+            node = NodegraphAPI.CreateNode(node_type, root)
+            if nodes:
+                nodes[-1].getOutputPortByIndex(0).connect(node.getInputPortByIndex(0))
+            nodes.append(node)
+        return nodes
+
+    def test_fuse(self):
+
+        nodes = self.createChain(
+            ["demoOpScript", "PackageDemo", "demoOpScript", "Demo", "demoOpScript"]
+        )
+        opscripts = [fusion._getOpScriptNode(node) for node in nodes]
+        opscripts[1].getParameter("user").createChildNumber("amount", 2)
+        # same name as the namespace of the second node without its prefix
+        opscripts[0].getParameter("user").createChildString(nodes[1].getName(), "")
+        script = opscripts[0].getParameter("script.lua").getValue(0)
+
+        # Demo is not an OpScriptCustomNode and break the chain
+        chains = fusion.findFusibleChains()
+        self.assertEqual(chains, [nodes[:3]])
+
+        names = fusion.fuseOpScriptChains()
+        self.assertEqual(names, [[node.getName() for node in nodes[:3]]])
+        self.assertFalse(opscripts[0].isBypassed())
+        self.assertTrue(opscripts[1].isBypassed())
+        self.assertTrue(opscripts[2].isBypassed())
+        self.assertFalse(opscripts[4].isBypassed())
+
+        fused_script = opscripts[0].getParameter("script.lua").getValue(0)
+        self.assertIn('run("demolibrary.demoOpScript")', fused_script)
+        self.assertIn(
+            'run("demolibrary.packageDemo.init", "fused__{}")'.format(
+                nodes[1].getName()
+            ),
+            fused_script,
+        )
+        linked = opscripts[0].getParameter(
+            "user.fused__{}.amount".format(nodes[1].getName())
+        )
+        self.assertEqual(
+            linked.getExpression(),
+            'getParam("{}.user.amount")'.format(opscripts[1].getName()),
+        )
+        state = opscripts[0].getParameter("user.fusion__").getValue(0)
+        self.assertEqual(json.loads(state)["script"], script)
+
+        # fused nodes are not fusible again, but fusing again refresh the chains
+        self.assertEqual(fusion.findFusibleChains(), [])
+        self.assertEqual(len(fusion.fuseOpScriptChains()), 1)
+
+        self.assertEqual(fusion.defuseOpScriptChains(), 1)
+        self.assertEqual(opscripts[0].getParameter("script.lua").getValue(0), script)
+        user_params = opscripts[0].getParameter("user").getChildren()
+        self.assertEqual(
+            [param.getName() for param in user_params], [nodes[1].getName()]
+        )
+        self.assertFalse(any(opscript.isBypassed() for opscript in opscripts[:3]))
+
+    def test_renamed(self):
+
+        nodes = self.createChain(["demoOpScript"] * 3)
+        opscripts = [fusion._getOpScriptNode(node) for node in nodes]
+        fusion.fuseOpScriptChains()
+
+        nodes[1].setName("renamed")
+        self.assertEqual(fusion.defuseOpScriptChains(), 1)
+        self.assertFalse(any(opscript.isBypassed() for opscript in opscripts))
+        for opscript in opscripts:
+            self.assertEqual(opscript.getParameter("user").getNumChildren(), 0)
+        self.assertEqual(fusion.findFusibleChains(), [nodes])
+
+        # the first node of the chain is gone: the others are still restored
+        fusion.fuseOpScriptChains()
+        nodes[0].delete()
+        with self.assertLogs(fusion.logger, logging.WARNING) as logs:
+            self.assertEqual(fusion.defuseOpScriptChains(), 0)
+        self.assertEqual(len(logs.output), 2)
+        self.assertFalse(any(opscript.isBypassed() for opscript in opscripts[1:]))
+        self.assertEqual(fusion.findFusibleChains(), [nodes[1:]])
+
+    def test_compatibility(self):
+
+        nodes = self.createChain(["demoOpScript"] * 4)
+        opscript = fusion._getOpScriptNode(nodes[2])
+        opscript.getParameter("applyWhere").setValue("at specific location", 0)
+        self.assertEqual(fusion.findFusibleChains(), [nodes[:2]])
+
+        opscript.getParameter("applyWhere").setValue("at locations matching CEL", 0)
+        # multiple consumers
+        dot = NodegraphAPI.CreateNode("Dot", NodegraphAPI.GetRootNode())
+        dot.getInputPortByIndex(0).connect(nodes[1].getOutputPortByIndex(0))
+        self.assertEqual(fusion.findFusibleChains(), [nodes[:2], nodes[2:]])
+
+        OpScriptCustomNode.fusible = False
+        self.assertEqual(fusion.findFusibleChains(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,643 @@
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fakes import DiskLibrary
+from fakes import resetSession
+from Katana import Configuration
+from Katana import KatanaFile
+from Katana import LayeredMenuAPI
+from Katana import NodegraphAPI
+from Katana import Utils
+
+from katananodling import c
+from katananodling import config
+from katananodling import loader
+from katananodling import menu
+from katananodling import metrics
+from katananodling import migration
+from katananodling import prototype
+from katananodling.entities import BaseCustomNode
+
+logger = logging.getLogger(__name__)
+
+
+class LoaderTest(unittest.TestCase):
+    def setUp(self):
+        resetSession()
+        loader.registerNodesFor(["demolibrary"])
+        loader.registerCallbacks()
+
+    def tearDown(self):
+        resetSession()
+
+    def test_register(self):
+
+        self.assertEqual(
+            sorted(loader.REGISTERED.keys()), ["Demo", "PackageDemo", "demoOpScript"]
+        )
+        self.assertEqual(
+            sorted(NodegraphAPI.GetFlavorNodes(c.KATANA_FLAVOR_NAME)),
+            ["Demo", "PackageDemo", "demoOpScript"],
+        )
+        with self.assertRaises(RuntimeError):
+            loader.registerNodesFor(["demolibrary"])
+
+    def test_create(self):
+
+        node = NodegraphAPI.CreateNode("Demo", NodegraphAPI.GetRootNode())
+        self.assertIsInstance(node, BaseCustomNode)
+        self.assertIs(node.__class__, loader.REGISTERED["Demo"])
+        self.assertEqual(node.getType(), "Demo")
+        self.assertEqual(node.about.name, "Demo")
+        self.assertEqual(str(node.about.version), "0.1.0")
+        self.assertEqual(str(node.about.api_version), c.__version__)
+        self.assertIsNotNone(node.getParameter("user.CEL"))
+        # dots + prune
+        self.assertEqual(node.getNumChildren(), 3)
+        self.assertEqual(Utils.UndoStack._getEntries(), ["createNode"])
+
+        with self.assertLogs(loader.logger, logging.DEBUG) as logs:
+            loader.logger.debug("start")
+            Utils.EventModule.ProcessAllEvents()
+        self.assertFalse([log for log in logs.output if log.startswith("ERROR")])
+
+    def test_load(self):
+
+        root = NodegraphAPI.GetRootNode()
+        node = NodegraphAPI.CreateNode("Demo", root)
+        node.getParameter("user.CEL").setValue("/root/world//*", 0)
+        scene = NodegraphAPI.BuildNodesXmlIO([node])
+        name = node.getName()
+        user_params = [p.getName() for p in node.getParameter("user").getChildren()]
+        node.delete()
+        Utils.EventModule.ProcessAllEvents()
+
+        NodegraphAPI._setLoading(True)
+        (loaded,) = NodegraphAPI.LoadElementsFromXmlIO(scene, root)
+        NodegraphAPI._setLoading(False)
+        Utils.EventModule.ProcessAllEvents()
+
+        self.assertIs(loaded.__class__, loader.REGISTERED["Demo"])
+        self.assertEqual(loaded.getName(), name)
+        self.assertEqual(loaded.getParameter("user.CEL").getValue(0), "/root/world//*")
+        # not built twice
+        self.assertEqual(loaded.getNumChildren(), 3)
+        self.assertEqual(
+            [p.getName() for p in loaded.getParameter("user").getChildren()],
+            user_params,
+        )
+        dot_down = loaded.getReturnPort("out").getConnectedPort(0).getNode()
+        prune = dot_down.getInputPortByIndex(0).getConnectedPort(0).getNode()
+        self.assertEqual(prune.getType(), "Prune")
+        self.assertEqual(prune.getParameter("cel").getExpression(), "=^/user.CEL")
+
+    def test_deferred_upgrades(self):
+
+        root = NodegraphAPI.GetRootNode()
+        upgraded = list()
+        node_class = loader.REGISTERED["Demo"]
+        original_upgrade = node_class.upgrade
+
+        def upgrade(node):
+            upgraded.append(node)
+            if node.getName() == "Demo_0003":
+                raise ValueError("broken")
+            original_upgrade(node)
+
+        node_class.upgrade = upgrade
+        self.addCleanup(delattr, node_class, "upgrade")
+
+        with loader.deferredUpgrades():
+            nodes = [NodegraphAPI.CreateNode("Demo", root) for _ in range(3)]
+            nodes[0].delete()
+            Utils.EventModule.ProcessAllEvents()
+            self.assertEqual(upgraded, [])
+            self.assertEqual(len(loader._DEFERRED_NODES), 3)
+
+        self.assertEqual(upgraded, nodes[1:])
+        self.assertEqual(loader._DEFERRED_NODES, [])
+
+        # scene loading
+        scene = NodegraphAPI.BuildNodesXmlIO(nodes[1:])
+        for node in nodes[1:]:
+            node.delete()
+        del upgraded[:]
+
+        with self.assertLogs(loader.logger, logging.ERROR) as logs:
+            NodegraphAPI._setLoading(True)
+            loaded = NodegraphAPI.LoadElementsFromXmlIO(scene, root)
+            NodegraphAPI._setLoading(False)
+            Utils.EventModule.ProcessAllEvents()
+
+        self.assertEqual(upgraded, loaded)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn("Demo_0003", logs.output[0])
+
+        # paste: upgraded in one pass before returning, events included
+        del upgraded[:]
+        pasted = KatanaFile.Paste(NodegraphAPI.BuildNodesXmlIO(loaded[:1]), root)
+        self.assertEqual(upgraded, pasted)
+        self.assertEqual(loader._DEFERRED_NODES, [])
+        Utils.EventModule.ProcessAllEvents()
+        self.assertEqual(upgraded, pasted)
+
+    def test_migration(self):
+
+        node_class = loader.REGISTERED["Demo"]
+        migrated = list()
+
+        @migration.migrate("0.0.x", "0.1.0")
+        def _migrateTest(node):
+            """
+            Test migration.
+            """
+            migrated.append(node)
+
+        node_class._migrateTest = _migrateTest
+        self.addCleanup(delattr, node_class, "_migrateTest")
+        self.addCleanup(migration._STEPS_CACHE.clear)
+
+        node = NodegraphAPI.CreateNode("Demo", NodegraphAPI.GetRootNode())
+        self.assertEqual(loader.previewSceneMigrations(), [])
+
+        node.getParameter("user.About.version").setValue("0.0.3", 0)
+        node.getParameter("user.About.open_documentation").setHintString("")
+        (preview,) = loader.previewSceneMigrations()
+        self.assertEqual(preview["from"], "0.0.3")
+        self.assertEqual(preview["to"], "0.1.0")
+        self.assertEqual(preview["steps"][0]["description"], "Test migration.")
+        self.assertEqual(migrated, [])
+
+        node.upgrade()
+        self.assertEqual(migrated, [node])
+        self.assertEqual(str(node.about.version), "0.1.0")
+        hints = node.getParameter("user.About.open_documentation").getHintString()
+        self.assertIn("scriptButton", hints)
+        self.assertEqual(loader.previewSceneMigrations(), [])
+
+        node.upgrade()
+        self.assertEqual(migrated, [node])
+
+    def test_user_params(self):
+
+        node = NodegraphAPI.CreateNode("Demo", NodegraphAPI.GetRootNode())
+        self.assertEqual(
+            [param.getName() for param in node.user_param.getChildren()],
+            ["CEL", "amount", "About"],
+        )
+        node.getParameter("user.CEL").setValue("/root/world", 0)
+        node.user_param.deleteChild(node.getParameter("user.amount"))
+        node.user_param.createChildString("legacy", "")
+
+        node.getParameter("user.About.version").setValue("0.0.3", 0)
+        (preview,) = loader.previewSceneMigrations()
+        self.assertEqual(
+            sorted(preview["params"]),
+            ["add user.amount", "remove user.legacy", "reorder user"],
+        )
+
+        node.upgrade()
+        self.assertEqual(
+            [param.getName() for param in node.user_param.getChildren()],
+            ["CEL", "amount", "About"],
+        )
+        self.assertEqual(node.getParameter("user.CEL").getValue(0), "/root/world")
+        self.assertIn("slider", node.getParameter("user.amount").getHintString())
+
+    def test_metrics(self):
+
+        root = NodegraphAPI.GetRootNode()
+        nodes = [NodegraphAPI.CreateNode("Demo", root) for _ in range(3)]
+        NodegraphAPI.CreateNode("demoOpScript", root)
+        Utils.EventModule.ProcessAllEvents()
+        nodes[0].getParameter("user.About.version").setValue("0.0.1", 0)
+
+        report = metrics.getSceneReport()
+        self.assertEqual(sorted(report["types"]), ["Demo", "demoOpScript"])
+        demo = report["types"]["Demo"]
+        self.assertEqual(demo["class"], "demolibrary.demo.DemoNode")
+        self.assertEqual(demo["instances"], 3)
+        self.assertEqual(demo["versions"], {"0.1.0": 2, "0.0.1": 1})
+        self.assertEqual(demo["outdated"], 1)
+        # dots + prune
+        self.assertEqual(demo["internal_nodes"], 9)
+        self.assertEqual(
+            demo["params"], metrics.getNodeMetrics(nodes[1])["params"] * 3
+        )
+        self.assertEqual(demo["timings"]["create"]["count"], 3)
+        self.assertEqual(demo["timings"]["upgrade"]["count"], 3)
+        self.assertEqual(report["total"]["instances"], 4)
+        self.assertEqual(report["total"]["types"], 2)
+
+        report = metrics.getSceneReport(include_unused=True)
+        self.assertEqual(report["types"]["PackageDemo"]["instances"], 0)
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "report.json")
+        metrics.writeSceneReport(path)
+        with open(path) as report_file:
+            self.assertEqual(json.load(report_file)["total"]["instances"], 4)
+
+    def test_debug_mode(self):
+
+        root = NodegraphAPI.GetRootNode()
+        nodes = [NodegraphAPI.CreateNode("Demo", root) for _ in range(2)]
+        path_param = nodes[0].getParameter("user.About.path")
+        hints = path_param.getHintString()
+
+        self.assertFalse(nodes[0].isInDebugMode())
+        nodes[0].__toggleDebugMode__(False)
+        self.assertIsNone(nodes[0].getParameter("debug__"))
+
+        nodes[0].__toggleDebugMode__(True)
+        nodes[0].__toggleDebugMode__(True)
+        self.assertTrue(nodes[0].isInDebugMode())
+        self.assertNotIn("widget", path_param.getHintString())
+        self.assertEqual(nodes[0].getParameter("debug__.data").getValue(0), "")
+        self.assertIn('"name": "Demo"', nodes[0]._getDebugData())
+
+        self.assertEqual(loader.setSceneDebugMode(True), 1)
+        self.assertTrue(nodes[1].isInDebugMode())
+        self.assertEqual(loader.setSceneDebugMode(False), 2)
+        self.assertFalse(nodes[0].isInDebugMode())
+        self.assertIsNone(nodes[0].getParameter("debug__"))
+        self.assertEqual(path_param.getHintString(), hints)
+
+    def test_batch_mode(self):
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        scene_path = os.path.join(tmpdir, "scene.katana")
+
+        NodegraphAPI.CreateNode("demoOpScript", NodegraphAPI.GetRootNode())
+        KatanaFile.Save(scene_path)
+
+        resetSession()
+        Configuration.set("KATANA_UI_MODE", "0")
+        self.assertTrue(loader.isBatchMode())
+        os.environ[c.Env.BATCH_MODE] = "0"
+        self.addCleanup(config.refreshConfig)
+        self.addCleanup(os.environ.pop, c.Env.BATCH_MODE)
+        # the configuration is a snapshot
+        self.assertTrue(loader.isBatchMode())
+        config.refreshConfig()
+        self.assertFalse(loader.isBatchMode())
+        os.environ[c.Env.BATCH_MODE] = "1"
+
+        argv = sys.argv
+        sys.argv = ["katana", "--batch", "--katana-file={}".format(scene_path)]
+        self.addCleanup(setattr, sys, "argv", argv)
+
+        loader.registerNodesFor(["demolibrary"])
+        loader.registerCallbacks()
+        self.assertEqual(list(loader.REGISTERED.keys()), ["demoOpScript"])
+        # registered like in the UI, lazy loading is not forced
+        self.assertTrue(loader.REGISTERED.isResolved("demoOpScript"))
+        self.assertFalse(
+            Utils.EventModule.IsHandlerRegistered(
+                loader.upgradeOnNodeCreateEvent, "node_create"
+            )
+        )
+
+        KatanaFile.Load(scene_path)
+        (node,) = NodegraphAPI.GetAllNodesByType("demoOpScript")
+        self.assertIs(node.__class__, loader.REGISTERED["demoOpScript"])
+
+        resetSession()
+        os.environ[c.Env.LAZY_LOADING] = "1"
+        self.addCleanup(os.environ.pop, c.Env.LAZY_LOADING)
+        loader.registerNodesFor(["demolibrary"])
+        self.assertEqual(list(loader.REGISTERED.keys()), ["demoOpScript"])
+        self.assertFalse(loader.REGISTERED.isResolved("demoOpScript"))
+
+    def test_callbacks(self):
+
+        root = NodegraphAPI.GetRootNode()
+        upgraded = list()
+        node_class = loader.REGISTERED["Demo"]
+        node_class.upgrade = lambda node: upgraded.append(node)
+        self.addCleanup(delattr, node_class, "upgrade")
+
+        with loader.suspendCallbacks():
+            NodegraphAPI.CreateNode("Demo", root)
+        Utils.EventModule.ProcessAllEvents()
+        self.assertEqual(upgraded, [])
+
+        node = NodegraphAPI.CreateNode("Demo", root)
+        Utils.EventModule.ProcessAllEvents()
+        self.assertEqual(upgraded, [node])
+
+        paste = KatanaFile.Paste
+        loader.unregisterCallbacks()
+        loader.unregisterCallbacks()
+        NodegraphAPI.CreateNode("Demo", root)
+        Utils.EventModule.ProcessAllEvents()
+        self.assertEqual(upgraded, [node])
+        self.assertIsNot(KatanaFile.Paste, paste)
+        self.assertIs(KatanaFile.Paste, paste._nodling_paste)
+
+        with self.assertLogs(loader.logger, logging.DEBUG) as logs:
+            loader.registerCallbacks()
+            loader.registerCallbacks()
+        for event_type in ["node_create", "nodegraph_loadEnd"]:
+            self.assertIn('"{}"'.format(event_type), logs.output[0])
+        # no node to prewarm
+        self.assertNotIn('"event_idle"', logs.output[0])
+        # not wrapped twice
+        self.assertIs(KatanaFile.Paste._nodling_paste, paste._nodling_paste)
+
+    def test_prewarmCallback(self):
+
+        idle = (loader._prewarmPrototypesOnIdle, "event_idle")
+        self.assertFalse(Utils.EventModule.IsHandlerRegistered(*idle))
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        prototype.PROTOTYPES.directory = tmpdir
+        node_class = loader.REGISTERED["Demo"]
+        node_class.use_prototype_cache = True
+        self.addCleanup(delattr, node_class, "use_prototype_cache")
+
+        loader.unregisterCallbacks()
+        loader.registerCallbacks()
+        self.assertTrue(Utils.EventModule.IsHandlerRegistered(*idle))
+        loader.unregisterCallbacks()
+        self.assertFalse(Utils.EventModule.IsHandlerRegistered(*idle))
+
+        # also registered when updates are disabled
+        self.addCleanup(config.refreshConfig)
+        config.refreshConfig(environ={c.Env.UPGRADE_DISABLE: "1"})
+        loader.registerCallbacks()
+        self.assertTrue(Utils.EventModule.IsHandlerRegistered(*idle))
+
+        # built outside of the user nodes
+        root = NodegraphAPI.GetRootNode()
+        children = root.getChildren()
+        entries = Utils.UndoStack._getEntries()
+        Utils.EventModule.QueueEvent("event_idle", None)
+        Utils.EventModule.ProcessAllEvents()
+        self.assertIn(node_class, prototype.PROTOTYPES)
+        self.assertEqual(root.getChildren(), children)
+        self.assertEqual(Utils.UndoStack._getEntries(), entries)
+        self.assertFalse(Utils.EventModule.IsHandlerRegistered(*idle))
+
+    def test_prototype(self):
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        prototype.PROTOTYPES.directory = tmpdir
+
+        root = NodegraphAPI.GetRootNode()
+        node_class = loader.REGISTERED["Demo"]
+        node_class.use_prototype_cache = True
+        self.addCleanup(delattr, node_class, "use_prototype_cache")
+        built = list()
+        original_build = node_class._build
+
+        def _build(node):
+            built.append(node)
+            original_build(node)
+
+        node_class._build = _build
+        self.addCleanup(setattr, node_class, "_build", original_build)
+
+        self.assertEqual(loader.prewarmPrototypes(), ["Demo"])
+        self.assertEqual(len(built), 1)
+        self.assertEqual(NodegraphAPI.GetAllNodesByType("Demo"), [])
+        self.assertTrue(os.listdir(tmpdir))
+
+        nodes = [NodegraphAPI.CreateNode("Demo", root) for _ in range(2)]
+        self.assertEqual(len(built), 1)
+        self.assertEqual(loader.prewarmPrototypes(), [])
+        for node in nodes:
+            self.assertIs(node.__class__, node_class)
+            self.assertIs(node.getParent(), root)
+            self.assertEqual(node.getNumChildren(), 3)
+            self.assertEqual(str(node.about.version), "0.1.0")
+        self.assertNotEqual(nodes[0].getName(), nodes[1].getName())
+
+        # persisted between sessions
+        prototype.PROTOTYPES.clear()
+        NodegraphAPI.CreateNode("Demo", root)
+        self.assertEqual(len(built), 1)
+
+        # invalidated on new version
+        self.addCleanup(setattr, node_class, "version", node_class.version)
+        node_class.version = (0, 2, 0)
+        prototype.PROTOTYPES.clear()
+        NodegraphAPI.CreateNode("Demo", root)
+        self.assertEqual(len(built), 2)
+
+    def test_createNodes(self):
+
+        group = NodegraphAPI.CreateNode("Group", NodegraphAPI.GetRootNode())
+        Utils.EventModule.ProcessAllEvents()
+        entries = Utils.UndoStack._getEntries()
+
+        results = loader.createNodes(
+            ["Demo", "Unknown", "demoOpScript", "Demo"],
+            parent=group,
+            params=[{"user.CEL": "/root"}, None, None, {"user.missing": 1}],
+            undo_name="Create Template",
+        )
+        self.assertEqual(Utils.UndoStack._getEntries(), entries + ["Create Template"])
+        self.assertEqual(len(results), 4)
+
+        node, error = results[0]
+        self.assertIsNone(error)
+        self.assertIs(node.getParent(), group)
+        self.assertEqual(node.getParameter("user.CEL").getValue(0), "/root")
+        self.assertEqual(node.getNumChildren(), 3)
+
+        self.assertIsNone(results[1][0])
+        self.assertIn("Unknown", results[1][1])
+        self.assertEqual(results[2][0].getType(), "demoOpScript")
+        self.assertIsNone(results[3][0])
+        self.assertIn("user.missing", results[3][1])
+        self.assertEqual(len(group.getChildren()), 2)
+
+    def test_createNodesBatch(self):
+
+        root = NodegraphAPI.GetRootNode()
+        NodegraphAPI.CreateNode("Demo", root)
+
+        renamed = list()
+        disabled = list()
+        setName = NodegraphAPI.Node.setName
+        DisableCapture = Utils.UndoStack.DisableCapture
+
+        def countingSetName(node, name):
+            renamed.append((name, setName(node, name)))
+            return renamed[-1][1]
+
+        def countingDisableCapture():
+            disabled.append(True)
+            DisableCapture()
+
+        NodegraphAPI.Node.setName = countingSetName
+        self.addCleanup(setattr, NodegraphAPI.Node, "setName", setName)
+        Utils.UndoStack.DisableCapture = countingDisableCapture
+        self.addCleanup(delattr, Utils.UndoStack, "DisableCapture")
+
+        results = loader.createNodes(["Demo"] * 3 + ["demoOpScript"])
+        names = [node.getName() for node, error in results]
+        self.assertEqual(
+            names, ["Demo_0002", "Demo_0003", "Demo_0004", "demoOpScript_0001"]
+        )
+        # named once, with a name Katana doesn't have to make unique
+        self.assertEqual([name for name, result in renamed if result in names], names)
+        # once for the whole batch
+        self.assertEqual(len(disabled), 1)
+
+    def test_menu(self):
+
+        layered_menu = menu.getLayeredMenuForAllCustomNodes()
+        layered_menu._show()
+        self.assertEqual(
+            layered_menu._filter("demo"), ["Demo", "PackageDemo", "demoOpScript"]
+        )
+        node = layered_menu._select("PackageDemo")
+        self.assertEqual(node.getType(), "PackageDemo")
+        self.assertIsNone(layered_menu._select("Unknown"))
+
+    def test_menu_category(self):
+
+        index = menu.getMenuIndex()
+        revision = index.revision
+        self.assertEqual(index.getCategories(), [])
+
+        node_class = loader.REGISTERED["demoOpScript"]
+        self.addCleanup(setattr, node_class, "category", "")
+        node_class.category = "lookdev/scripts"
+        # class attributes are only read again when the registry changes
+        self.assertEqual(index.get("demoOpScript").text, "demoOpScript")
+        loader.REGISTERED["demoOpScript"] = node_class
+        self.assertEqual(index.get("demoOpScript").text, "lookdev/scripts/demoOpScript")
+        self.assertNotEqual(index.revision, revision)
+        self.assertEqual(index.getCategories(), ["lookdev", "lookdev/scripts"])
+
+        layered_menu = menu.getLayeredMenuForAllCustomNodes(category="lookdev")
+        layered_menu._show()
+        self.assertEqual(layered_menu._filter(""), ["demoOpScript"])
+        self.assertEqual(layered_menu._filter("scripts/demo"), ["demoOpScript"])
+
+    def test_menu_search(self):
+
+        # whole name first, then whole word, then alphabetical
+        self.assertEqual(
+            menu.searchNodes("demo"), ["Demo", "demoOpScript", "PackageDemo"]
+        )
+        self.assertEqual(menu.searchNodes("demo", limit=1), ["Demo"])
+        # all terms must match, in any field
+        self.assertEqual(menu.searchNodes("script demo"), ["demoOpScript"])
+        self.assertEqual(len(menu.searchNodes("tool email")), 3)
+        self.assertEqual(menu.searchNodes("demo missing"), [])
+        # typos
+        self.assertEqual(menu.searchNodes("pakage"), ["PackageDemo"])
+        self.assertEqual(menu.searchNodes("opscrpt"), ["demoOpScript"])
+
+        layered_menu = menu.getLayeredMenuForAllCustomNodes(query="package")
+        layered_menu._show()
+        self.assertEqual(layered_menu._filter(""), ["PackageDemo"])
+
+        # the ranking is kept in the menu
+        layered_menu = menu.getLayeredMenuForAllCustomNodes(query="demo")
+        layered_menu._show()
+        self.assertFalse(layered_menu.sortAlphabetically())
+        self.assertEqual(
+            layered_menu._filter(""), ["Demo", "demoOpScript", "PackageDemo"]
+        )
+
+        # the limit applies to the entries of the category
+        node_class = loader.REGISTERED["demoOpScript"]
+        self.addCleanup(setattr, node_class, "category", "")
+        node_class.category = "lookdev"
+        loader.REGISTERED["demoOpScript"] = node_class
+        entries = menu.getMenuIndex().search("demo", 1, category="lookdev")
+        self.assertEqual([entry.key for entry in entries], ["demoOpScript"])
+        layered_menu = menu.getLayeredMenuForAllCustomNodes("lookdev", query="demo")
+        layered_menu._show()
+        self.assertEqual(layered_menu._filter(""), ["demoOpScript"])
+
+
+class ReloadTest(unittest.TestCase):
+    """
+    Hot reload of a library written on disk, modified while registered.
+    """
+
+    package = "nodlingreloadlib"
+
+    def setUp(self):
+        resetSession()
+        self.library = DiskLibrary(self.package)
+        self.addCleanup(self.library.cleanup)
+
+        loader.registerNodesFor([self.package])
+        self.node = NodegraphAPI.CreateNode("A", NodegraphAPI.GetRootNode())
+        self.node.getParameter("user.About.api_version").setValue("0.0.1", 0)
+
+    def tearDown(self):
+        resetSession()
+
+    def test_reloadModified(self):
+
+        previous_class = loader.REGISTERED["A"]
+        self.assertEqual(loader.reloadNodes(), [])
+
+        self.library.writeNode(
+            "a.py", "A", (0, 2, 0), params='schema.NumberParam("amount", 1)'
+        )
+        self.assertEqual(loader.reloadNodes(), ["A"])
+        self.assertEqual(loader.reloadNodes(), [])
+
+        node_class = loader.REGISTERED["A"]
+        self.assertIsNot(node_class, previous_class)
+        self.assertEqual(node_class.version, (0, 2, 0))
+        # the module of B is not reloaded
+        self.assertIs(loader.REGISTERED["B"], sys.modules[self.package].BNode)
+
+        # live nodes are rebound and upgraded
+        self.assertIs(self.node.__class__, node_class)
+        self.assertEqual(str(self.node.about.version), "0.2.0")
+        self.assertEqual(str(self.node.about.api_version), c.__version__)
+        self.assertIsNotNone(self.node.getParameter("user.amount"))
+
+    def test_reloadRenamed(self):
+
+        previous_class = loader.REGISTERED["A"]
+        self.library.writeNode("a.py", "Renamed", (0, 2, 0))
+        with self.assertLogs(loader.logger, logging.WARNING) as logs:
+            self.assertEqual(loader.reloadNodes(), [])
+        self.assertIn("<A> is not defined anymore", logs.output[0])
+
+        self.assertIs(loader.REGISTERED["A"], previous_class)
+        self.assertNotIn("Renamed", loader.REGISTERED)
+        self.assertIs(self.node.__class__, previous_class)
+        self.assertEqual(str(self.node.about.version), "0.1.0")
+
+    def test_reloadError(self):
+
+        previous_class = loader.REGISTERED["A"]
+        self.library.writeFile("a.py", "raise RuntimeError('broken')\n")
+        with self.assertLogs(loader.logger, logging.ERROR) as logs:
+            self.assertEqual(loader.reloadNodes(), [])
+        self.assertIn("broken", logs.output[0])
+        self.assertIs(loader.REGISTERED["A"], previous_class)
+        self.assertIs(self.node.__class__, previous_class)
+
+        # the module is reloaded again once fixed
+        self.library.writeNode("a.py", "A", (0, 2, 0))
+        self.assertEqual(loader.reloadNodes(), ["A"])
+        self.assertEqual(str(self.node.about.version), "0.2.0")
+
+
+if __name__ == "__main__":
+    unittest.main()
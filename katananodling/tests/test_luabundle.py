@@ -0,0 +1,74 @@
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "fakes"))
+
+from katananodling import c
+from katananodling import config
+from katananodling import luabundle
+
+from demolibrary.demo import DemoNode
+from demolibrary.demoOpScript import DemoOpScriptNode
+from demolibrary.packageDemo import PackageDemoNode
+
+logger = logging.getLogger(__name__)
+
+
+class LuaBundleTest(unittest.TestCase):
+    def test_collect(self):
+
+        modules = luabundle.collectLuaModules(
+            [DemoNode, DemoOpScriptNode, PackageDemoNode]
+        )
+        # only PackageDemo has a lua file
+        self.assertEqual(list(modules.keys()), ["demolibrary.packageDemo.init"])
+        self.assertEqual(
+            modules["demolibrary.packageDemo.init"],
+            luabundle.getLuaModulePath(PackageDemoNode),
+        )
+        self.assertIsNone(luabundle.getLuaModulePath(DemoOpScriptNode))
+
+    def test_bundle(self):
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        path = os.path.join(tmpdir, "sub", "bundle.lua")
+
+        names = luabundle.writeBundle(path, [DemoOpScriptNode, PackageDemoNode])
+        self.assertEqual(names, ["demolibrary.packageDemo.init"])
+        with open(path) as bundle_file:
+            content = bundle_file.read()
+
+        self.assertIn(
+            'package.preload["demolibrary.packageDemo.init"] = function(...)\n'
+            "local function run()",
+            content,
+        )
+        self.assertIn("return run\nend\n", content)
+        flag = 'package.loaded["{}"] = true\n'.format(luabundle.BUNDLE_FLAG)
+        self.assertTrue(content.endswith(flag))
+
+    def test_loader_script(self):
+
+        script = luabundle.getLoaderScript("lib.tool")
+        self.assertIn('require("lib.tool")', script)
+        self.assertNotIn("dofile", script)
+
+        script = luabundle.getLoaderScript("lib.tool", "C:\\bundle.lua")
+        self.assertIn('or "C:\\\\bundle.lua"', script)
+        self.assertIn('os.getenv("{}")'.format(c.Env.LUA_BUNDLE), script)
+        self.assertIn('require("lib.tool")', script)
+
+        os.environ[c.Env.LUA_BUNDLE] = "/bundle.lua"
+        self.addCleanup(config.refreshConfig)
+        self.addCleanup(os.environ.pop, c.Env.LUA_BUNDLE)
+        config.refreshConfig()
+        self.assertIn("/bundle.lua", PackageDemoNode.getLuaLoaderScript())
+
+
+if __name__ == "__main__":
+    unittest.main()
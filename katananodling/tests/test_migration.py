@@ -0,0 +1,114 @@
+import logging
+import unittest
+
+from katananodling import migration
+from katananodling.util import Version
+
+logger = logging.getLogger(__name__)
+
+
+class _Node(object):
+
+    version = (0, 4, 0)
+
+    @migration.migrate("0.1.x", "0.2.0")
+    def _addAmount(self):
+        """
+        Add the amount parameter.
+        """
+        pass
+
+    @migration.migrate("0.2", "0.3.0")
+    def _renameCel(self):
+        pass
+
+    @migration.migrate("0.3.1", "0.4.0")
+    def _fixPatch(self):
+        pass
+
+    @migration.migrate("0.4.x", "0.5.0")
+    def _future(self):
+        pass
+
+
+class _SubNode(_Node):
+
+    version = (0, 3, 0)
+
+    def _renameCel(self):
+        pass
+
+
+class _RangeNode(object):
+
+    version = (1, 0, 0)
+
+    @migration.migrate(">=0.1,<0.5,!=0.3.0", "1.0.0")
+    def _rebuild(self):
+        pass
+
+
+class MigrationTest(unittest.TestCase):
+    def _plan(self, node_class, version):
+        return [
+            step.name for step in migration.planMigration(node_class, Version(version))
+        ]
+
+    def test_pattern(self):
+
+        pattern = migration.VersionPattern("0.1.x")
+        self.assertEqual(str(pattern), "0.1.x")
+        self.assertEqual(pattern.lowest, (0, 1, 0))
+        self.assertTrue(pattern.match(Version("0.1.5")))
+        self.assertFalse(pattern.match(Version("0.2.0")))
+        self.assertEqual(str(migration.VersionPattern("1")), "1.x.x")
+        self.assertEqual(str(migration.VersionPattern((1, 2, 3))), "1.2.3")
+        with self.assertRaises(ValueError):
+            migration.VersionPattern("a.b")
+
+    def test_steps(self):
+
+        steps = migration.getMigrationSteps(_Node)
+        self.assertEqual(
+            [step.name for step in steps],
+            ["_addAmount", "_renameCel", "_fixPatch", "_future"],
+        )
+        self.assertEqual(steps[0].description, "Add the amount parameter.")
+        self.assertEqual(str(steps[0].target), "0.2.0")
+
+        steps = migration.getMigrationSteps(_SubNode)
+        self.assertEqual(
+            [step.name for step in steps], ["_addAmount", "_fixPatch", "_future"]
+        )
+
+    def test_plan(self):
+
+        self.assertEqual(
+            self._plan(_Node, "0.1.3"), ["_addAmount", "_renameCel", "_fixPatch"]
+        )
+        self.assertEqual(self._plan(_Node, "0.2.0"), ["_renameCel", "_fixPatch"])
+        # 0.3.0 -> 0.3.1 didn't need a step
+        self.assertEqual(self._plan(_Node, "0.3.0"), ["_fixPatch"])
+        # gap before the first step
+        self.assertEqual(
+            self._plan(_Node, "0.0.1"), ["_addAmount", "_renameCel", "_fixPatch"]
+        )
+        # already past the step source
+        self.assertEqual(self._plan(_Node, "0.3.2"), [])
+        self.assertEqual(self._plan(_Node, "0.4.0"), [])
+        self.assertEqual(self._plan(_Node, "1.0.0"), [])
+        self.assertEqual(self._plan(_SubNode, "0.1.0"), ["_addAmount"])
+
+    def test_range(self):
+
+        step = migration.getMigrationSteps(_RangeNode)[0]
+        self.assertIsInstance(step.source, migration.VersionRange)
+        self.assertEqual(self._plan(_RangeNode, "0.4.9"), ["_rebuild"])
+        # gap before the step source
+        self.assertEqual(self._plan(_RangeNode, "0.0.1"), ["_rebuild"])
+        self.assertEqual(self._plan(_RangeNode, "0.3.0"), [])
+        self.assertEqual(self._plan(_RangeNode, "0.5.0"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,138 @@
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from fakes import resetSession
+from Katana import NodegraphAPI
+from Katana import Utils
+
+from katananodling import loader
+from katananodling import profiling
+from katananodling.profiling import NodeTimings
+from katananodling.profiling import RegistrationProfiler
+
+logger = logging.getLogger(__name__)
+
+
+class FakeTimer(object):
+    """
+    Clock only moving forward when asked to, so timings are exact.
+    """
+
+    def __init__(self):
+        self.time = 0.0
+
+    def __call__(self):
+        return self.time
+
+    def sleep(self, duration):
+        self.time += duration
+
+
+class RegistrationProfilerTest(unittest.TestCase):
+    def setUp(self):
+        self.timer = FakeTimer()
+        self.addCleanup(setattr, profiling, "timer", profiling.timer)
+        profiling.timer = self.timer
+
+    def test_nested(self):
+
+        profiler = RegistrationProfiler()
+
+        with profiler.package("lib"):
+            with profiler.measure("discovery"):
+                self.timer.sleep(0.25)
+                with profiler.measure("validation", node="Demo"):
+                    self.timer.sleep(0.5)
+                with profiler.measure("validation", node="Other"):
+                    self.timer.sleep(0.125)
+
+        with profiler.measure("import"):
+            self.timer.sleep(1.0)
+
+        packages = profiler.getPackageTimings()
+        self.assertEqual(list(packages.keys()), ["lib"])
+        # time spent in nested measures is excluded
+        self.assertEqual(packages["lib"]["discovery"], 0.25)
+        self.assertEqual(packages["lib"]["validation"], 0.625)
+        self.assertEqual(packages["lib"]["import"], 0.0)
+
+        nodes = profiler.getNodeTimings()
+        self.assertEqual(sorted(nodes.keys()), ["Demo", "Other"])
+        self.assertEqual(nodes["Demo"]["validation"], 0.5)
+        self.assertEqual(nodes["Demo"]["discovery"], 0.0)
+
+        summary = profiler.asdict()
+        self.assertEqual(len(summary["phases"]), 5)
+        self.assertEqual(summary["phases"]["import"], 1.0)
+        self.assertEqual(sum(summary["phases"].values()), 1.875)
+
+        profiler.reset()
+        self.assertEqual(profiler.records, [])
+
+    def test_nodeTimings(self):
+
+        timings = NodeTimings()
+        self.assertEqual(timings.get("Demo")["create"]["mean"], 0.0)
+
+        timings.record("Demo", "create", 0.5)
+        timings.record("Demo", "create", 0.25)
+        timings.record("Demo", "upgrade", 0.125)
+        self.assertEqual(timings.getNodeTypes(), ["Demo"])
+        self.assertEqual(
+            timings.get("Demo"),
+            {
+                "create": {"count": 2, "total": 0.75, "mean": 0.375},
+                "upgrade": {"count": 1, "total": 0.125, "mean": 0.125},
+            },
+        )
+
+        timings.reset()
+        self.assertEqual(timings.getNodeTypes(), [])
+
+
+class LoaderProfilingTest(unittest.TestCase):
+    def setUp(self):
+        resetSession()
+
+    def tearDown(self):
+        resetSession()
+
+    def test_getRegistrationProfile(self):
+
+        loader.registerNodesFor(["demolibrary"])
+        profile = profiling.getRegistrationProfile()
+
+        self.assertEqual(sorted(profile["phases"]), sorted(profiling.PHASES))
+        self.assertEqual(list(profile["packages"].keys()), ["demolibrary"])
+        self.assertEqual(
+            sorted(profile["packages"]["demolibrary"]), sorted(profiling.PHASES)
+        )
+        self.assertEqual(
+            sorted(profile["nodes"].keys()), ["Demo", "PackageDemo", "demoOpScript"]
+        )
+        self.assertGreaterEqual(profile["nodes"]["Demo"]["validation"], 0.0)
+        self.assertGreaterEqual(profile["total"], sum(profile["phases"].values()))
+
+    def test_nodePhases(self):
+
+        loader.registerNodesFor(["demolibrary"])
+        loader.registerCallbacks()
+        root = NodegraphAPI.GetRootNode()
+        for _ in range(2):
+            NodegraphAPI.CreateNode("Demo", root)
+        Utils.EventModule.ProcessAllEvents()
+
+        self.assertEqual(profiling.NODE_TIMINGS.getNodeTypes(), ["Demo"])
+        timings = profiling.NODE_TIMINGS.get("Demo")
+        self.assertEqual(timings["create"]["count"], 2)
+        self.assertGreaterEqual(timings["create"]["total"], 0.0)
+        self.assertEqual(timings["create"]["mean"], timings["create"]["total"] / 2)
+        self.assertEqual(timings["upgrade"]["count"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
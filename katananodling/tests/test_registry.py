@@ -0,0 +1,106 @@
+import logging
+import os
+import shutil
+import tempfile
+import unittest
+
+from katananodling.registry import NodeEntry
+from katananodling.registry import NodeRegistry
+from katananodling.registry import readManifest
+from katananodling.registry import writeManifest
+
+logger = logging.getLogger(__name__)
+
+
+class FakeNode:
+    name = "Fake"
+    version = (0, 2, 1)
+    color = (0.1, 0.2, 0.3)
+    description = "fake node"
+    author = "nobody"
+
+
+class NodeRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_entry(self):
+
+        entry = NodeEntry.fromClass(FakeNode)
+        self.assertEqual(entry.name, "Fake")
+        self.assertEqual(entry.class_name, "FakeNode")
+        self.assertEqual(entry.module, __name__)
+        self.assertEqual(NodeEntry.fromDict(entry.asdict()), entry)
+        self.assertIs(entry.load(), FakeNode)
+
+    def test_lazy_resolve(self):
+
+        resolved = []
+
+        def resolver(entry):
+            resolved.append(entry)
+            return entry.load()
+
+        registry = NodeRegistry(resolver=resolver)
+        registry["Fake"] = NodeEntry.fromClass(FakeNode)
+
+        self.assertIn("Fake", registry)
+        self.assertIsInstance(registry.peek("Fake"), NodeEntry)
+        self.assertFalse(registry.isResolved("Fake"))
+        self.assertEqual(resolved, [])
+
+        self.assertIs(registry["Fake"], FakeNode)
+        self.assertIs(registry.get("Fake"), FakeNode)
+        self.assertTrue(registry.isResolved("Fake"))
+        self.assertEqual(len(resolved), 1)
+        self.assertIsNone(registry.get("Missing"))
+
+    def test_names(self):
+
+        registry = NodeRegistry()
+        self.assertEqual(registry.names(), frozenset())
+
+        registry["Fake"] = NodeEntry.fromClass(FakeNode)
+        names = registry.names()
+        self.assertEqual(names, frozenset(["Fake"]))
+        # resolving doesn't change the keys
+        registry["Fake"]
+        self.assertIs(registry.names(), names)
+
+        registry.update(Other=FakeNode)
+        self.assertEqual(registry.names(), frozenset(["Fake", "Other"]))
+        del registry["Other"]
+        self.assertEqual(registry.names(), frozenset(["Fake"]))
+        registry.clear()
+        self.assertEqual(registry.names(), frozenset())
+
+    def test_revision(self):
+
+        registry = NodeRegistry()
+        registry["Fake"] = NodeEntry.fromClass(FakeNode)
+        revision = registry.revision
+        # resolving doesn't change the content
+        registry["Fake"]
+        self.assertEqual(registry.revision, revision)
+
+        registry["Fake"] = FakeNode
+        self.assertGreater(registry.revision, revision)
+        revision = registry.revision
+        registry.pop("Fake")
+        self.assertGreater(registry.revision, revision)
+
+    def test_manifest(self):
+
+        path = os.path.join(self.tmpdir, "manifest.json")
+        self.assertIsNone(readManifest(path))
+
+        entries = [NodeEntry.fromClass(FakeNode)]
+        writeManifest(path, entries)
+        self.assertEqual(readManifest(path), entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
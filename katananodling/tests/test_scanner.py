@@ -0,0 +1,161 @@
+import gzip
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+try:
+    from StringIO import StringIO
+except ImportError:  # python-3
+    from io import StringIO
+
+from katananodling import scanner
+from katananodling.util import VersionRange
+
+logger = logging.getLogger(__name__)
+
+SCENE = """<katana release="4.5v1" version="4.5.1.000001">
+  <node name="rootNode" type="Group">
+    <node baseType="Group" name="Demo_0001" type="Demo" x="0" y="0">
+      <node name="Prune" type="Prune"/>
+    </node>
+    <node name="OpScript1"
+          type="OpScript"/>
+    <group_parameter name="type"/>
+  </node>
+</katana>
+"""
+
+ABOUT = """
+      <group_parameter name="user">
+        <group_parameter name="About">
+          <string_parameter name="name" value="{type}"/>
+          <string_parameter name="version" value="{version}"/>
+          <string_parameter name="api_version" value="1.1.7"/>
+        </group_parameter>
+      </group_parameter>
+"""
+
+CUSTOM_SCENE = """<katana release="4.5v1" version="4.5.1.000001">
+  <node name="rootNode" type="Group">
+    <group_parameter name="rootNode"/>
+    <node baseType="Group" name="Demo_0001" type="Demo">
+      <group_parameter name="Demo_0001">{demo1}</group_parameter>
+      <node name="OpScript" type="OpScript">
+        <group_parameter name="OpScript">{opscript}</group_parameter>
+      </node>
+    </node>
+    <node baseType="Group" name="Group1" type="Group">
+      <node baseType="Group" name="Demo_0002" type="Demo">
+        <group_parameter name="Demo_0002">{demo2}</group_parameter>
+      </node>
+    </node>
+  </node>
+</katana>
+""".format(
+    demo1=ABOUT.format(type="Demo", version="0.1.0"),
+    demo2=ABOUT.format(type="Demo", version="0.2.0"),
+    # an About group not at the expected path
+    opscript='<group_parameter name="About"/>',
+)
+
+
+class ScannerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, "scene.katana")
+        with open(self.path, "w") as scene_file:
+            scene_file.write(SCENE)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_getSceneNodeTypes(self):
+
+        expected = {"Group", "Demo", "Prune", "OpScript"}
+        self.assertEqual(scanner.getSceneNodeTypes(self.path), expected)
+
+        # tags cut between chunks
+        chunk_size = scanner._CHUNK_SIZE
+        self.addCleanup(setattr, scanner, "_CHUNK_SIZE", chunk_size)
+        for size in range(1, 40):
+            scanner._CHUNK_SIZE = size
+            self.assertEqual(scanner.getSceneNodeTypes(self.path), expected)
+
+    def test_iterCustomNodes(self):
+
+        path = os.path.join(self.tmpdir, "custom.katana")
+        with open(path, "w") as scene_file:
+            scene_file.write(CUSTOM_SCENE)
+
+        nodes = list(scanner.iterCustomNodes(path))
+        self.assertEqual(
+            [node.path for node in nodes],
+            ["rootNode/Demo_0001", "rootNode/Group1/Demo_0002"],
+        )
+        self.assertEqual([node.version for node in nodes], ["0.1.0", "0.2.0"])
+        self.assertEqual(nodes[0].api_version, "1.1.7")
+        self.assertEqual(nodes[0].name, "Demo_0001")
+        self.assertEqual(nodes[0].type, "Demo")
+
+        nodes = list(scanner.iterCustomNodes(path, node_types=["OpScript"]))
+        self.assertEqual([node.path for node in nodes], ["rootNode/Demo_0001/OpScript"])
+        self.assertIsNone(nodes[0].version)
+
+        # gzip compressed
+        gzip_path = path + ".gz"
+        with gzip.open(gzip_path, "wb") as scene_file:
+            scene_file.write(CUSTOM_SCENE.encode("utf-8"))
+        self.assertEqual(len(list(scanner.iterCustomNodes(gzip_path))), 2)
+        self.assertEqual(
+            scanner.getSceneNodeTypes(gzip_path), {"Group", "Demo", "OpScript"}
+        )
+
+        report = scanner.scanScene(gzip_path, version_range=">=0.2")
+        self.assertEqual(report["versions"], {"Demo": {"0.2.0": 1}})
+        self.assertEqual(report["nodes"][0]["path"], "rootNode/Group1/Demo_0002")
+
+        # expat gives unicode values on python-2
+        self.assertIn(u"0.1.0", VersionRange("<0.2"))
+
+        with open(path, "w") as scene_file:
+            scene_file.write(CUSTOM_SCENE.replace('value="0.2.0"', 'value="0.2"'))
+        with self.assertLogs(scanner.logger, logging.WARNING) as logs:
+            report = scanner.scanScene(path, version_range="<0.2")
+        self.assertEqual(report["versions"], {"Demo": {"0.1.0": 1}})
+        self.assertIn("rootNode/Group1/Demo_0002", logs.output[0])
+
+    def test_main(self):
+
+        path = os.path.join(self.tmpdir, "sub", "custom.katana")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "w") as scene_file:
+            scene_file.write(CUSTOM_SCENE)
+        with open(os.path.join(self.tmpdir, "broken.katana"), "w") as scene_file:
+            scene_file.write('<katana><node name="Demo_0001" type="Demo">')
+
+        self.addCleanup(setattr, sys, "stdout", sys.stdout)
+        sys.stdout = StringIO()
+
+        exit_code = scanner.main([self.tmpdir, "--type", "Demo", "--version", "<0.2"])
+        self.assertEqual(exit_code, 1)
+        lines = sys.stdout.getvalue().splitlines()
+        self.assertEqual(len(lines), 1)
+        report = json.loads(lines[0])
+        self.assertEqual(report["path"], path)
+        self.assertEqual(report["versions"], {"Demo": {"0.1.0": 1}})
+
+    def test_getKatanaFileFromArgv(self):
+
+        argv = ["katana", "--batch", "--katana-file=/tmp/a.katana", "-t", "1"]
+        self.assertEqual(scanner.getKatanaFileFromArgv(argv), "/tmp/a.katana")
+        argv = ["katana", "--katana-file", "/tmp/b.katana"]
+        self.assertEqual(scanner.getKatanaFileFromArgv(argv), "/tmp/b.katana")
+        self.assertIsNone(scanner.getKatanaFileFromArgv(["katana", "--batch"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
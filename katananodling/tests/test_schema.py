@@ -0,0 +1,114 @@
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "fakes"))
+
+import Katana
+from Katana import NodegraphAPI
+
+from katananodling import schema
+
+logger = logging.getLogger(__name__)
+
+
+PARAMS = [
+    schema.StringParam("CEL", hints={"widget": "cel"}),
+    schema.NumberParam("amount", 1, hints={"slider": True}),
+    schema.GroupParam(
+        "options",
+        [
+            schema.NumberArrayParam("offset", [0.0, 1.0, 2.0]),
+            schema.StringParam("mode", "add", expression="'add'"),
+        ],
+    ),
+]
+
+
+def _getChildNames(param):
+    return [child.getName() for child in param.getChildren()]
+
+
+class SchemaTest(unittest.TestCase):
+    def setUp(self):
+        Katana._resetSession()
+        node = NodegraphAPI.CreateNode("Group", NodegraphAPI.GetRootNode())
+        self.parent = node.getParameters().createChildGroup("user")
+        self.parent.createChildGroup("About")
+
+    def tearDown(self):
+        Katana._resetSession()
+
+    def test_build(self):
+
+        schema.buildParams(self.parent, PARAMS)
+        self.assertEqual(
+            _getChildNames(self.parent), ["About", "CEL", "amount", "options"]
+        )
+        hints = self.parent.getChild("CEL").getHintString()
+        self.assertEqual(hints, "{'widget': 'cel'}")
+        self.assertEqual(self.parent.getChild("amount").getValue(0), 1)
+        offset = self.parent.getChild("options").getChild("offset")
+        self.assertEqual(offset.getType(), "numberArray")
+        self.assertEqual(offset.getChildByIndex(2).getValue(0), 2.0)
+        mode = self.parent.getChild("options").getChild("mode")
+        self.assertEqual(mode.getExpression(), "'add'")
+
+    def test_diff(self):
+
+        schema.buildParams(self.parent, PARAMS)
+        changes = schema.diffParams(self.parent, PARAMS, ignored=("About",))
+        self.assertEqual([str(change) for change in changes], ["reorder user"])
+        schema.applyChanges(changes)
+        self.assertEqual(
+            _getChildNames(self.parent), ["CEL", "amount", "options", "About"]
+        )
+        self.assertEqual(schema.diffParams(self.parent, PARAMS, ignored=("About",)), [])
+
+        # hints formatting is not considered a change
+        self.parent.getChild("CEL").setHintString('{"widget":"cel"}')
+        self.assertEqual(schema.diffParams(self.parent, PARAMS, ignored=("About",)), [])
+
+    def test_sync(self):
+
+        schema.buildParams(self.parent, PARAMS)
+        self.parent.getChild("CEL").setValue("/root", 0)
+        self.parent.getChild("options").getChild("offset").getChildByIndex(0).setValue(
+            5.0, 0
+        )
+
+        new_params = [
+            schema.NumberParam("strength", 0.5),
+            schema.StringParam("CEL", hints={"widget": "cel", "help": "where"}),
+            schema.GroupParam(
+                "options", [schema.NumberArrayParam("offset", [0.0, 0.0, 0.0, 0.0])]
+            ),
+        ]
+        changes = schema.syncParams(self.parent, new_params, ignored=("About",))
+        self.assertEqual(
+            sorted(str(change) for change in changes),
+            [
+                "add user.strength",
+                "hints user.CEL",
+                "remove user.amount",
+                "remove user.options.mode",
+                "reorder user",
+                "replace user.options.offset",
+            ],
+        )
+        self.assertEqual(
+            _getChildNames(self.parent), ["strength", "CEL", "options", "About"]
+        )
+        self.assertEqual(self.parent.getChild("CEL").getValue(0), "/root")
+        self.assertIn("help", self.parent.getChild("CEL").getHintString())
+        offset = self.parent.getChild("options").getChild("offset")
+        self.assertEqual(offset.getNumChildren(), 4)
+        self.assertEqual(offset.getChildByIndex(0).getValue(0), 5.0)
+        self.assertEqual(
+            schema.diffParams(self.parent, new_params, ignored=("About",)), []
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
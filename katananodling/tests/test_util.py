@@ -1,7 +1,12 @@
 import logging
 import unittest
 
+import copy
+import pickle
+
 from katananodling.util import Version
+from katananodling.util import VersionRange
+from katananodling.util import checkNodeAttributes
 
 logger = logging.getLogger(__name__)
 
@@ -62,6 +67,86 @@ class VersionTest(unittest.TestCase):
 
         self.assertEqual(versionA, versionB)
         self.assertNotEqual(versionA, versionC)
+        self.assertLess(versionC, versionA)
+        self.assertGreater(Version("2.10.0"), Version("2.9.1"))
+        self.assertEqual(
+            sorted([Version("1.10.0"), Version("1.2.0"), Version("0.9.9")]),
+            [Version("0.9.9"), Version("1.2.0"), Version("1.10.0")],
+        )
+        self.assertEqual(len({versionA, versionB, versionC}), 2)
+        self.assertNotEqual(versionA, "2.0.3")
+
+    def test_interned(self):
+
+        version = Version("3.1.4")
+        self.assertIs(Version("3.1.4"), version)
+        self.assertIs(Version((3, 1, 4)), version)
+        self.assertIs(Version([3, 1, 4]), version)
+        self.assertIs(Version(version), version)
+        self.assertIs(pickle.loads(pickle.dumps(version)), version)
+        self.assertIs(copy.deepcopy(version), version)
+
+        with self.assertRaises(AttributeError):
+            version.version = (0, 0, 0)
+        with self.assertRaises(AttributeError):
+            version.other = True
+
+    def test_internedValidation(self):
+
+        Version((1, 2, 3))
+        # equal to the cached (1, 2, 3) but still invalid
+        for invalid in [(1.0, 2, 3), (True, 2, 3), [1, 2.0, 3]]:
+            with self.assertRaises(TypeError):
+                Version(invalid)
+
+
+class VersionRangeTest(unittest.TestCase):
+    def test_range(self):
+
+        version_range = VersionRange(">=0.2,<1")
+        self.assertIs(VersionRange(">=0.2,<1"), version_range)
+        self.assertEqual(version_range.lowest, (0, 2, 0))
+        self.assertNotIn("0.1.9", version_range)
+        self.assertIn("0.2.0", version_range)
+        self.assertIn(Version("0.9.12"), version_range)
+        self.assertNotIn((1, 0, 0), version_range)
+
+        version_range = VersionRange(">1.2,<=1.3.0,!=1.2.5")
+        self.assertFalse(version_range.match("1.2.0"))
+        self.assertTrue(version_range.match("1.2.1"))
+        self.assertFalse(version_range.match("1.2.5"))
+        self.assertTrue(version_range.match("1.3.0"))
+        self.assertFalse(version_range.match("1.3.1"))
+
+    def test_wildcards(self):
+
+        self.assertIn("0.1.9", VersionRange("0.1.x"))
+        self.assertNotIn("0.2.0", VersionRange("0.1.x"))
+        self.assertIn("1.2.7", VersionRange("==1.2"))
+        self.assertNotIn("1.5.0", VersionRange("!=1.*"))
+        self.assertIn("2.0.0", VersionRange("!=1.*"))
+        self.assertIn("9.9.9", VersionRange("x"))
+        self.assertTrue(VersionRange(">1,<1").isEmpty())
+
+        with self.assertRaises(ValueError):
+            VersionRange(">=1.x")
+        with self.assertRaises(ValueError):
+            VersionRange("1.x.2")
+        with self.assertRaises(ValueError):
+            VersionRange(">=1,")
+
+
+
+class CheckNodeAttributesTest(unittest.TestCase):
+    def test_textTypes(self):
+
+        # as read from a json cache on python-2
+        checkNodeAttributes(u"Demo", (0, 1, 0), None, u"description", u"author", u"")
+
+        with self.assertRaises(AssertionError):
+            checkNodeAttributes(5, (0, 1, 0), None, "", "")
+        with self.assertRaises(AssertionError):
+            checkNodeAttributes("Demo", (0, 1, 0), None, None, "")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,114 @@
+import logging
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "fakes"))
+
+import Katana
+from Katana import NodegraphAPI
+
+from katananodling import wiring
+
+logger = logging.getLogger(__name__)
+
+
+class NodeGraphTest(unittest.TestCase):
+    def setUp(self):
+        Katana._resetSession()
+        self.group = NodegraphAPI.CreateNode("Group", NodegraphAPI.GetRootNode())
+        self.dot_up = NodegraphAPI.CreateNode("Dot", self.group)
+        self.dot_down = NodegraphAPI.CreateNode("Dot", self.group)
+        NodegraphAPI.SetNodePosition(self.dot_up, (100, 0))
+        self.source = self.dot_up.getOutputPortByIndex(0)
+        self.target = self.dot_down.getInputPortByIndex(0)
+        self.source.connect(self.target)
+
+    def tearDown(self):
+        Katana._resetSession()
+
+    def createNode(self, node_type):
+        return NodegraphAPI.CreateNode(node_type, self.group)
+
+    def test_chain(self):
+
+        nodes = [self.createNode("Prune") for _ in range(3)]
+        graph = wiring.NodeGraph(spacing=(0, 50))
+        upstream = wiring.INPUT
+        for node in nodes:
+            upstream = graph.add(node, [upstream])
+        graph.setOutput(upstream)
+
+        positions = graph.apply(self.source, self.target)
+
+        self.assertFalse(self.target.isConnected(self.source))
+        self.assertIs(nodes[0].getInputPortByIndex(0).getConnectedPort(0), self.source)
+        self.assertIs(
+            nodes[2].getInputPortByIndex(0).getConnectedPort(0).getNode(), nodes[1]
+        )
+        self.assertIs(self.target.getConnectedPort(0).getNode(), nodes[2])
+        self.assertEqual(positions[nodes[2]], (100, -150))
+        self.assertEqual(NodegraphAPI.GetNodePosition(nodes[1]), (100, -100))
+        self.assertEqual(graph.getDepth(), 3)
+
+    def test_branches(self):
+
+        prune = self.createNode("Prune")
+        opscript = self.createNode("OpScript")
+        merge = self.createNode("Merge")
+        last = self.createNode("Prune")
+
+        graph = wiring.NodeGraph(spacing=(200, 100))
+        graph.add(prune, [wiring.INPUT])
+        graph.add(opscript, {"i0": wiring.INPUT})
+        # the longest branch define the depth of the merge
+        graph.add(last, [(prune, "out")])
+        graph.add(merge, {0: last, 1: opscript, "i2": (wiring.INPUT, 0)})
+        graph.setOutput(merge)
+        self.assertEqual(len(graph), 4)
+
+        with self.assertRaises(ValueError):
+            graph.add(merge)
+
+        positions = graph.apply(self.source, self.target, origin=(0, 0))
+
+        self.assertEqual(positions[prune], (-100, -100))
+        self.assertEqual(positions[opscript], (100, -100))
+        self.assertEqual(positions[last], (0, -200))
+        self.assertEqual(positions[merge], (0, -300))
+        # missing named ports are created
+        self.assertEqual(merge.getNumInputPorts(), 3)
+        connected = [
+            port.getConnectedPort(0).getNode() for port in merge.getInputPorts()
+        ]
+        self.assertEqual(connected, [last, opscript, self.dot_up])
+        self.assertIs(self.target.getConnectedPort(0).getNode(), merge)
+
+    def test_errors(self):
+
+        prune = self.createNode("Prune")
+        other = self.createNode("Prune")
+
+        graph = wiring.NodeGraph()
+        graph.add(prune, [other])
+        graph.setOutput(prune)
+        with self.assertRaises(ValueError):
+            graph.apply(self.source, self.target)
+
+        graph = wiring.NodeGraph()
+        graph.add(prune, [wiring.INPUT, other])
+        graph.add(other, [prune])
+        graph.setOutput(other)
+        with self.assertRaises(ValueError):
+            graph.layout()
+        # nothing modified
+        self.assertTrue(self.target.isConnected(self.source))
+
+        graph = wiring.NodeGraph()
+        graph.add(prune, [wiring.INPUT])
+        with self.assertRaises(ValueError):
+            graph.apply(self.source, self.target)
+
+
+if __name__ == "__main__":
+    unittest.main()
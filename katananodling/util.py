@@ -1,17 +1,36 @@
 import logging
+import re
+import sys
+from typing import Any
+from typing import Dict
+from typing import FrozenSet
+from typing import Optional
 from typing import Union
 from typing import Tuple
 from typing import List
 
 
 __all__ = (
+    "TEXT_TYPES",
     "Version",
+    "VersionRange",
     "VersionableType",
     "asserting",
+    "checkNodeAttributes",
+    "findPackageDirectory",
 )
 
 logger = logging.getLogger(__name__)
 
+try:
+    TEXT_TYPES = (str, unicode)  # type: Tuple[type, ...]
+except NameError:  # python-3
+    TEXT_TYPES = (str,)
+"""
+Types of text values, for ``isinstance``. On python-2 the json and xml parsers
+return ``unicode`` instead of ``str``.
+"""
+
 
 def asserting(expression, msg):
     # type: (bool, str) -> None
@@ -31,33 +50,171 @@ def asserting(expression, msg):
         raise AssertionError(msg)
 
 
+def checkNodeAttributes(name, version, color, description, author, category=""):
+    # type: (str, Tuple[int, int, int], Optional[Tuple[float, float, float]], str, str, str) -> None
+    """
+    Raise an error if the given BaseCustomNode class attributes are malformed.
+
+    Raises:
+        AssertionError: on the first malformed attribute found.
+    """
+    asserting(
+        isinstance(name, TEXT_TYPES),
+        "name=<{}> is not a str".format(name),
+    )
+    asserting(
+        False if re.search(r"\W", name) else True,
+        "name=<{}> contains unsupported characters".format(name),
+    )
+
+    asserting(
+        isinstance(version, tuple) and len(version) == 3,
+        "version=<{}> is not a tuple or of length 3".format(version),
+    )
+    asserting(
+        not color or isinstance(color, tuple) and len(color) == 3,
+        "color=<{}> is not a tuple or of length 3".format(color),
+    )
+    asserting(
+        isinstance(description, TEXT_TYPES),
+        "description=<{}> is not a str".format(description),
+    )
+    asserting(
+        isinstance(author, TEXT_TYPES),
+        "author=<{}> is not a str".format(author),
+    )
+    asserting(
+        isinstance(category, TEXT_TYPES),
+        "category=<{}> is not a str".format(category),
+    )
+    return
+
+
+def findPackageDirectory(package_name):
+    # type: (str) -> Optional[str]
+    """
+    Find the directory of the given python package, without importing it if it was
+    not already imported.
+
+    Args:
+        package_name: importable name of the python package, ex: "demolibrary"
+
+    Returns:
+        absolute path to the package directory or None if not found/not a package.
+    """
+    module = sys.modules.get(package_name)
+    if module is not None:
+        paths = getattr(module, "__path__", None)
+        return list(paths)[0] if paths else None
+
+    try:
+        from importlib.util import find_spec
+    except ImportError:  # python-2
+        find_spec = None
+
+    if find_spec:
+        try:
+            spec = find_spec(package_name)
+        except (ImportError, ValueError):
+            return None
+        if not spec or not spec.submodule_search_locations:
+            return None
+        return list(spec.submodule_search_locations)[0]
+
+    import imp
+
+    path = None
+    for part in package_name.split("."):
+        try:
+            handle, path, description = imp.find_module(part, [path] if path else None)
+        except ImportError:
+            return None
+        if handle:
+            handle.close()
+        if description[2] != imp.PKG_DIRECTORY:
+            return None
+
+    return path
+
+
 VersionableType = Union[str, Union[List[int], Tuple[int, int, int]]]
 
+_VERSIONS = dict()  # type: Dict[Any, Version]
+"""
+Cache of version tuple or version string -> interned Version instance. Only
+validated values are stored, see ``Version.__new__``.
+"""
+
+_VERSIONS_MAX_SIZE = 4096
+"""
+The version cache is cleared when reaching this size, so arbitrary inputs cannot
+make it grow forever.
+"""
+
+_RANGE_OPERATORS = ("==", "!=", ">=", "<=", ">", "<")
 
-class Version:
+_WILDCARDS = ("x", "X", "*")
+
+
+class Version(object):
     """
     A version represented as a python class object.
     Expressed using semver.org convention: (major, minor, patch)
 
+    Instances are immutable, hashable and ordered. They are interned : creating a
+    Version from an object giving the same version returns the same instance, and
+    strings already seen are not parsed again.
+
     Args:
         versionable_object: object that can be converted to a valid version.
     """
 
-    def __init__(self, versionable_object):
-        # type: (VersionableType) -> None
+    __slots__ = ("version", "_string", "_hash")
+
+    def __new__(cls, versionable_object):
+        # type: (Union[VersionableType, Version]) -> Version
+        if versionable_object.__class__ is cls:
+            return versionable_object
+
+        # only strings, as tuples equal to a cached version can still be invalid,
+        # like (1.0, 2, 3) or (True, 2, 3)
+        is_text = isinstance(versionable_object, TEXT_TYPES)
+        if is_text:
+            instance = _VERSIONS.get(versionable_object)
+            if instance is not None:
+                return instance
+
+        version = cls._parse(versionable_object)
+        instance = _VERSIONS.get(version)
+        if instance is None:
+            instance = super(Version, cls).__new__(cls)
+            object.__setattr__(instance, "version", version)
+            object.__setattr__(instance, "_string", ".".join(map(str, version)))
+            object.__setattr__(instance, "_hash", hash(version))
 
-        self.version = None  # type: Tuple[int, int, int]
+        if len(_VERSIONS) >= _VERSIONS_MAX_SIZE:
+            _VERSIONS.clear()
+        _VERSIONS[version] = instance
+        if is_text:
+            _VERSIONS[versionable_object] = instance
+        return instance
 
-        if isinstance(versionable_object, str):
-            self.version = versionable_object.split(".")
-            self.version = tuple(map(int, self.version))
+    @staticmethod
+    def _parse(versionable_object):
+        # type: (VersionableType) -> Tuple[int, int, int]
+        # unicode on python-2 when read from json or xml
+        if isinstance(versionable_object, TEXT_TYPES):
+            version = tuple(map(int, versionable_object.split(".")))
 
         elif (
             isinstance(versionable_object, (tuple, list))
             and len(versionable_object) == 3
-            and all(map(lambda vo: isinstance(vo, int), versionable_object))
+            and all(
+                isinstance(vo, int) and not isinstance(vo, bool)
+                for vo in versionable_object
+            )
         ):
-            self.version = versionable_object
+            version = tuple(versionable_object)
 
         else:
             raise TypeError(
@@ -65,16 +222,33 @@ class Version:
                 "".format(repr(versionable_object), type(versionable_object))
             )
 
-        assert len(self.version) == 3, (
+        assert len(version) == 3, (
             "Given versionable_object <{}> does not produce a version of len==3 once "
-            "converted but <{}>".format(versionable_object, self.version)
+            "converted but <{}>".format(versionable_object, version)
         )
+        return version
+
+    def __setattr__(self, key, value):
+        raise AttributeError("{} is immutable".format(self.__class__.__name__))
+
+    def __delattr__(self, key):
+        raise AttributeError("{} is immutable".format(self.__class__.__name__))
+
+    def __reduce__(self):
+        return self.__class__, (self.version,)
 
     def __str__(self):
-        version = map(str, self.version)
-        return ".".join(version)
+        return self._string
+
+    def __repr__(self):
+        return "<{} {}>".format(self.__class__.__name__, self._string)
+
+    def __hash__(self):
+        return self._hash
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, Version):
             return False
         return self.version == other.version
@@ -82,6 +256,26 @@ class Version:
     def __ne__(self, other):
         return not self.__eq__(other)
 
+    def __lt__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self.version < other.version
+
+    def __le__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self.version <= other.version
+
+    def __gt__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self.version > other.version
+
+    def __ge__(self, other):
+        if not isinstance(other, Version):
+            return NotImplemented
+        return self.version >= other.version
+
     @property
     def major(self):
         # type: () -> int
@@ -96,3 +290,187 @@ class Version:
     def patch(self):
         # type: () -> int
         return self.version[2]
+
+
+def _parseRangeVersion(text):
+    # type: (str) -> Tuple[Tuple[int, ...], int]
+    """
+    Returns:
+        the fixed components of the given partial version, and the index of the
+        first wildcard (3 if none), ex: ``"1.2.x"`` -> ``((1, 2, 0), 2)``
+    """
+    parts = text.strip().split(".")
+    if not 0 < len(parts) <= 3:
+        raise ValueError("Invalid version <{}>".format(text))
+
+    fixed = list()
+    for part in parts:
+        if part in _WILDCARDS:
+            break
+        fixed.append(int(part))
+    for part in parts[len(fixed) :]:
+        if part not in _WILDCARDS:
+            raise ValueError(
+                "Invalid version <{}>: wildcards must be last".format(text)
+            )
+
+    wildcard = len(fixed) if len(fixed) < len(parts) or len(parts) < 3 else 3
+    return tuple(fixed) + (0,) * (3 - len(fixed)), wildcard
+
+
+def _getNextVersion(version, index):
+    # type: (Tuple[int, ...], int) -> Optional[Tuple[int, int, int]]
+    """
+    Returns:
+        lowest version above all the versions starting with the first ``index``
+        components of the given one, None if there is no such version.
+    """
+    if index == 0:
+        return None
+    return version[: index - 1] + (version[index - 1] + 1,) + (0,) * (3 - index)
+
+
+class VersionRange(object):
+    """
+    A set of versions, described by comma-separated clauses that must all be
+    satisfied : ``">=0.2,<1"``, ``"0.1.x"``, ``"!=1.2.0"``.
+
+    Operators are ``==  !=  >=  <=  >  <``, no operator being ``==``. Missing
+    components are zero, except for ``==`` and ``!=`` where they are wildcards like
+    ``x`` or ``*`` : ``"==1.2"`` is ``">=1.2.0,<1.3.0"``.
+
+    The specifier is compiled once to bounds, so membership tests are only a few
+    tuple comparisons. Instances are interned per specifier.
+
+    Args:
+        specifier: clauses separated by a comma
+    """
+
+    __slots__ = ("specifier", "lower", "upper", "excluded", "_ranges_excluded")
+
+    _CACHE = dict()  # type: Dict[str, VersionRange]
+
+    def __new__(cls, specifier):
+        # type: (str) -> VersionRange
+        instance = cls._CACHE.get(specifier)
+        if instance is not None:
+            return instance
+
+        instance = super(VersionRange, cls).__new__(cls)
+        instance.specifier = specifier
+        # inclusive lower bound, exclusive upper bound, None for unbounded
+        instance.lower = (0, 0, 0)  # type: Tuple[int, int, int]
+        instance.upper = None  # type: Optional[Tuple[int, int, int]]
+        instance.excluded = frozenset()  # type: FrozenSet[Tuple[int, int, int]]
+        # (lower, upper) excluded by ``!=`` clauses with wildcards
+        instance._ranges_excluded = tuple()  # type: Tuple[Tuple[Tuple, Optional[Tuple]], ...]
+        instance._compile()
+
+        if len(cls._CACHE) >= _VERSIONS_MAX_SIZE:
+            cls._CACHE.clear()
+        cls._CACHE[specifier] = instance
+        return instance
+
+    def _compile(self):
+        excluded = set()
+        ranges_excluded = list()
+
+        for clause in self.specifier.split(","):
+            clause = clause.strip()
+            if not clause:
+                raise ValueError("Empty clause in <{}>".format(self.specifier))
+
+            operator = "=="
+            for candidate in _RANGE_OPERATORS:
+                if clause.startswith(candidate):
+                    operator = candidate
+                    clause = clause[len(candidate) :]
+                    break
+
+            version, wildcard = _parseRangeVersion(clause)
+            has_wildcard = any(char in clause for char in _WILDCARDS)
+            if has_wildcard and operator not in ("==", "!="):
+                raise ValueError(
+                    "Wildcard not supported with <{}> in <{}>"
+                    "".format(operator, self.specifier)
+                )
+
+            if operator == "==":
+                self._setLower(version)
+                self._setUpper(
+                    _getNextVersion(version, wildcard)
+                    if wildcard < 3
+                    else version[:2] + (version[2] + 1,)
+                )
+            elif operator == "!=":
+                if wildcard < 3:
+                    upper = _getNextVersion(version, wildcard)
+                    ranges_excluded.append((version, upper))
+                else:
+                    excluded.add(version)
+            elif operator == ">=":
+                self._setLower(version)
+            elif operator == ">":
+                self._setLower(version[:2] + (version[2] + 1,))
+            elif operator == "<":
+                self._setUpper(version)
+            elif operator == "<=":
+                self._setUpper(version[:2] + (version[2] + 1,))
+
+        self.excluded = frozenset(excluded)
+        self._ranges_excluded = tuple(ranges_excluded)
+        return
+
+    def _setLower(self, version):
+        if version > self.lower:
+            self.lower = version
+
+    def _setUpper(self, version):
+        if version is not None and (self.upper is None or version < self.upper):
+            self.upper = version
+
+    def __str__(self):
+        return self.specifier
+
+    def __repr__(self):
+        return "<{} {}>".format(self.__class__.__name__, self.specifier)
+
+    def __reduce__(self):
+        return self.__class__, (self.specifier,)
+
+    @property
+    def lowest(self):
+        # type: () -> Tuple[int, int, int]
+        """
+        Lowest version the range could contain.
+        """
+        return self.lower
+
+    def __contains__(self, version):
+        # type: (Union[Version, VersionableType]) -> bool
+        version = Version(version).version
+        if version < self.lower:
+            return False
+        if self.upper is not None and version >= self.upper:
+            return False
+        if version in self.excluded:
+            return False
+        for lower, upper in self._ranges_excluded:
+            if lower <= version and (upper is None or version < upper):
+                return False
+        return True
+
+    def match(self, version):
+        # type: (Union[Version, VersionableType]) -> bool
+        """
+        Same as ``version in self``.
+        """
+        return version in self
+
+    def isEmpty(self):
+        # type: () -> bool
+        """
+        Returns:
+            True if no version can satisfy the range, ex: ``">1,<1"``.
+        """
+        return self.upper is not None and self.upper <= self.lower
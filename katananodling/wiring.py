@@ -0,0 +1,291 @@
+"""
+Connect and lay out a network of nodes described as a small DAG, in a single pass.
+
+Example::
+
+    graph = wiring.NodeGraph()
+    graph.add(prune, [wiring.INPUT])
+    graph.add(opscript, [wiring.INPUT])
+    graph.add(merge, [prune, opscript])
+    graph.setOutput(merge)
+    graph.apply(source_port, target_port)
+"""
+import logging
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+from typing import Union
+
+from Katana import NodegraphAPI
+
+__all__ = (
+    "INPUT",
+    "NodeGraph",
+)
+
+logger = logging.getLogger(__name__)
+
+
+INPUT = "__input__"
+"""
+Placeholder for the port the graph is inserted after, to use as an upstream node.
+"""
+
+PortKeyType = Union[int, str]
+UpstreamType = Union[NodegraphAPI.Node, str, Tuple[NodegraphAPI.Node, PortKeyType]]
+
+
+class _PortCache(object):
+    """
+    Ports of the nodes of a graph, queried only once per node.
+    """
+
+    def __init__(self):
+        self._inputs = dict()  # type: Dict[NodegraphAPI.Node, Tuple[List, Dict]]
+        self._outputs = dict()  # type: Dict[NodegraphAPI.Node, Tuple[List, Dict]]
+
+    @staticmethod
+    def _get(cache, node, getter):
+        ports = cache.get(node)
+        if ports is None:
+            port_list = getter(node)
+            ports = cache[node] = (
+                port_list,
+                dict((port.getName(), port) for port in port_list),
+            )
+        return ports
+
+    def getInputPort(self, node, key):
+        # type: (NodegraphAPI.Node, PortKeyType) -> NodegraphAPI.Port
+        port_list, port_map = self._get(
+            self._inputs, node, lambda n: n.getInputPorts()
+        )
+        if isinstance(key, int):
+            if key >= len(port_list):
+                raise ValueError(
+                    "Node {} has no input port at index {}".format(node, key)
+                )
+            return port_list[key]
+
+        port = port_map.get(key)
+        if port is None:
+            # nodes like Merge have their input ports created on demand
+            port = port_map[key] = node.addInputPort(key)
+            port_list.append(port)
+        return port
+
+    def getOutputPort(self, node, key):
+        # type: (NodegraphAPI.Node, PortKeyType) -> NodegraphAPI.Port
+        port_list, port_map = self._get(
+            self._outputs, node, lambda n: n.getOutputPorts()
+        )
+        if isinstance(key, int):
+            port = port_list[key] if key < len(port_list) else None
+        else:
+            port = port_map.get(key)
+        if port is None:
+            raise ValueError("Node {} has no output port {}".format(node, key))
+        return port
+
+
+class NodeGraph(object):
+    """
+    Description of a network of nodes and their connections, to insert between two
+    existing ports.
+
+    Args:
+        spacing: (horizontal, vertical) distance between nodes when laid out.
+    """
+
+    def __init__(self, spacing=(200, 150)):
+        # type: (Tuple[float, float]) -> None
+        self.spacing = spacing
+        self._nodes = list()  # type: List[NodegraphAPI.Node]
+        # {node: [(input port key, upstream node or INPUT, output port key)]}
+        self._inputs = dict()  # type: Dict[Any, List[Tuple[PortKeyType, Any, Any]]]
+        self._output = None  # type: Optional[Tuple[Any, PortKeyType]]
+
+    def __contains__(self, node):
+        return node in self._inputs
+
+    def __len__(self):
+        return len(self._nodes)
+
+    @property
+    def nodes(self):
+        # type: () -> List[NodegraphAPI.Node]
+        return list(self._nodes)
+
+    @staticmethod
+    def _splitUpstream(upstream):
+        # type: (UpstreamType) -> Tuple[Any, PortKeyType]
+        if isinstance(upstream, tuple):
+            return upstream
+        return upstream, 0
+
+    def add(self, node, inputs=()):
+        # type: (NodegraphAPI.Node, Union[Sequence[UpstreamType], Dict[PortKeyType, UpstreamType]]) -> NodegraphAPI.Node
+        """
+        Add a node to the graph, with what is connected to its input ports.
+
+        Args:
+            node: node to add, must be a child of the node the graph is applied in
+            inputs:
+                upstream of each input port, in order, or as a dict of
+                {input port name or index: upstream}. An upstream is a node (its first
+                output port is used), a tuple of (node, output port name or index) or
+                ``INPUT``.
+
+        Returns:
+            the node added, for convenience.
+        """
+        if node in self._inputs:
+            raise ValueError("Node {} already added to the graph".format(node))
+
+        if not isinstance(inputs, dict):
+            inputs = dict(enumerate(inputs))
+
+        links = list()
+        for port_key, upstream in inputs.items():
+            upstream_node, upstream_port = self._splitUpstream(upstream)
+            links.append((port_key, upstream_node, upstream_port))
+
+        self._nodes.append(node)
+        self._inputs[node] = links
+        return node
+
+    def setOutput(self, node, port=0):
+        # type: (Any, PortKeyType) -> None
+        """
+        Set which output port is connected to the target port when applied.
+
+        Args:
+            node: node of the graph, or ``INPUT`` to bypass the graph
+            port: output port name or index
+        """
+        self._output = (node, port)
+
+    def _getRanks(self):
+        # type: () -> Dict[Any, int]
+        """
+        Returns:
+            depth of each node from the graph input, as the longest path to it.
+
+        Raises:
+            ValueError: if the graph is cyclic or refer to nodes not added.
+        """
+        ranks = {INPUT: 0}
+        downstreams = dict((node, list()) for node in self._nodes)
+        downstreams[INPUT] = list()
+        pending = dict()
+
+        for node in self._nodes:
+            upstreams = set()
+            for _, upstream, _ in self._inputs[node]:
+                if upstream not in downstreams:
+                    raise ValueError(
+                        "Upstream {} of node {} is not in the graph"
+                        "".format(upstream, node)
+                    )
+                upstreams.add(upstream)
+            for upstream in upstreams:
+                downstreams[upstream].append(node)
+            pending[node] = len(upstreams)
+
+        # nodes without input are laid out at the top too
+        queue = [INPUT] + [node for node in self._nodes if not pending[node]]
+        for node in queue[1:]:
+            ranks[node] = 1
+
+        visited = 0
+        while queue:
+            node = queue.pop()
+            visited += 1
+            for downstream in downstreams[node]:
+                ranks[downstream] = max(ranks.get(downstream, 1), ranks[node] + 1)
+                pending[downstream] -= 1
+                if not pending[downstream]:
+                    queue.append(downstream)
+
+        if visited != len(self._nodes) + 1:
+            cyclic = [node for node in self._nodes if pending[node]]
+            raise ValueError("Graph is cyclic between nodes {}".format(cyclic))
+
+        return ranks
+
+    def layout(self, origin=(0, 0)):
+        # type: (Tuple[float, float]) -> Dict[NodegraphAPI.Node, Tuple[float, float]]
+        """
+        Compute the position of each node, by rows of same depth below the origin,
+        without modifying them.
+
+        Args:
+            origin: position of the graph input
+
+        Returns:
+            position per node.
+        """
+        ranks = self._getRanks()
+        rows = dict()  # type: Dict[int, List[NodegraphAPI.Node]]
+        for node in self._nodes:
+            rows.setdefault(ranks[node], list()).append(node)
+
+        positions = dict()
+        for rank, row in rows.items():
+            offset = (len(row) - 1) / 2.0
+            for index, node in enumerate(row):
+                positions[node] = (
+                    origin[0] + (index - offset) * self.spacing[0],
+                    origin[1] - rank * self.spacing[1],
+                )
+        return positions
+
+    def getDepth(self):
+        # type: () -> int
+        """
+        Returns:
+            number of rows of nodes once laid out.
+        """
+        return max(self._getRanks().values())
+
+    def apply(self, source_port, target_port, origin=None):
+        # type: (NodegraphAPI.Port, NodegraphAPI.Port, Optional[Tuple[float, float]]) -> Dict[NodegraphAPI.Node, Tuple[float, float]]
+        """
+        Connect and position all the nodes of the graph, inserted between the given
+        ports.
+
+        Args:
+            source_port: output port used as the ``INPUT`` of the graph
+            target_port: input port connected to the graph output
+            origin: position of the graph input, default to the source port node one
+
+        Returns:
+            position per node.
+        """
+        if self._output is None:
+            raise ValueError("No output set on the graph, use setOutput()")
+
+        if origin is None:
+            origin = NodegraphAPI.GetNodePosition(source_port.getNode())
+        positions = self.layout(origin)
+
+        ports = _PortCache()
+
+        def getSourcePort(upstream, port_key):
+            if upstream == INPUT:
+                return source_port
+            return ports.getOutputPort(upstream, port_key)
+
+        target_port.disconnect(source_port)
+
+        for node in self._nodes:
+            for port_key, upstream, upstream_port in self._inputs[node]:
+                port = ports.getInputPort(node, port_key)
+                port.connect(getSourcePort(upstream, upstream_port))
+            NodegraphAPI.SetNodePosition(node, positions[node])
+
+        target_port.connect(getSourcePort(*self._output))
+        return positions